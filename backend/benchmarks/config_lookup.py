@@ -0,0 +1,50 @@
+"""Benchmark the per-lookup cost of yesand.config.get_env.
+
+Compares the cached snapshot against re-reading .env on every call, which is
+what get_env used to do.
+
+    python -m benchmarks.config_lookup [--iterations N]
+"""
+
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+
+from yesand.config import EnvSnapshot, _read_dotenv
+
+SAMPLE_ENV = """OPENAI_API_KEY=sk-benchmark
+OPENAI_TEXT_MODEL=gpt-5-mini
+OPENAI_IMAGE_MODEL=dall-e-2
+OPENAI_IMAGE_SIZE=1024x1024
+OPENAI_IMAGE_QUALITY=standard
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env_path = Path(tmp) / ".env"
+        env_path.write_text(SAMPLE_ENV)
+
+        cases = {
+            "reread every lookup": lambda: _read_dotenv(env_path).get("OPENAI_TEXT_MODEL"),
+            "snapshot, stat every lookup": _lookup(EnvSnapshot(env_path, check_interval=0)),
+            "snapshot, default interval": _lookup(EnvSnapshot(env_path)),
+        }
+
+        print(f"{'case':<30} {'per lookup':>12}")
+        for name, fn in cases.items():
+            seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+            print(f"{name:<30} {seconds / args.iterations * 1e6:>9.2f} us")
+
+
+def _lookup(snapshot: EnvSnapshot):
+    return lambda: snapshot.values().get("OPENAI_TEXT_MODEL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark history handling per request: dict lists vs the Conversation type.
+
+Each iteration models one scene step with speculative synthesis on: a /chat
+turn (LangChain messages for the agent, then the speculative synthesizer
+keying and transcribing the history plus the reply) followed by a /generate
+for the same history (fingerprint, speculation claim, prompt cache hit).
+Two request shapes:
+
+- ``stateless``: the client resends the whole history with every request.
+- ``delta``: the server holds the conversation and /chat adds one message
+  (the opt-in delta protocol).
+
+The ``dicts`` path reproduces the earlier pipeline: ``model_dump()`` dicts,
+LangChain messages rebuilt per call, a transcript built line by line for
+every cache key and a JSON fingerprint. Reported per iteration: CPU time,
+peak traced memory and bytes still held afterwards (the stored
+conversation, for ``delta``).
+
+    python -m benchmarks.conversation_repr [--sizes 100,1000] [--repeat 200]
+"""
+
+import argparse
+import hashlib
+import json
+import time
+import tracemalloc
+
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel
+
+from yesand.conversation import EMPTY_PREFIX_HASH, Conversation, extend_prefix_hash
+
+REPLY = "yes, and a brass clock ticks on the windowsill"
+
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+
+def _messages(count: int) -> list[Message]:
+    return [
+        Message(role="human" if i % 2 == 0 else "ai", content=f"turn {i}: the lantern hums beside a velvet moth")
+        for i in range(count)
+    ]
+
+
+# --- The earlier list-of-dicts pipeline ---
+
+
+def _transcript(history: list[dict]) -> str:
+    lines = []
+    for m in history:
+        label = "human" if m["role"] == "human" else "ai"
+        lines.append(f"{label}: {m['content']}")
+    return "\n".join(lines)
+
+
+def _key(history: list[dict]) -> str:
+    return hashlib.sha256(_transcript(history).encode()).hexdigest()
+
+
+def _dicts_step(chat_history: list[dict], generate_history: list[dict]) -> None:
+    # /chat: agent messages, then speculation keys and transcribes history + reply.
+    [HumanMessage(content=m["content"]) if m["role"] == "human" else AIMessage(content=m["content"])
+     for m in chat_history]  # fmt: skip
+    speculated = [*chat_history, {"role": "ai", "content": REPLY}]
+    _key(speculated)
+    _transcript(speculated)
+    # /generate: fingerprint, claim key, synthesizer key (cache hit).
+    hashlib.sha256(json.dumps(["persona", False, generate_history], separators=(",", ":")).encode()).hexdigest()
+    _key(generate_history)
+    _key(generate_history)
+
+
+def dicts_stateless(history: list[Message], state: dict):
+    chat_history = [m.model_dump() for m in history]
+    generate_history = [m.model_dump() for m in history] + [{"role": "ai", "content": REPLY}]
+    _dicts_step(chat_history, generate_history)
+
+
+def dicts_delta(delta: list[Message], state: dict):
+    messages, prefix_hash = state["stored"]
+    new = [m.model_dump() for m in delta]
+    messages, prefix_hash = messages + tuple(new), extend_prefix_hash(prefix_hash, new)
+    chat_history = list(messages)
+    reply = [{"role": "ai", "content": REPLY}]
+    state["stored"] = messages + tuple(reply), extend_prefix_hash(prefix_hash, reply)
+    _dicts_step(chat_history, list(state["stored"][0]))
+
+
+# --- Conversation ---
+
+
+def _conversation_step(chat_history: Conversation, generate_history: Conversation) -> None:
+    chat_history.langchain_messages
+    speculated = chat_history.add("ai", REPLY)
+    speculated.prefix_hash
+    speculated.transcript
+    for _ in range(3):
+        generate_history.prefix_hash
+
+
+def conversation_stateless(history: list[Message], state: dict):
+    chat_history = Conversation.from_messages(history)
+    generate_history = Conversation.from_messages(history).add("ai", REPLY)
+    _conversation_step(chat_history, generate_history)
+
+
+def conversation_delta(delta: list[Message], state: dict):
+    chat_history = state["stored"].extend(Conversation.from_messages(delta))
+    state["stored"] = chat_history.add("ai", REPLY)
+    _conversation_step(chat_history, state["stored"])
+
+
+def _measure(run, size: int, delta: bool, repeat: int) -> tuple[float, int, int]:
+    full = _messages(size)
+    if delta:
+        # Warm the stored conversation to ``size`` messages, then add one per request.
+        state = {"stored": Conversation() if run is conversation_delta else ((), EMPTY_PREFIX_HASH)}
+        run(full, state)
+        requests = [[Message(role="human", content=f"extra {i}")] for i in range(repeat)]
+    else:
+        state = {}
+        requests = [full] * repeat
+
+    started = time.process_time()
+    for request in requests:
+        run(request, state)
+    cpu = (time.process_time() - started) / repeat
+
+    probe = requests[0] if not delta else [Message(role="human", content="probe")]
+    tracemalloc.start()
+    run(probe, state)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak, retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",")], default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = {
+        "stateless": {"dicts": dicts_stateless, "conversation": conversation_stateless},
+        "delta": {"dicts": dicts_delta, "conversation": conversation_delta},
+    }
+    print(f"{'shape':<10} {'messages':>8} {'path':<13} {'CPU/step':>12} {'peak KiB':>9} {'held KiB':>9}")
+    for shape, paths in cases.items():
+        for size in args.sizes:
+            for name, run in paths.items():
+                cpu, peak, retained = _measure(run, size, shape == "delta", args.repeat)
+                print(
+                    f"{shape:<10} {size:>8} {name:<13} {cpu * 1e6:>9.0f} us "
+                    f"{peak / 1024:>9.1f} {retained / 1024:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
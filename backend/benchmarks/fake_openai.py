@@ -0,0 +1,204 @@
+"""Local stand-in for the OpenAI API, for load tests.
+
+Serves just enough of the API for this service: chat completions (plain and
+streamed) and image generations, plus the generated image files themselves.
+Latency, token rate and error rate are configurable so the load test can
+model a slow or flaky upstream.
+
+    python -m benchmarks.fake_openai [--port 8900] [--latency-ms 300] [--tokens-per-second 60]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+REPLY_WORDS = (
+    "yes, and the lantern hums while a moth traces slow circles above the "
+    "kitchen table, its shadow stretching across a pile of yellowed newspapers"
+).split()
+
+
+@dataclass
+class FakeUpstreamConfig:
+    latency: float = 0.3
+    tokens_per_second: float = 60.0
+    completion_tokens: int = 40
+    error_rate: float = 0.0
+    image_latency: float = 1.0
+    image_bytes: int = 256 * 1024
+
+
+class FakeUpstreamStats:
+    def __init__(self) -> None:
+        self.chat = 0
+        self.chat_stream = 0
+        self.images = 0
+        self.files = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def _png(size: int) -> bytes:
+    """A valid 1x1 PNG padded with an ancillary chunk to roughly ``size`` bytes."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return len(data).to_bytes(4, "big") + body + zlib.crc32(body).to_bytes(4, "big")
+
+    header = chunk(b"IHDR", (1).to_bytes(4, "big") * 2 + b"\x08\x02\x00\x00\x00")
+    pixel = chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00"))
+    padding = chunk(b"tEXt", b"pad\x00" + b"x" * max(0, size - 100))
+    return b"\x89PNG\r\n\x1a\n" + header + padding + pixel + chunk(b"IEND", b"")
+
+
+def create_app(config: FakeUpstreamConfig) -> FastAPI:
+    app = FastAPI()
+    stats = FakeUpstreamStats()
+    image = _png(config.image_bytes)
+
+    def failed() -> Response | None:
+        if config.error_rate and random.random() < config.error_rate:
+            stats.errors += 1
+            return JSONResponse({"error": {"message": "fake upstream error", "type": "server_error"}}, status_code=500)
+        return None
+
+    def usage(body: dict) -> dict:
+        prompt = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": config.completion_tokens,
+            "total_tokens": prompt + config.completion_tokens,
+        }
+
+    def words() -> list[str]:
+        return [REPLY_WORDS[i % len(REPLY_WORDS)] for i in range(config.completion_tokens)]
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if (error := failed()) is not None:
+            return error
+        created = int(time.time())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake")
+
+        if not body.get("stream"):
+            stats.chat += 1
+            await asyncio.sleep(config.latency + config.completion_tokens / config.tokens_per_second)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(words())},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage(body),
+            }
+
+        stats.chat_stream += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def frame(choices: list, **extra) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        def delta(content: dict, finish_reason: str | None = None) -> list:
+            return [{"index": 0, "delta": content, "finish_reason": finish_reason}]
+
+        async def events():
+            await asyncio.sleep(config.latency)
+            yield frame(delta({"role": "assistant", "content": ""}))
+            for index, word in enumerate(words()):
+                await asyncio.sleep(1 / config.tokens_per_second)
+                yield frame(delta({"content": word if index == 0 else f" {word}"}))
+            yield frame(delta({}, "stop"))
+            if include_usage:
+                yield frame([], usage=usage(body))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/images/generations")
+    async def images_generations(request: Request):
+        body = await request.json()
+        if (error := failed()) is not None:
+            return error
+        stats.images += 1
+        await asyncio.sleep(config.image_latency)
+        base = str(request.base_url).rstrip("/")
+        data = [{"url": f"{base}/files/{uuid.uuid4().hex}.png"} for _ in range(body.get("n", 1))]
+        return {"created": int(time.time()), "data": data}
+
+    @app.get("/files/{name}")
+    async def files(name: str):
+        stats.files += 1
+        return Response(content=image, media_type="image/png")
+
+    @app.get("/stats")
+    async def upstream_stats():
+        return stats.as_dict()
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the fake upstream knobs on a CLI parser (shared with the load test)."""
+    defaults = FakeUpstreamConfig()
+    group = parser.add_argument_group("fake upstream")
+    group.add_argument("--latency-ms", type=float, default=defaults.latency * 1000, help="time to first token")
+    group.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    group.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    group.add_argument("--error-rate", type=float, default=defaults.error_rate, help="fraction answered with 500")
+    group.add_argument("--image-latency-ms", type=float, default=defaults.image_latency * 1000)
+    group.add_argument("--image-bytes", type=int, default=defaults.image_bytes)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeUpstreamConfig:
+    return FakeUpstreamConfig(
+        latency=args.latency_ms / 1000,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        image_latency=args.image_latency_ms / 1000,
+        image_bytes=args.image_bytes,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
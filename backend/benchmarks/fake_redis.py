@@ -0,0 +1,125 @@
+"""Local stand-in for a Redis server, for tests and multi-worker load runs.
+
+Speaks just enough RESP2 for ``CACHE_BACKEND=redis``: GET, SET (with EX/PX),
+EXISTS, DEL, SCAN, DBSIZE, FLUSHDB, PING, AUTH and SELECT. Everything lives
+in one dict in this process; there is no persistence, memory limit or
+eviction.
+
+    python -m benchmarks.fake_redis [--port 6390]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import time
+
+from yesand.resp import RespError, read_reply
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+
+class FakeRedis:
+    """An in-memory RESP server; ``start()`` returns the bound port."""
+
+    def __init__(self) -> None:
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+        self.commands = 0
+        self._server: asyncio.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    break
+                self.commands += 1
+                writer.write(_encode(self.execute(command)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _live(self, key: bytes) -> bytes | None:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command: list[bytes]):
+        name, args = command[0].upper(), command[1:]
+        if name == b"PING":
+            return "PONG"
+        if name in (b"AUTH", b"SELECT"):
+            return "OK"
+        if name == b"GET":
+            return self._live(args[0])
+        if name == b"SET":
+            expires_at = None
+            options = [arg.upper() for arg in args[2:]]
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(args[2 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = time.monotonic() + int(args[2 + options.index(b"EX") + 1])
+            self.data[args[0]] = (args[1], expires_at)
+            return "OK"
+        if name == b"EXISTS":
+            return sum(self._live(key) is not None for key in args)
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == b"SCAN":
+            pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+            keys = [key for key in list(self.data) if self._live(key) is not None]
+            return [b"0", [key for key in keys if fnmatch.fnmatchcase(key.decode(), pattern)]]
+        if name == b"DBSIZE":
+            return len(self.data)
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return "OK"
+        return RespError(f"ERR unknown command '{name.decode()}'")
+
+
+async def _main(port: int) -> None:
+    server = FakeRedis()
+    bound = await server.start(port=port)
+    print(f"fake redis listening on 127.0.0.1:{bound}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(_main(args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Load-test the service end to end against a local fake OpenAI server.
+
+Starts ``benchmarks.fake_openai`` and the app (uvicorn, pointed at the fake
+through ``OPENAI_BASE_URL``) as subprocesses, then drives each scenario with
+a fixed number of concurrent closed-loop clients and reports RPS, latency
+percentiles and, for streams, time to first token. Results are written as
+JSON; ``--compare`` checks them against an earlier run and exits non-zero on
+a regression.
+
+    python -m benchmarks.load_test [--scenarios chat,chat_stream] [--concurrency 32]
+        [--duration 10] [--output results.json] [--compare baseline.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks import fake_openai
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PERSONA_ID = "magical_realist"
+
+
+@dataclass
+class Sample:
+    ok: bool
+    latency: float
+    ttft: float | None = None
+
+
+@dataclass
+class ScenarioResult:
+    samples: list[Sample] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        ok = [s for s in self.samples if s.ok]
+        result = {
+            "requests": len(self.samples),
+            "errors": len(self.samples) - len(ok),
+            "rps": len(ok) / self.elapsed if self.elapsed else 0.0,
+            "latency_ms": _distribution([s.latency for s in ok]),
+        }
+        ttfts = [s.ttft for s in ok if s.ttft is not None]
+        if ttfts:
+            result["ttft_ms"] = _distribution(ttfts)
+        return result
+
+
+def _distribution(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] * 1000
+
+    return {
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "mean": sum(ordered) / len(ordered) * 1000,
+        "max": ordered[-1] * 1000,
+    }
+
+
+# --- Scenarios: each issues one request and returns a Sample ---
+
+
+def _conversation(seq: int) -> dict:
+    # Unique content per request so prompt caches and single-flight do not
+    # turn the test into a cache benchmark.
+    return {"persona_id": PERSONA_ID, "messages": [{"role": "human", "content": f"Scene {seq}: a quiet kitchen."}]}
+
+
+async def chat(client: httpx.AsyncClient, seq: int, ctx: dict) -> Sample:
+    started = time.perf_counter()
+    response = await client.post("/chat", json=_conversation(seq))
+    return Sample(response.status_code == 200, time.perf_counter() - started)
+
+
+async def chat_stream(client: httpx.AsyncClient, seq: int, ctx: dict) -> Sample:
+    started = time.perf_counter()
+    ttft = None
+    ok = False
+    async with client.stream("POST", "/chat/stream", json=_conversation(seq)) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if event["type"] == "chunk" and ttft is None:
+                ttft = time.perf_counter() - started
+            elif event["type"] == "done":
+                ok = response.status_code == 200
+            elif event["type"] == "error":
+                break
+    return Sample(ok, time.perf_counter() - started, ttft)
+
+
+async def generate(client: httpx.AsyncClient, seq: int, ctx: dict) -> Sample:
+    started = time.perf_counter()
+    response = await client.post("/generate", json=_conversation(seq))
+    return Sample(response.status_code == 200, time.perf_counter() - started)
+
+
+async def proxy_image(client: httpx.AsyncClient, seq: int, ctx: dict) -> Sample:
+    urls = ctx["image_urls"]
+    started = time.perf_counter()
+    response = await client.get("/proxy-image", params={"url": urls[seq % len(urls)]})
+    return Sample(response.status_code == 200 and len(response.content) > 0, time.perf_counter() - started)
+
+
+SCENARIOS = {"chat": chat, "chat_stream": chat_stream, "generate": generate, "proxy_image": proxy_image}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario, concurrency: int, duration: float, warmup: float, ctx: dict
+) -> ScenarioResult:
+    result = ScenarioResult()
+    counter = iter(range(sys.maxsize))
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < stop_at:
+            seq = next(counter)
+            request_started = time.perf_counter()
+            try:
+                sample = await scenario(client, seq, ctx)
+            except httpx.HTTPError:
+                sample = Sample(False, time.perf_counter() - request_started)
+            if request_started >= measure_from:
+                result.samples.append(sample)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - measure_from
+    return result
+
+
+# --- Process management ---
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with status {process.returncode}")
+            with contextlib.suppress(httpx.HTTPError):
+                if (await client.get(url)).status_code == 200:
+                    return
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def _start_fake_upstream(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port),
+        "--latency-ms", str(args.latency_ms),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--completion-tokens", str(args.completion_tokens),
+        "--error-rate", str(args.error_rate),
+        "--image-latency-ms", str(args.image_latency_ms),
+        "--image-bytes", str(args.image_bytes),
+    ]  # fmt: skip
+    return subprocess.Popen(command, cwd=BACKEND_DIR)
+
+
+def _start_service(port: int, upstream_port: int, cache_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1",
+        "PROXY_IMAGE_HOSTS": "127.0.0.1",
+        "IMAGE_CACHE_DIR": cache_dir,
+    }
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+
+def _stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- Reporting ---
+
+
+def _git_commit() -> str | None:
+    with contextlib.suppress(Exception):
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    return None
+
+
+def _print_table(results: dict) -> None:
+    print(f"{'scenario':<12} {'req':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttft p50':>9}")
+    for name, summary in results.items():
+        latency = summary["latency_ms"] or {"p50": 0, "p95": 0, "p99": 0}
+        ttft = summary.get("ttft_ms", {}).get("p50")
+        print(
+            f"{name:<12} {summary['requests']:>6} {summary['errors']:>5} {summary['rps']:>8.1f} "
+            f"{latency['p50']:>8.0f} {latency['p95']:>8.0f} {latency['p99']:>8.0f} "
+            f"{'' if ttft is None else f'{ttft:.0f}':>9}"
+        )
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every metric that got worse than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["rps"] and now["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {before['rps']:.1f} -> {now['rps']:.1f}")
+        for section in ("latency_ms", "ttft_ms"):
+            for key in ("p95", "p99"):
+                old, new = before.get(section, {}).get(key), now.get(section, {}).get(key)
+                if old and new and new > old * (1 + tolerance):
+                    regressions.append(f"{name}: {section} {key} {old:.0f} -> {new:.0f}")
+    return regressions
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    upstream_port, service_port = _free_port(), _free_port()
+    upstream = _start_fake_upstream(args, upstream_port)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = _start_service(service_port, upstream_port, cache_dir)
+        try:
+            await _wait_ready(f"http://127.0.0.1:{upstream_port}/stats", upstream)
+            await _wait_ready(f"http://127.0.0.1:{service_port}/ready", service)
+
+            ctx = {
+                "image_urls": [f"http://127.0.0.1:{upstream_port}/files/{i}.png" for i in range(args.proxy_urls)],
+            }
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            results = {}
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{service_port}", limits=limits, timeout=120.0
+            ) as client:
+                for name in args.scenarios:
+                    print(f"running {name} ({args.concurrency} clients, {args.duration:g}s)...", file=sys.stderr)
+                    result = await run_scenario(
+                        client, SCENARIOS[name], args.concurrency, args.duration, args.warmup, ctx
+                    )
+                    results[name] = result.summary()
+                upstream_stats = (await client.get(f"http://127.0.0.1:{upstream_port}/stats")).json()
+        finally:
+            _stop(service)
+            _stop(upstream)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "upstream": vars(fake_openai.config_from_args(args)),
+        },
+        "scenarios": results,
+        "upstream_requests": upstream_stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        type=lambda value: [name for name in value.split(",") if name],
+        default=list(SCENARIOS),
+        help=f"comma-separated subset of {','.join(SCENARIOS)}",
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--proxy-urls", type=int, default=50, help="distinct image URLs for proxy_image")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(_run(args))
+    _print_table(report["scenarios"])
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
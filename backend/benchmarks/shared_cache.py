@@ -0,0 +1,80 @@
+"""Benchmark shared cache backends: hit ratio as workers scale out, and op latency.
+
+Simulates ``--workers`` uvicorn workers behind a round-robin balancer. Each
+worker gets its own cache instance, as separate processes would. Requests
+draw keys from a skewed distribution (a few hot scenes, a long tail), so a
+cache shared by every worker keeps its hit ratio as workers are added, while
+per-process memory caches each warm up separately. The Redis backend runs
+against ``benchmarks.fake_redis`` over a real socket.
+
+    python -m benchmarks.shared_cache [--workers 1,4,8] [--requests 4000] [--keys 2000]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_redis import FakeRedis
+from yesand.cache import MemoryCache, RedisCache, SharedCache, SQLiteCache
+from yesand.resp import RespClient
+
+VALUE = b"a sun-drenched kitchen, an orange cat asleep on yellowed newspapers " * 8
+
+
+async def _run(caches: list[SharedCache], requests: list[int]) -> tuple[float, float]:
+    """Return (hit ratio, median microseconds per lookup or fill)."""
+    hits = 0
+    timings = []
+    for i, key_id in enumerate(requests):
+        cache = caches[i % len(caches)]
+        key = f"scene-{key_id}"
+        started = time.perf_counter()
+        value = await cache.get(key)
+        if value is None:
+            await cache.set(key, VALUE)
+        else:
+            hits += 1
+        timings.append(time.perf_counter() - started)
+    return hits / len(requests), statistics.median(timings) * 1e6
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    rng = random.Random(7)
+    requests = [min(int(rng.paretovariate(0.4)), args.keys) for _ in range(args.requests)]
+    server = FakeRedis()
+    client = RespClient(port=await server.start())
+
+    print(f"{'backend':<8} {'workers':>7} {'hit ratio':>10} {'median us':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            path = Path(tmp) / f"cache-{workers}.sqlite3"
+            backends = {
+                "memory": lambda ns: MemoryCache(ns, 3600, 64 * 1024 * 1024),
+                "sqlite": lambda ns: SQLiteCache(path, ns, 3600, 64 * 1024 * 1024),
+                "redis": lambda ns: RedisCache(client, ns, 3600, 64 * 1024 * 1024),
+            }
+            for name, make in backends.items():
+                caches = [make(f"bench-{workers}") for _ in range(workers)]
+                hit_ratio, median = await _run(caches, requests)
+                print(f"{name:<8} {workers:>7} {hit_ratio:>10.1%} {median:>10.0f}")
+                for cache in caches:
+                    await cache.close()
+
+    await client.close()
+    await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=lambda v: [int(s) for s in v.split(",")], default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--keys", type=int, default=2000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
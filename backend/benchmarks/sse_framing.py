@@ -0,0 +1,89 @@
+"""Benchmark SSE framing for /chat/stream: frames/sec and CPU per streamed token.
+
+Runs concurrent fake token streams through three framing paths:
+
+- ``json.dumps`` per chunk (the original ``sse_event`` path)
+- the fixed-shape ``chunk_event`` encoder, one frame per chunk
+- ``coalesce_chunks`` + ``chunk_event`` with a flush window
+
+CPU per token includes the fake token source itself; subtract the baseline
+row to get the framing cost alone.
+
+    python -m benchmarks.sse_framing [--streams N] [--tokens N] [--gap-ms MS] [--window-ms MS]
+"""
+
+import argparse
+import asyncio
+import time
+
+from yesand.sse import chunk_event, coalesce_chunks, sse_event
+
+TOKENS = ["Yes", ",", " and", " the", " lantern", " hums", " softly", " while", " moths", " circle", "."]
+
+
+async def _tokens(count: int, gap: float):
+    for i in range(count):
+        if gap:
+            await asyncio.sleep(gap)
+        else:
+            await asyncio.sleep(0)
+        yield TOKENS[i % len(TOKENS)]
+
+
+async def _source_only(count: int, gap: float, _window: float, sink: list) -> None:
+    async for chunk in _tokens(count, gap):
+        pass
+
+
+async def _json_dumps(count: int, gap: float, _window: float, sink: list) -> None:
+    async for chunk in _tokens(count, gap):
+        sink.append(sse_event({"type": "chunk", "content": chunk}))
+
+
+async def _fast_encoder(count: int, gap: float, _window: float, sink: list) -> None:
+    async for chunk in _tokens(count, gap):
+        sink.append(chunk_event(chunk))
+
+
+async def _coalesced(count: int, gap: float, window: float, sink: list) -> None:
+    async for chunk in coalesce_chunks(_tokens(count, gap), window=window, max_bytes=1024):
+        sink.append(chunk_event(chunk))
+
+
+async def _run(path, streams: int, tokens: int, gap: float, window: float) -> tuple[int, int, float, float]:
+    sinks = [[] for _ in range(streams)]
+    wall, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(path(tokens, gap, window, sink) for sink in sinks))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    frames = sum(len(sink) for sink in sinks)
+    size = sum(len(frame) for sink in sinks for frame in sink)
+    return frames, size, wall, cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--gap-ms", type=float, default=1.0, help="delay between upstream tokens")
+    parser.add_argument("--window-ms", type=float, default=20.0, help="coalescing flush window")
+    args = parser.parse_args()
+
+    gap, window = args.gap_ms / 1000, args.window_ms / 1000
+    total_tokens = args.streams * args.tokens
+    cases = {
+        "source only (baseline)": _source_only,
+        "json.dumps per chunk": _json_dumps,
+        "chunk_event per chunk": _fast_encoder,
+        f"coalesced ({args.window_ms:g} ms)": _coalesced,
+    }
+
+    print(f"{args.streams} streams x {args.tokens} tokens, {args.gap_ms:g} ms between tokens")
+    print(f"{'case':<24} {'frames':>8} {'bytes':>10} {'frames/s':>10} {'CPU/token':>11}")
+    for name, path in cases.items():
+        frames, size, wall, cpu = asyncio.run(_run(path, args.streams, args.tokens, gap, window))
+        rate = frames / wall if frames else 0.0
+        print(f"{name:<24} {frames:>8} {size:>10} {rate:>10.0f} {cpu / total_tokens * 1e6:>8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
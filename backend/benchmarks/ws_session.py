@@ -0,0 +1,153 @@
+"""Compare multi-turn sessions over /chat/stream and /ws/session.
+
+Starts the fake upstream and the app the same way ``benchmarks.load_test``
+does. ``--sessions`` concurrent users then each play ``--turns`` turns,
+first over ``/chat/stream`` (re-sending the full history every turn, as the
+frontend does) and then over one ``/ws/session`` socket per user. Reports
+per-turn latency, time to first chunk and the bytes each turn uploads. The
+WebSocket client is the ``websockets`` package that ``uvicorn[standard]``
+already installs.
+
+    python -m benchmarks.ws_session [--sessions 16] [--turns 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks import fake_openai
+from benchmarks.load_test import (
+    PERSONA_ID,
+    _distribution,
+    _free_port,
+    _start_fake_upstream,
+    _start_service,
+    _stop,
+    _wait_ready,
+)
+
+
+class Turns:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.ttfts: list[float] = []
+        self.upload_bytes = 0
+
+    def summary(self) -> dict:
+        return {
+            "turns": len(self.latencies),
+            "latency_ms": _distribution(self.latencies),
+            "ttft_ms": _distribution(self.ttfts),
+            "upload_bytes_per_turn": self.upload_bytes / len(self.latencies) if self.latencies else 0,
+        }
+
+
+def _line(user: int, turn: int) -> str:
+    return f"User {user}, turn {turn}: and then the kettle starts to sing."
+
+
+async def http_session(client: httpx.AsyncClient, user: int, turns: int, result: Turns) -> None:
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "human", "content": _line(user, turn)})
+        body = json.dumps({"persona_id": PERSONA_ID, "messages": messages}).encode()
+        started = time.perf_counter()
+        ttft = None
+        reply = []
+        async with client.stream(
+            "POST", "/chat/stream", content=body, headers={"Content-Type": "application/json"}
+        ) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "chunk":
+                    ttft = ttft or time.perf_counter() - started
+                    reply.append(event["content"])
+                elif event["type"] in ("done", "error"):
+                    break
+        result.latencies.append(time.perf_counter() - started)
+        result.ttfts.append(ttft or result.latencies[-1])
+        result.upload_bytes += len(body)
+        messages.append({"role": "ai", "content": "".join(reply)})
+
+
+async def ws_session(url: str, user: int, turns: int, result: Turns) -> None:
+    async with connect(url) as ws:
+        start = json.dumps({"type": "start", "persona_id": PERSONA_ID})
+        await ws.send(start)
+        await ws.recv()
+        result.upload_bytes += len(start)
+        for turn in range(turns):
+            frame = json.dumps({"type": "chat", "content": _line(user, turn)})
+            started = time.perf_counter()
+            ttft = None
+            await ws.send(frame)
+            while True:
+                event = json.loads(await ws.recv())
+                if event["type"] == "chunk":
+                    ttft = ttft or time.perf_counter() - started
+                elif event["type"] in ("done", "error"):
+                    break
+            result.latencies.append(time.perf_counter() - started)
+            result.ttfts.append(ttft or result.latencies[-1])
+            result.upload_bytes += len(frame)
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    upstream_port, service_port = _free_port(), _free_port()
+    upstream = _start_fake_upstream(args, upstream_port)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = _start_service(service_port, upstream_port, cache_dir)
+        try:
+            await _wait_ready(f"http://127.0.0.1:{upstream_port}/stats", upstream)
+            await _wait_ready(f"http://127.0.0.1:{service_port}/ready", service)
+
+            results = {}
+            print(f"running chat_stream ({args.sessions} users x {args.turns} turns)...", file=sys.stderr)
+            http = Turns()
+            limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{service_port}", limits=limits, timeout=120.0
+            ) as client:
+                await asyncio.gather(*(http_session(client, user, args.turns, http) for user in range(args.sessions)))
+            results["chat_stream"] = http.summary()
+
+            print(f"running ws_session ({args.sessions} users x {args.turns} turns)...", file=sys.stderr)
+            ws = Turns()
+            url = f"ws://127.0.0.1:{service_port}/ws/session"
+            await asyncio.gather(*(ws_session(url, user, args.turns, ws) for user in range(args.sessions)))
+            results["ws_session"] = ws.summary()
+        finally:
+            _stop(service)
+            _stop(upstream)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent users")
+    parser.add_argument("--turns", type=int, default=20, help="turns per user")
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args))
+    print(f"{'mode':<12} {'turns':>6} {'p50 ms':>8} {'p95 ms':>8} {'ttft p50':>9} {'upload B/turn':>14}")
+    for name, summary in results.items():
+        latency, ttft = summary["latency_ms"], summary["ttft_ms"]
+        print(
+            f"{name:<12} {summary['turns']:>6} {latency['p50']:>8.1f} {latency['p95']:>8.1f} "
+            f"{ttft['p50']:>9.1f} {summary['upload_bytes_per_turn']:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 """FastAPI application for the Yes-And collaborative image chatbot."""
 
-import json
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
 
 from dotenv import load_dotenv
 
@@ -8,22 +13,84 @@ load_dotenv()
 
 from urllib.parse import urlparse
 
-import httpx
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
 from yesand.agent import run_agent_turn, stream_agent_turn
-from yesand.image import generate_image
-from yesand.persona import get_persona, load_personas
-from yesand.synthesizer import synthesize_image_prompt
+from yesand.cache import SharedCache, aclose_shared_caches, create_shared_cache
+from yesand.clients import aclose_clients, get_http_client, pool_stats
+from yesand.compaction import get_compactor
+from yesand.config import (
+    get_batch_concurrency,
+    get_idempotency_ttl,
+    get_opening_pool_enabled,
+    get_proxy_image_hosts,
+    get_speculative_synthesis_enabled,
+    get_sse_coalesce_max_bytes,
+    get_sse_coalesce_window_ms,
+    get_sse_disconnect_poll_interval,
+    get_sse_heartbeat_interval,
+    get_ws_session_idle_timeout,
+)
+from yesand.conversation import Conversation
+from yesand.conversation_store import get_conversation_store, new_conversation_id, resolve_conversation
+from yesand.hedging import hedging_stats
+from yesand.image import MAX_IMAGES_PER_REQUEST, generate_image, generate_images
+from yesand.image_cache import get_image_cache
+from yesand.image_store import (
+    CACHE_CONTROL as IMAGE_STORE_CACHE_CONTROL,
+    close_image_store,
+    get_image_store,
+    lookup_stored_url,
+    stored_variant_urls,
+)
+from yesand.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from yesand.openings import get_opening_pool, suggest_word, take_opening
+from yesand.persona import get_persona, persona_registry
+from yesand.prebuilt import PrebuiltResponse, etag_matches, prebuild_json
+from yesand.providers import local_image_name, parse_local_image_name, placeholder_png
+from yesand.scheduler import get_scheduler
+from yesand.session import ChatSession, session_stats
+from yesand.singleflight import SingleFlight
+from yesand.speculation import get_speculator, speculate_after_turn
+from yesand.sse import chunk_event, coalesce_chunks, sse_event, stop_on_disconnect, with_heartbeats
+from yesand.synthesizer import get_prompt_cache, stream_image_prompt, synthesize_image_prompt
+from yesand.warmup import get_warmup, warm_up
 from yesand.words import get_suggestion
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    warmup = asyncio.create_task(warm_up())
+    persona_watcher = asyncio.create_task(persona_registry.watch())
+    opening_refiller = asyncio.create_task(get_opening_pool().run()) if get_opening_pool_enabled() else None
+    yield
+    warmup.cancel()
+    persona_watcher.cancel()
+    if opening_refiller is not None:
+        opening_refiller.cancel()
+    close_image_store()
+    await aclose_shared_caches()
+    await aclose_clients()
+
+
+PROXY_IMAGE_FILENAME = "yesand.png"
+
+generate_flights = SingleFlight()
+IDEMPOTENCY_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+_idempotency_cache: SharedCache | None = None
+# Fingerprint of the running /generate pipeline for each Idempotency-Key.
+_idempotency_in_flight: dict[str, str] = {}
+
 app = FastAPI(
     title="Yes-And Chatbot",
     description="Collaborative image creation through improv-style conversation",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -33,6 +100,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 # --- Request / Response Models ---
@@ -43,23 +111,49 @@ class Message(BaseModel):
     content: str
 
 
-class ChatRequest(BaseModel):
+class ConversationRequest(BaseModel):
     persona_id: str
     messages: list[Message]
+    # Delta protocol (opt-in): set ``stateful`` to have the server remember the
+    # conversation, then send only new messages with the returned
+    # ``conversation_id`` and ``prefix_hash``.
+    stateful: bool = False
+    conversation_id: str | None = None
+    prefix_hash: str | None = None
+
+
+class ChatRequest(ConversationRequest):
+    pass
 
 
 class ChatResponse(BaseModel):
     message: str
+    conversation_id: str | None = None
+    prefix_hash: str | None = None
 
 
-class GenerateRequest(BaseModel):
-    persona_id: str
-    messages: list[Message]
+class GenerateRequest(ConversationRequest):
+    bypass_cache: bool = False
 
 
 class GenerateResponse(BaseModel):
     image_url: str
     prompt_used: str
+    # Pre-rendered variants (thumbnail, WebP, AVIF) when the image store is on.
+    image_variants: dict[str, str] | None = None
+    conversation_id: str | None = None
+    prefix_hash: str | None = None
+
+
+class BatchItem(BaseModel):
+    persona_id: str
+    variants: int = Field(default=1, ge=1, le=MAX_IMAGES_PER_REQUEST)
+
+
+class GenerateBatchRequest(BaseModel):
+    messages: list[Message]
+    items: list[BatchItem] = Field(min_length=1, max_length=16)
+    bypass_cache: bool = False
 
 
 class PersonaAestheticMeta(BaseModel):
@@ -82,13 +176,37 @@ class SuggestResponse(BaseModel):
     word: str
 
 
+class StatsResponse(BaseModel):
+    pool: dict
+    prompt_cache: dict
+    idempotency: dict
+    generate: dict
+    conversations: dict
+    compaction: dict
+    speculation: dict
+    openings: dict
+    sessions: dict
+    scheduler: dict
+    hedging: dict
+
+
 # --- Routes ---
 
 
-@app.get("/personas", response_model=PersonasResponse)
-async def list_personas():
-    """Return metadata for all available personas."""
-    all_personas = load_personas()
+# Persona metadata only changes when the registry swaps in a new snapshot;
+# browsers may reuse it briefly and must revalidate afterwards.
+PERSONAS_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+_personas_response: tuple[str, PrebuiltResponse] | None = None
+
+
+def _prebuilt_personas() -> PrebuiltResponse:
+    """Serialized /personas body for the current persona snapshot."""
+    global _personas_response
+    snapshot = persona_registry.snapshot()
+    cached = _personas_response
+    if cached is not None and cached[0] == snapshot.version:
+        return cached[1]
     meta = [
         PersonaMeta(
             id=p.id,
@@ -99,99 +217,500 @@ async def list_personas():
                 pulls_away_from=p.aesthetic.pulls_away_from,
             ),
         )
-        for p in all_personas.values()
+        for p in snapshot.personas.values()
     ]
-    return PersonasResponse(personas=meta)
+    prebuilt = prebuild_json(PersonasResponse(personas=meta).model_dump(), PERSONAS_CACHE_CONTROL)
+    _personas_response = (snapshot.version, prebuilt)
+    return prebuilt
+
+
+@app.get("/personas", response_model=PersonasResponse)
+async def list_personas(
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    """Return metadata for all available personas.
+
+    The body is serialized and compressed once per persona snapshot and
+    revalidated with a strong ETag.
+    """
+    return _prebuilt_personas().respond(if_none_match, accept_encoding)
 
 
-@app.post("/chat", response_model=ChatResponse)
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def chat(request: ChatRequest):
     """Run a single yes-and conversation turn."""
     persona = get_persona(request.persona_id)
     if persona is None:
         raise HTTPException(status_code=404, detail=f"Unknown persona: {request.persona_id}")
 
-    history = [msg.model_dump() for msg in request.messages]
+    history, conversation_id = _resolve_history(request)
 
-    try:
-        reply = await run_agent_turn(persona, history)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"LLM error: {e}")
+    reply = take_opening(persona, history)
+    if reply is None:
+        try:
+            reply = await run_agent_turn(persona, history)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"LLM error: {e}")
 
-    return ChatResponse(message=reply)
+    prefix_hash = _remember(conversation_id, history, reply)
+    speculate_after_turn(persona, history, reply, conversation_id)
+    return ChatResponse(message=reply, conversation_id=conversation_id, prefix_hash=prefix_hash)
 
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """Stream a yes-and conversation turn as server-sent events."""
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Stream a yes-and conversation turn as server-sent events.
+
+    If the client disconnects mid-stream the upstream stream is cancelled.
+    """
+    persona = get_persona(request.persona_id)
+    if persona is None:
+        raise HTTPException(status_code=404, detail=f"Unknown persona: {request.persona_id}")
+
+    history, conversation_id = _resolve_history(request)
+    opening = take_opening(persona, history)
+
+    async def event_generator():
+        try:
+            reply = []
+            if opening is not None:
+                chunks = _single_chunk(opening)
+            else:
+                chunks = coalesce_chunks(
+                    stream_agent_turn(persona, history),
+                    window=get_sse_coalesce_window_ms() / 1000,
+                    max_bytes=get_sse_coalesce_max_bytes(),
+                )
+            async for chunk in chunks:
+                reply.append(chunk)
+                yield chunk_event(chunk)
+            done = {"type": "done"}
+            reply_text = "".join(reply)
+            prefix_hash = _remember(conversation_id, history, reply_text)
+            speculate_after_turn(persona, history, reply_text, conversation_id)
+            if conversation_id is not None:
+                done.update(conversation_id=conversation_id, prefix_hash=prefix_hash)
+            yield sse_event(done)
+        except Exception as e:
+            yield sse_event({"type": "error", "message": str(e)})
+
+    return _event_stream(event_generator(), http_request)
+
+
+@app.websocket("/ws/session")
+async def ws_session(websocket: WebSocket):
+    """Interactive chat over one WebSocket: pick a persona once, then send only new turns.
+
+    The frame protocol is described in ``yesand/session.py``.
+    """
+    await ChatSession(websocket, idle_timeout=get_ws_session_idle_timeout()).run()
+
+
+@app.post("/generate", response_model=GenerateResponse, response_model_exclude_none=True)
+async def generate(request: GenerateRequest, idempotency_key: str | None = Header(default=None)):
+    """Synthesize an image prompt from conversation and generate the image.
+
+    Identical concurrent requests share one in-flight pipeline. With an
+    ``Idempotency-Key`` header, a completed result is replayed for retries
+    within ``IDEMPOTENCY_TTL`` seconds.
+    """
+    persona = get_persona(request.persona_id)
+    if persona is None:
+        raise HTTPException(status_code=404, detail=f"Unknown persona: {request.persona_id}")
+
+    history, conversation_id = _resolve_history(request)
+    prefix_hash = _remember(conversation_id, history)
+    fingerprint = _generate_fingerprint(request.persona_id, history, request.bypass_cache)
+
+    if idempotency_key:
+        replay = await _get_idempotency_cache().get(idempotency_key)
+        if replay is not None:
+            replay_fingerprint, response = _load_replay(replay)
+            if replay_fingerprint != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+            return response.model_copy(update={"conversation_id": conversation_id, "prefix_hash": prefix_hash})
+
+    async def run() -> GenerateResponse:
+        if get_speculative_synthesis_enabled() and not request.bypass_cache:
+            await get_speculator().claim(persona, history)
+        try:
+            prompt = await synthesize_image_prompt(persona, history, use_cache=not request.bypass_cache)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Synthesizer error: {e}")
+
+        try:
+            image_url = await generate_image(prompt)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Image generation error: {e}")
+
+        response = GenerateResponse(
+            image_url=image_url, prompt_used=prompt, image_variants=stored_variant_urls(image_url)
+        )
+        if idempotency_key:
+            await _get_idempotency_cache().set(idempotency_key, _dump_replay(fingerprint, response))
+        return response
+
+    if idempotency_key:
+        # A retry may join the running pipeline, but only with the same body.
+        running = _idempotency_in_flight.setdefault(idempotency_key, fingerprint)
+        if running != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+
+        async def run_keyed() -> GenerateResponse:
+            try:
+                return await run()
+            finally:
+                _idempotency_in_flight.pop(idempotency_key, None)
+
+        response = await generate_flights.do(f"idempotency:{idempotency_key}", run_keyed)
+    else:
+        response = await generate_flights.do(fingerprint, run)
+    return response.model_copy(update={"conversation_id": conversation_id, "prefix_hash": prefix_hash})
+
+
+@app.post("/generate/stream")
+async def generate_stream(request: GenerateRequest, http_request: Request):
+    """Stream the generate pipeline as server-sent events.
+
+    Emits ``prompt_chunk`` events as the synthesizer produces the prompt,
+    then ``prompt_ready``, then ``image`` once the image exists, and finally
+    ``done``. Heartbeat comments keep the connection alive while waiting.
+    """
     persona = get_persona(request.persona_id)
     if persona is None:
         raise HTTPException(status_code=404, detail=f"Unknown persona: {request.persona_id}")
 
-    history = [msg.model_dump() for msg in request.messages]
+    history, conversation_id = _resolve_history(request)
+    prefix_hash = _remember(conversation_id, history)
+    use_cache = not request.bypass_cache
 
     async def event_generator():
+        if get_speculative_synthesis_enabled() and use_cache:
+            await get_speculator().claim(persona, history)
+
+        parts = []
         try:
-            async for chunk in stream_agent_turn(persona, history):
-                payload = {"type": "chunk", "content": chunk}
-                yield f"data: {json.dumps(payload)}\n\n"
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            async for chunk in stream_image_prompt(persona, history, use_cache=use_cache):
+                parts.append(chunk)
+                yield sse_event({"type": "prompt_chunk", "content": chunk})
         except Exception as e:
-            payload = {"type": "error", "message": str(e)}
-            yield f"data: {json.dumps(payload)}\n\n"
+            yield sse_event({"type": "error", "message": f"Synthesizer error: {e}"})
+            return
+        prompt = "".join(parts)
+        yield sse_event({"type": "prompt_ready", "prompt": prompt})
+
+        try:
+            image_url = await generate_image(prompt)
+        except Exception as e:
+            yield sse_event({"type": "error", "message": f"Image generation error: {e}"})
+            return
+        image = {"type": "image", "image_url": image_url, "prompt_used": prompt}
+        variants = stored_variant_urls(image_url)
+        if variants:
+            image["image_variants"] = variants
+        yield sse_event(image)
+
+        done = {"type": "done"}
+        if conversation_id is not None:
+            done.update(conversation_id=conversation_id, prefix_hash=prefix_hash)
+        yield sse_event(done)
+
+    return _event_stream(with_heartbeats(event_generator(), get_sse_heartbeat_interval()), http_request)
+
+
+@app.post("/generate/batch")
+async def generate_batch(request: GenerateBatchRequest, http_request: Request):
+    """Render one conversation with several personas and/or variants.
+
+    Items run concurrently (at most ``BATCH_CONCURRENCY`` at a time) and are
+    streamed back as server-sent ``item`` / ``item_error`` events in
+    completion order, followed by a ``done`` summary.
+    """
+    personas = []
+    for item in request.items:
+        persona = get_persona(item.persona_id)
+        if persona is None:
+            raise HTTPException(status_code=404, detail=f"Unknown persona: {item.persona_id}")
+        personas.append(persona)
+
+    history = Conversation.from_messages(request.messages)
+    semaphore = asyncio.Semaphore(get_batch_concurrency())
+
+    async def run_item(index: int) -> dict:
+        item, persona = request.items[index], personas[index]
+        event = {"index": index, "persona_id": item.persona_id}
+        async with semaphore:
+            try:
+                prompt = await synthesize_image_prompt(persona, history, use_cache=not request.bypass_cache)
+            except Exception as e:
+                return {"type": "item_error", **event, "message": f"Synthesizer error: {e}"}
+            try:
+                image_urls = await generate_images(prompt, n=item.variants)
+            except Exception as e:
+                return {"type": "item_error", **event, "message": f"Image generation error: {e}"}
+        return {"type": "item", **event, "prompt_used": prompt, "image_urls": image_urls}
+
+    async def event_generator():
+        tasks = [asyncio.create_task(run_item(index)) for index in range(len(request.items))]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                failed += result["type"] == "item_error"
+                yield sse_event(result)
+            yield sse_event({"type": "done", "succeeded": len(tasks) - failed, "failed": failed})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return _event_stream(with_heartbeats(event_generator(), get_sse_heartbeat_interval()), http_request)
 
+
+def _event_stream(events: AsyncIterator[str], http_request: Request) -> StreamingResponse:
+    """SSE response that cancels ``events`` (and the upstream work behind it) when the client disconnects."""
     return StreamingResponse(
-        event_generator(),
+        stop_on_disconnect(events, http_request.is_disconnected, get_sse_disconnect_poll_interval()),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache"},
     )
 
 
-@app.post("/generate", response_model=GenerateResponse)
-async def generate(request: GenerateRequest):
-    """Synthesize an image prompt from conversation and generate the image."""
-    persona = get_persona(request.persona_id)
-    if persona is None:
-        raise HTTPException(status_code=404, detail=f"Unknown persona: {request.persona_id}")
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def _resolve_history(request: ConversationRequest) -> tuple[Conversation, str | None]:
+    """Expand a request into the full history, honoring the delta protocol.
+
+    Returns the history plus the conversation id when the client opted in.
+    An unknown or stale prefix is a 409 so the client can fall back to
+    resending the full history.
+    """
+    delta = Conversation.from_messages(request.messages)
+    if request.conversation_id is None:
+        return delta, new_conversation_id() if request.stateful else None
+
+    conversation = resolve_conversation(request.conversation_id, request.prefix_hash, delta)
+    if conversation is None:
+        raise HTTPException(status_code=409, detail="Unknown conversation prefix; resend the full history")
+    return conversation, request.conversation_id
+
+
+def _remember(conversation_id: str | None, conversation: Conversation, reply: str | None = None) -> str | None:
+    """Store the conversation (plus the AI reply, if any) and return its prefix hash."""
+    if conversation_id is None:
+        return None
+    if reply is not None:
+        conversation = conversation.add("ai", reply)
+    get_conversation_store().put(conversation_id, conversation)
+    return conversation.prefix_hash
+
+
+def _generate_fingerprint(persona_id: str, history: Conversation, bypass_cache: bool) -> str:
+    payload = f"{persona_id}\x00{int(bypass_cache)}\x00{history.prefix_hash}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _get_idempotency_cache() -> SharedCache:
+    global _idempotency_cache
+    if _idempotency_cache is None:
+        _idempotency_cache = create_shared_cache(
+            "idempotency",
+            ttl=get_idempotency_ttl(),
+            max_bytes=IDEMPOTENCY_CACHE_MAX_BYTES,
+            max_entries=4096,
+            on_close=_forget_idempotency_cache,
+        )
+    return _idempotency_cache
+
+
+def _forget_idempotency_cache() -> None:
+    global _idempotency_cache
+    _idempotency_cache = None
 
-    history = [msg.model_dump() for msg in request.messages]
 
-    try:
-        prompt = await synthesize_image_prompt(persona, history)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Synthesizer error: {e}")
+def _dump_replay(fingerprint: str, response: GenerateResponse) -> bytes:
+    return f"{fingerprint}\n{response.model_dump_json(exclude_none=True)}".encode()
 
-    try:
-        image_url = await generate_image(prompt)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Image generation error: {e}")
 
-    return GenerateResponse(image_url=image_url, prompt_used=prompt)
+def _load_replay(data: bytes) -> tuple[str, GenerateResponse]:
+    fingerprint, _, body = data.decode().partition("\n")
+    return fingerprint, GenerateResponse.model_validate_json(body)
 
 
 @app.get("/suggest", response_model=SuggestResponse)
-async def suggest():
-    """Return a single random audience suggestion word."""
-    return SuggestResponse(word=get_suggestion())
+async def suggest(persona_id: str | None = None):
+    """Return a single audience suggestion word.
+
+    With the opening pool on and a ``persona_id``, the word is one whose
+    first /chat turn can be answered from the pool.
+    """
+    word = suggest_word(get_persona(persona_id) if persona_id else None)
+    return SuggestResponse(word=word or get_suggestion())
+
+
+@app.get("/stats", response_model=StatsResponse)
+async def stats():
+    """Return runtime statistics for upstream connections and caches."""
+    return StatsResponse(
+        pool=pool_stats(),
+        prompt_cache=get_prompt_cache().stats(),
+        idempotency=_get_idempotency_cache().stats(),
+        generate=generate_flights.stats(),
+        conversations=get_conversation_store().stats(),
+        compaction=get_compactor().stats(),
+        speculation=get_speculator().stats(),
+        openings=get_opening_pool().stats(),
+        sessions=session_stats(),
+        scheduler=get_scheduler().stats(),
+        hedging=hedging_stats(),
+    )
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the startup warm-up has loaded the SDKs, 503 until then."""
+    status = get_warmup().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text-format metrics for this process."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/local-images/{name}", include_in_schema=False)
+async def local_image(name: str, request: Request):
+    """Serve a placeholder image generated by the local model provider."""
+    return await _local_image_response(name, request)
+
+
+async def _local_image_response(name: str, request: Request, download: bool = False) -> Response:
+    parsed = parse_local_image_name(name)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="Unknown image")
+    digest, width, height = parsed
+    etag = f'"{digest[:32]}-{width}x{height}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if download:
+        headers["Content-Disposition"] = f'attachment; filename="{PROXY_IMAGE_FILENAME}"'
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(await placeholder_png(digest, width, height), media_type="image/png", headers=headers)
+
+
+@app.get("/images/{name}", include_in_schema=False)
+async def stored_image(name: str, request: Request):
+    """Serve a generated image from the local image store."""
+    image = get_image_store().lookup(name)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Unknown image")
+    return _stored_file_response(image.path, image.media_type, image.etag, request)
+
+
+@app.get("/images/{digest}/{variant}", include_in_schema=False)
+async def stored_image_variant(digest: str, variant: str, request: Request):
+    """Serve a pre-rendered variant (``thumb.webp``, ``web.webp``, ``web.avif``) of a stored image."""
+    found = await get_image_store().variant(digest, variant)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Unknown image variant")
+    path, spec = found
+    return _stored_file_response(path, spec.media_type, f'"{digest}-{spec.name}-{spec.extension}"', request)
+
+
+def _stored_file_response(
+    path: Path, media_type: str, etag: str, request: Request, filename: str | None = None
+) -> Response:
+    # Stored files are content-addressed and never change, so clients may keep them forever.
+    headers = {"ETag": etag, "Cache-Control": IMAGE_STORE_CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers, filename=filename)
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and etag_matches(if_none_match, frozenset((etag,)))
+
+
+def _is_proxy_host_allowed(hostname: str | None) -> bool:
+    if not hostname:
+        return False
+    return any(hostname == host or hostname.endswith(f".{host}") for host in get_proxy_image_hosts())
 
 
 @app.get("/proxy-image")
-async def proxy_image(url: str):
-    """Proxy an image URL and return it with download headers."""
-    parsed = urlparse(url)
-    if not parsed.hostname or not parsed.hostname.endswith(".blob.core.windows.net"):
+async def proxy_image(url: str, request: Request):
+    """Proxy an image URL and return it with download headers.
+
+    The first download streams through from upstream while being written to
+    the on-disk image cache; repeats are served from disk with Range and
+    ETag/If-None-Match support.
+    """
+    local_name = local_image_name(url)
+    if local_name is not None:
+        return await _local_image_response(local_name, request, download=True)
+
+    stored = lookup_stored_url(url)
+    if stored is not None:
+        return _stored_file_response(stored.path, stored.media_type, stored.etag, request, PROXY_IMAGE_FILENAME)
+
+    if not _is_proxy_host_allowed(urlparse(url).hostname):
         raise HTTPException(status_code=400, detail="Invalid image URL")
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, timeout=30.0)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=502, detail="Failed to fetch image")
+    # Cache file I/O runs on worker threads, never on the event loop.
+    cache = get_image_cache()
+    cached = await asyncio.to_thread(cache.lookup, url)
+    if cached is not None:
+        if _not_modified(request, cached.etag):
+            return Response(status_code=304, headers={"ETag": cached.etag})
+        try:
+            # Another request's eviction may have removed the blob since the
+            # lookup; that is a miss, not a 500 from FileResponse.
+            stat = await asyncio.to_thread(os.stat, cached.path)
+        except FileNotFoundError:
+            pass
+        else:
+            return FileResponse(
+                cached.path,
+                stat_result=stat,
+                media_type=cached.content_type,
+                filename=PROXY_IMAGE_FILENAME,
+                headers={"ETag": cached.etag},
+            )
+
+    client = get_http_client()
+    upstream = await client.send(client.build_request("GET", url, timeout=30.0), stream=True)
+    if upstream.status_code != 200:
+        await upstream.aclose()
+        raise HTTPException(status_code=502, detail="Failed to fetch image")
+
+    content_type = upstream.headers.get("content-type", "image/png")
+    headers = {"Content-Disposition": f'attachment; filename="{PROXY_IMAGE_FILENAME}"'}
+    # We stream decoded bytes, so the upstream length only holds for an unencoded body.
+    if "content-length" in upstream.headers and upstream.headers.get("content-encoding", "identity") == "identity":
+        headers["Content-Length"] = upstream.headers["content-length"]
+
+    async def stream_and_cache():
+        writer = None
+        try:
+            writer = await asyncio.to_thread(cache.writer, url, content_type)
+            async for chunk in upstream.aiter_bytes():
+                await asyncio.to_thread(writer.write, chunk)
+                yield chunk
+            await asyncio.to_thread(writer.commit)
+        finally:
+            if writer is not None:
+                await asyncio.to_thread(writer.abort)
+            await upstream.aclose()
 
-    content_type = resp.headers.get("content-type", "image/png")
-    return Response(
-        content=resp.content,
+    return StreamingResponse(
+        stream_and_cache(),
         media_type=content_type,
-        headers={"Content-Disposition": 'attachment; filename="yesand.png"'},
+        headers=headers,
+        background=BackgroundTask(cache.evict),
     )
 
 
@@ -4,7 +4,14 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 from langchain_core.messages import SystemMessage
 
-from yesand.agent import run_agent_turn
+from yesand.agent import run_agent_turn, stream_agent_turn
+from yesand.compaction import CompactedHistory
+from yesand.conversation import Conversation
+from yesand.metrics import stream_cancellations, stream_tokens_saved
+
+
+def _provider(llm):
+    return MagicMock(chat_model=MagicMock(return_value=llm))
 
 
 class TestRunAgentTurn:
@@ -14,7 +21,7 @@ class TestRunAgentTurn:
         mock_llm = MagicMock()
         mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="Yes, and a bird lands on the windowsill."))
 
-        with patch("yesand.agent.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.agent.get_provider", return_value=_provider(mock_llm)):
             result = await run_agent_turn(sample_persona, sample_history)
 
         assert isinstance(result, str)
@@ -24,7 +31,7 @@ class TestRunAgentTurn:
         mock_llm = MagicMock()
         mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="response"))
 
-        with patch("yesand.agent.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.agent.get_provider", return_value=_provider(mock_llm)):
             await run_agent_turn(sample_persona, sample_history)
 
         call_args = mock_llm.ainvoke.call_args[0][0]
@@ -35,7 +42,7 @@ class TestRunAgentTurn:
         mock_llm = MagicMock()
         mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="response"))
 
-        with patch("yesand.agent.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.agent.get_provider", return_value=_provider(mock_llm)):
             await run_agent_turn(sample_persona, sample_history)
 
         call_args = mock_llm.ainvoke.call_args[0][0]
@@ -46,10 +53,97 @@ class TestRunAgentTurn:
         mock_llm = MagicMock()
         mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="Let's begin!"))
 
-        with patch("yesand.agent.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.agent.get_provider", return_value=_provider(mock_llm)):
             result = await run_agent_turn(sample_persona, [])
 
         assert isinstance(result, str)
         call_args = mock_llm.ainvoke.call_args[0][0]
         # Only the system message
         assert len(call_args) == 1
+
+    async def test_compacted_summary_inserted(self, sample_persona, sample_history):
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="response"))
+        compactor = MagicMock()
+        compactor.compact.return_value = CompactedHistory(
+            "A sunny kitchen.", Conversation.from_dicts(sample_history[-2:]), 100, 40
+        )
+
+        with (
+            patch("yesand.agent.get_provider", return_value=_provider(mock_llm)),
+            patch("yesand.agent.get_compactor", return_value=compactor),
+        ):
+            await run_agent_turn(sample_persona, sample_history)
+
+        call_args = mock_llm.ainvoke.call_args[0][0]
+        # system + summary + 2 recent messages
+        assert len(call_args) == 4
+        assert call_args[1].content == "Scene so far: A sunny kitchen."
+
+
+def _streaming_llm(chunks):
+    async def astream(_messages):
+        for content in chunks:
+            yield MagicMock(content=content)
+
+    mock_llm = MagicMock()
+    mock_llm.astream = astream
+    return mock_llm
+
+
+class TestStreamAgentTurn:
+    """Tests for stream_agent_turn."""
+
+    async def _collect(self, persona, chunks):
+        with patch("yesand.agent.get_provider", return_value=_provider(_streaming_llm(chunks))):
+            return [c async for c in stream_agent_turn(persona, [])]
+
+    async def test_prefix_split_across_chunks_is_kept(self, sample_persona):
+        result = await self._collect(sample_persona, ["  Ye", "s, a", "nd a fox", " appears."])
+        assert "".join(result) == "  Yes, and a fox appears."
+        assert result[-1] == " appears."
+
+    async def test_missing_prefix_is_added(self, sample_persona):
+        result = await self._collect(sample_persona, ["A fox ", "appears."])
+        assert "".join(result) == "yes, and A fox appears."
+
+    async def test_short_reply_is_completed(self, sample_persona):
+        result = await self._collect(sample_persona, ["Ok"])
+        assert result == ["yes, and Ok"]
+
+    async def test_closed_stream_counts_cancellation_and_saved_tokens(self, sample_persona):
+        chunks = ["Yes, and", " a", " fox", " hops", " over", " the", " fence", "."]
+        model = "test-cancel-model"
+        with (
+            patch("yesand.agent.get_text_model", return_value=model),
+            patch("yesand.agent.get_provider", return_value=_provider(_streaming_llm(chunks))),
+        ):
+            # A completed stream sets the typical length for this model.
+            [c async for c in stream_agent_turn(sample_persona, [])]
+
+            stream = stream_agent_turn(sample_persona, [])
+            await anext(stream)
+            await anext(stream)
+            await stream.aclose()
+
+        assert stream_cancellations.labels("agent_stream", model).value == 1
+        assert stream_tokens_saved.labels("agent_stream", model).value == len(chunks) - 2
+
+    async def test_closing_the_turn_closes_the_upstream_stream(self, sample_persona):
+        closed = []
+
+        async def astream(_messages):
+            try:
+                for content in ["Yes, and", " a", " fox", " hops"]:
+                    yield MagicMock(content=content)
+            finally:
+                closed.append(True)
+
+        llm = MagicMock(astream=astream)
+        with patch("yesand.agent.get_provider", return_value=_provider(llm)):
+            stream = stream_agent_turn(sample_persona, [])
+            await anext(stream)
+            await stream.aclose()
+
+        # Closed right away, not whenever the asyncgen finalizer runs.
+        assert closed == [True]
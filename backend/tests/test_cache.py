@@ -0,0 +1,247 @@
+"""Tests for the in-process TTL/LRU cache and the shared cache backends."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.fake_redis import FakeRedis
+from yesand.cache import (
+    MemoryCache,
+    RedisCache,
+    SQLiteCache,
+    TTLCache,
+    aclose_shared_caches,
+    create_shared_cache,
+)
+from yesand.resp import RespClient
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=4, ttl=10)
+        with patch("yesand.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("yesand.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+
+    def test_zero_size_disables(self):
+        cache = TTLCache(maxsize=0, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+@pytest.fixture
+async def fake_redis():
+    server = FakeRedis()
+    port = await server.start()
+    client = RespClient(port=port)
+    yield server, client
+    await client.close()
+    await server.close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+async def make_cache(request, tmp_path):
+    """Factory for a cache on each backend; two caches on one backend share storage."""
+    caches = []
+    server = client = None
+    if request.param == "redis":
+        server = FakeRedis()
+        client = RespClient(port=await server.start())
+
+    def make(ttl=60.0, max_bytes=1024, max_entries=0, namespace="test"):
+        if request.param == "memory":
+            cache = MemoryCache(namespace, ttl, max_bytes, max_entries)
+        elif request.param == "sqlite":
+            cache = SQLiteCache(tmp_path / "cache.sqlite3", namespace, ttl, max_bytes, max_entries)
+        else:
+            cache = RedisCache(client, namespace, ttl, max_bytes, max_entries)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        await cache.close()
+    if server is not None:
+        await client.close()
+        await server.close()
+
+
+class TestSharedCache:
+    """Semantics every SharedCache backend has in common."""
+
+    async def test_get_set_and_stats(self, make_cache):
+        cache = make_cache()
+        await cache.set("a", b"alpha")
+
+        assert await cache.get("a") == b"alpha"
+        assert await cache.get("missing") is None
+        assert await cache.contains("a")
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+    async def test_entries_expire_after_ttl(self, make_cache):
+        cache = make_cache(ttl=0.05)
+        await cache.set("a", b"alpha")
+        await cache.set("b", b"beta", ttl=60)
+
+        await asyncio.sleep(0.1)
+
+        assert await cache.get("a") is None
+        assert not await cache.contains("a")
+        assert await cache.get("b") == b"beta"
+
+    async def test_zero_ttl_and_oversized_values_are_not_stored(self, make_cache):
+        cache = make_cache(max_bytes=16)
+        await cache.set("a", b"alpha", ttl=0)
+        await cache.set("big", b"x" * 64)
+
+        assert await cache.get("a") is None
+        assert await cache.get("big") is None
+
+    async def test_delete_and_clear(self, make_cache):
+        cache = make_cache()
+        other = make_cache(namespace="other")
+        await cache.set("a", b"alpha")
+        await cache.set("b", b"beta")
+        await other.set("a", b"kept")
+
+        await cache.delete("a")
+        assert await cache.get("a") is None
+        await cache.clear()
+
+        assert await cache.get("b") is None
+        assert await other.get("a") == b"kept"
+        assert cache.stats()["misses"] == 1
+
+    async def test_instances_share_storage(self, make_cache):
+        worker_a, worker_b = make_cache(), make_cache()
+        if worker_a.backend == "memory":
+            pytest.skip("memory caches are per process")
+
+        await worker_a.set("prompt", b"a lantern in the rain")
+
+        assert await worker_b.get("prompt") == b"a lantern in the rain"
+
+
+class TestByteBudget:
+    """LRU eviction under the byte budget (memory and SQLite enforce it locally)."""
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def cache(self, request, tmp_path):
+        # Each entry is 1-byte key + 10-byte value = 11 bytes; three fit.
+        if request.param == "memory":
+            return MemoryCache("test", ttl=60, max_bytes=33)
+        return SQLiteCache(tmp_path / "cache.sqlite3", "test", ttl=60, max_bytes=33)
+
+    async def test_least_recently_used_evicted(self, cache):
+        for key in "abc":
+            await cache.set(key, b"x" * 10)
+        await cache.get("a")
+        await cache.set("d", b"x" * 10)
+
+        assert await cache.contains("a")
+        assert not await cache.contains("b")
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == 33
+        await cache.close()
+
+    async def test_max_entries(self, cache):
+        cache.max_entries = 2
+        for key in "abc":
+            await cache.set(key, b"x")
+
+        assert not await cache.contains("a")
+        assert cache.stats()["size"] == 2
+        await cache.close()
+
+
+class TestSQLiteCache:
+    """Tests for SQLiteCache specifics."""
+
+    async def test_survives_restart(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        first = SQLiteCache(path, "prompts", ttl=60, max_bytes=1024)
+        await first.set("a", b"alpha")
+        await first.close()
+
+        second = SQLiteCache(path, "prompts", ttl=60, max_bytes=1024)
+        assert await second.get("a") == b"alpha"
+        await second.close()
+
+
+class TestRedisCache:
+    """Tests for RedisCache specifics."""
+
+    async def test_uses_server_expiry_and_prefix(self, fake_redis):
+        server, client = fake_redis
+        cache = RedisCache(client, "prompts", ttl=60, max_bytes=1024)
+
+        await cache.set("a", b"alpha")
+
+        assert b"yesand:prompts:a" in server.data
+        assert server.data[b"yesand:prompts:a"][1] is not None
+        assert cache.stats()["evictions"] is None
+
+    async def test_unreachable_server_counts_as_miss(self, fake_redis):
+        server, client = fake_redis
+        cache = RedisCache(client, "prompts", ttl=60, max_bytes=1024)
+        await server.close()
+        await client.close()
+
+        await cache.set("a", b"alpha")
+
+        assert await cache.get("a") is None
+        assert cache.stats()["errors"] == 2
+        assert cache.stats()["misses"] == 1
+
+
+class TestCreateSharedCache:
+    """Tests for create_shared_cache."""
+
+    async def test_backend_from_config(self, tmp_path):
+        with (
+            patch("yesand.cache.get_cache_backend", return_value="sqlite"),
+            patch("yesand.cache.get_cache_sqlite_path", return_value=tmp_path / "cache.sqlite3"),
+        ):
+            assert isinstance(create_shared_cache("prompts", ttl=60, max_bytes=1024), SQLiteCache)
+        with patch("yesand.cache.get_cache_backend", return_value="redis"):
+            assert isinstance(create_shared_cache("prompts", ttl=60, max_bytes=1024), RedisCache)
+        with patch("yesand.cache.get_cache_backend", return_value="memcached"), pytest.raises(ValueError):
+            create_shared_cache("prompts", ttl=60, max_bytes=1024)
+        await aclose_shared_caches()
+
+    async def test_close_resets_singletons(self):
+        from yesand.synthesizer import get_prompt_cache
+
+        closed = []
+        create_shared_cache("prompts", ttl=60, max_bytes=1024, on_close=lambda: closed.append(True))
+        before = get_prompt_cache()
+
+        await aclose_shared_caches()
+
+        assert closed == [True]
+        assert get_prompt_cache() is not before
@@ -0,0 +1,76 @@
+"""Tests for the pooled upstream client registry."""
+
+import httpx
+import pytest
+
+from yesand import clients
+
+
+@pytest.fixture(autouse=True)
+async def reset_clients(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    await clients.aclose_clients()
+    clients._pool_counters.reset()
+    yield
+    await clients.aclose_clients()
+
+
+class TestGetChatModel:
+    """Tests for get_chat_model."""
+
+    def test_same_key_returns_same_instance(self):
+        first = clients.get_chat_model("gpt-4o", temperature=0.9)
+        second = clients.get_chat_model("gpt-4o", temperature=0.9)
+        assert first is second
+
+    def test_different_keys_return_different_instances(self):
+        plain = clients.get_chat_model("gpt-4o", temperature=0.9)
+        streaming = clients.get_chat_model("gpt-4o", temperature=0.9, streaming=True)
+        cooler = clients.get_chat_model("gpt-4o", temperature=0.3)
+        assert plain is not streaming
+        assert plain is not cooler
+
+    def test_shares_pooled_http_client(self):
+        llm = clients.get_chat_model("gpt-4o", temperature=0.9)
+        assert llm.http_async_client is clients.get_http_client()
+
+
+class TestSharedClients:
+    """Tests for the shared HTTP and OpenAI clients."""
+
+    def test_http_client_is_reused(self):
+        assert clients.get_http_client() is clients.get_http_client()
+
+    def test_openai_client_is_reused(self):
+        assert clients.get_openai_client() is clients.get_openai_client()
+
+    async def test_aclose_resets_registry(self):
+        first = clients.get_http_client()
+        clients.get_chat_model("gpt-4o", temperature=0.9)
+        await clients.aclose_clients()
+
+        assert first.is_closed
+        assert clients.pool_stats()["chat_models"] == 0
+        assert clients.get_http_client() is not first
+
+
+class TestPoolStats:
+    """Tests for pool usage accounting."""
+
+    async def test_records_new_and_reused_connections(self):
+        events = iter(["connection.connect_tcp.started", "http11.send_request_headers.started"])
+
+        class FakeTransport(httpx.AsyncHTTPTransport):
+            async def handle_async_request(self, request):
+                await request.extensions["trace"](next(events), {})
+                return httpx.Response(200)
+
+        transport = clients._PoolStatsTransport(FakeTransport())
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://example.com/a")
+            await client.get("https://example.com/b")
+
+        stats = clients.pool_stats()
+        assert stats["requests"] == 2
+        assert stats["new_connections"] == 1
+        assert stats["reuse_ratio"] == 0.5
@@ -0,0 +1,134 @@
+"""Tests for token-budgeted history compaction."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from yesand.cache import TTLCache
+from yesand.compaction import HistoryCompactor, history_tokens
+from yesand.conversation import Conversation
+
+
+def _provider(llm):
+    return MagicMock(chat_model=MagicMock(return_value=llm))
+
+
+def _history(turns: int) -> list[dict]:
+    return [
+        {"role": "human" if i % 2 == 0 else "ai", "content": f"turn {i} " + "detail " * 20}
+        for i in range(turns)
+    ]
+
+
+def _compactor(budget: int = 100, keep_turns: int = 2) -> HistoryCompactor:
+    return HistoryCompactor(budget=budget, keep_turns=keep_turns, summaries=TTLCache(maxsize=16, ttl=60))
+
+
+class TestHistoryCompactor:
+    """Tests for HistoryCompactor."""
+
+    def test_under_budget_is_untouched(self):
+        compactor = _compactor(budget=10_000)
+        history = _history(4)
+
+        result = compactor.compact(history)
+
+        assert result.summary is None
+        assert result.messages.as_dicts() == history
+        assert result.tokens_saved == 0
+
+    def test_disabled_budget_is_untouched(self):
+        result = _compactor(budget=0).compact(_history(20))
+        assert result.summary is None
+
+    async def test_first_over_budget_turn_schedules_summary(self):
+        compactor = _compactor()
+        history = _history(8)
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="A kitchen with a cat."))
+
+        with patch("yesand.compaction.get_provider", return_value=_provider(mock_llm)):
+            result = compactor.compact(history)
+            # No summary yet: the turn is not blocked and sends everything.
+            assert result.summary is None
+            assert result.messages.as_dicts() == history
+            await asyncio.gather(*compactor._pending.values())
+
+        assert mock_llm.ainvoke.call_count == 1
+
+    async def test_cached_summary_replaces_older_turns(self):
+        compactor = _compactor()
+        history = _history(8)
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="A kitchen with a cat."))
+
+        with patch("yesand.compaction.get_provider", return_value=_provider(mock_llm)):
+            compactor.compact(history)
+            await asyncio.gather(*compactor._pending.values())
+            result = compactor.compact(history)
+
+        assert result.summary == "A kitchen with a cat."
+        assert result.messages.as_dicts() == history[-2:]
+        assert result.tokens_after < history_tokens(Conversation.from_dicts(history))
+        assert compactor.stats()["tokens_saved"] == result.tokens_saved
+
+    async def test_summary_extends_incrementally(self):
+        compactor = _compactor()
+        history = _history(8)
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(side_effect=[MagicMock(content="first"), MagicMock(content="second")])
+
+        with patch("yesand.compaction.get_provider", return_value=_provider(mock_llm)):
+            compactor.compact(history)
+            await asyncio.gather(*compactor._pending.values())
+
+            longer = history + _history(2)
+            result = compactor.compact(longer)
+            # Reuses the older summary and only sends the uncovered turns verbatim.
+            assert result.summary == "first"
+            assert result.messages.as_dicts() == longer[6:]
+            await asyncio.gather(*compactor._pending.values())
+
+        update_prompt = mock_llm.ainvoke.call_args[0][0][1].content
+        assert "first" in update_prompt
+        assert compactor.compact(longer).summary == "second"
+
+    async def test_summary_lookup_counts_once_per_turn(self):
+        compactor = _compactor()
+        history = _history(12)
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="A kitchen with a cat."))
+
+        with patch("yesand.compaction.get_provider", return_value=_provider(mock_llm)):
+            compactor.compact(history)
+            await asyncio.gather(*compactor._pending.values())
+            compactor.compact(history + _history(2))
+
+        assert compactor.summaries.misses == 1
+        assert compactor.summaries.hits == 1
+
+
+class TestHistoryTokens:
+    """Tests for history_tokens."""
+
+    def test_token_counts_are_memoized_per_turn(self):
+        history = Conversation.from_dicts(_history(6))
+        counted = []
+
+        def count(text):
+            counted.append(text)
+            return 10
+
+        with patch("yesand.compaction.count_tokens", count):
+            first = history_tokens(history)
+            second = history_tokens(history.add("human", "one more line"))
+
+        assert first == 6 * 14
+        assert second == 7 * 14
+        assert len(counted) == 7
+
+    def test_recounted_when_the_encoding_changes(self):
+        history = Conversation.from_dicts(_history(2))
+        history_tokens(history)
+
+        with patch("yesand.compaction._encoding", MagicMock(encode=lambda text: [0])):
+            assert history_tokens(history) == 2 * 5
@@ -0,0 +1,58 @@
+"""Tests for the cached .env configuration snapshot."""
+
+import os
+
+from yesand.config import EnvSnapshot
+
+
+def _write(path, text):
+    path.write_text(text)
+    # Bump mtime explicitly so back-to-back writes are always distinguishable.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestEnvSnapshot:
+    """Tests for EnvSnapshot."""
+
+    def test_reads_values(self, tmp_path):
+        env = tmp_path / ".env"
+        _write(env, "OPENAI_TEXT_MODEL=gpt-4o\nEMPTY=\n")
+        snapshot = EnvSnapshot(env)
+
+        assert snapshot.values() == {"OPENAI_TEXT_MODEL": "gpt-4o"}
+
+    def test_missing_file_is_empty(self, tmp_path):
+        snapshot = EnvSnapshot(tmp_path / ".env")
+        assert snapshot.values() == {}
+
+    def test_unchanged_file_is_not_reparsed(self, tmp_path):
+        env = tmp_path / ".env"
+        _write(env, "A=1\n")
+        snapshot = EnvSnapshot(env, check_interval=0)
+
+        for _ in range(5):
+            snapshot.values()
+
+        assert snapshot.reloads == 1
+
+    def test_change_is_picked_up(self, tmp_path):
+        env = tmp_path / ".env"
+        _write(env, "A=1\n")
+        snapshot = EnvSnapshot(env, check_interval=0)
+        assert snapshot.values()["A"] == "1"
+
+        _write(env, "A=2\n")
+        assert snapshot.values()["A"] == "2"
+
+    def test_change_waits_for_check_interval(self, tmp_path):
+        env = tmp_path / ".env"
+        _write(env, "A=1\n")
+        snapshot = EnvSnapshot(env, check_interval=3600)
+        snapshot.values()
+
+        _write(env, "A=2\n")
+        assert snapshot.values()["A"] == "1"
+
+        snapshot.invalidate()
+        assert snapshot.values()["A"] == "2"
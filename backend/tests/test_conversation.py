@@ -0,0 +1,84 @@
+"""Tests for the memoized Conversation type."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from yesand.conversation import EMPTY_PREFIX_HASH, Conversation, Turn, as_conversation, extend_prefix_hash
+
+MESSAGES = [
+    {"role": "human", "content": "A kitchen."},
+    {"role": "ai", "content": "yes, and a cat."},
+    {"role": "human", "content": "And a window."},
+]
+
+
+class TestConversation:
+    """Tests for Conversation."""
+
+    def test_prefix_hash_matches_rolling_hash(self):
+        conversation = Conversation.from_dicts(MESSAGES)
+
+        assert conversation.prefix_hash == extend_prefix_hash(EMPTY_PREFIX_HASH, MESSAGES)
+        assert conversation.prefix_hash_at(1) == extend_prefix_hash(EMPTY_PREFIX_HASH, MESSAGES[:1])
+        assert conversation.prefix_hash_at(0) == EMPTY_PREFIX_HASH
+
+    def test_extend_shares_turns_and_hashes(self):
+        base = Conversation.from_dicts(MESSAGES[:2])
+        base_hash = base.prefix_hash
+
+        extended = base.add("human", "And a window.")
+
+        assert extended[0] is base[0]
+        assert extended.prefix_hash == Conversation.from_dicts(MESSAGES).prefix_hash
+        assert base.prefix_hash == base_hash
+        assert len(base) == 2
+
+    def test_sibling_extensions_do_not_interfere(self):
+        base = Conversation.from_dicts(MESSAGES[:2])
+        base.prefix_hash
+
+        left, right = base.add("human", "left"), base.add("human", "right")
+
+        assert left.prefix_hash != right.prefix_hash
+        assert right.prefix_hash == extend_prefix_hash(base.prefix_hash, [{"role": "human", "content": "right"}])
+
+    def test_langchain_messages_are_memoized(self):
+        conversation = Conversation.from_dicts(MESSAGES)
+
+        messages = conversation.langchain_messages
+
+        assert [type(m) for m in messages] == [HumanMessage, AIMessage, HumanMessage]
+        assert conversation.langchain_messages is messages
+        # Extensions reuse the per-turn messages already built.
+        assert conversation.add("ai", "yes, and rain.").langchain_messages[0] is messages[0]
+
+    def test_transcript(self):
+        conversation = Conversation.from_dicts(MESSAGES)
+
+        assert conversation.transcript == "human: A kitchen.\nai: yes, and a cat.\nhuman: And a window."
+        assert conversation.transcript is conversation.transcript
+
+    def test_leading_slice_keeps_prefix_hashes(self):
+        conversation = Conversation.from_dicts(MESSAGES)
+        conversation.prefix_hash
+
+        head, tail = conversation[:2], conversation[1:]
+
+        assert head.prefix_hash == conversation.prefix_hash_at(2)
+        assert tail.prefix_hash == extend_prefix_hash(EMPTY_PREFIX_HASH, MESSAGES[1:])
+
+    def test_from_messages_reads_attributes(self):
+        conversation = Conversation.from_messages(Turn(m["role"], m["content"]) for m in MESSAGES)
+        assert conversation.as_dicts() == MESSAGES
+
+    def test_as_conversation(self):
+        conversation = Conversation.from_dicts(MESSAGES)
+
+        assert as_conversation(conversation) is conversation
+        assert as_conversation(MESSAGES).as_dicts() == MESSAGES
+
+    def test_slots(self):
+        with pytest.raises(AttributeError):
+            Conversation().extra = 1
+        with pytest.raises(AttributeError):
+            Turn("human", "hi").extra = 1
@@ -0,0 +1,49 @@
+"""Tests for the delta-protocol conversation store."""
+
+from yesand.conversation import EMPTY_CONVERSATION, EMPTY_PREFIX_HASH, Conversation, extend_prefix_hash
+from yesand.conversation_store import MemoryConversationStore, resolve_conversation, set_conversation_store
+
+MESSAGES = [
+    {"role": "human", "content": "A kitchen."},
+    {"role": "ai", "content": "yes, and a cat."},
+]
+
+
+class TestPrefixHash:
+    """Tests for the rolling prefix hash."""
+
+    def test_incremental_matches_full(self):
+        stepwise = extend_prefix_hash(extend_prefix_hash(EMPTY_PREFIX_HASH, MESSAGES[:1]), MESSAGES[1:])
+        assert stepwise == extend_prefix_hash(EMPTY_PREFIX_HASH, MESSAGES)
+
+    def test_role_changes_hash(self):
+        swapped = [{"role": "ai", "content": "A kitchen."}]
+        assert extend_prefix_hash(EMPTY_PREFIX_HASH, swapped) != extend_prefix_hash(EMPTY_PREFIX_HASH, MESSAGES[:1])
+
+
+class TestResolveConversation:
+    """Tests for resolve_conversation."""
+
+    def setup_method(self):
+        self.store = MemoryConversationStore(maxsize=8, ttl=60)
+        set_conversation_store(self.store)
+
+    def teardown_method(self):
+        set_conversation_store(None)
+
+    def test_extends_known_prefix(self):
+        stored = EMPTY_CONVERSATION.extend(Conversation.from_dicts(MESSAGES))
+        self.store.put("abc", stored)
+        delta = [{"role": "human", "content": "And a window."}]
+
+        resolved = resolve_conversation("abc", stored.prefix_hash, Conversation.from_dicts(delta))
+
+        assert resolved.as_dicts() == [*MESSAGES, *delta]
+        assert resolved.prefix_hash == extend_prefix_hash(stored.prefix_hash, delta)
+
+    def test_unknown_conversation(self):
+        assert resolve_conversation("missing", EMPTY_PREFIX_HASH, Conversation()) is None
+
+    def test_stale_prefix(self):
+        self.store.put("abc", Conversation.from_dicts(MESSAGES))
+        assert resolve_conversation("abc", EMPTY_PREFIX_HASH, Conversation()) is None
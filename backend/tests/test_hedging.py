@@ -0,0 +1,174 @@
+"""Tests for hedged upstream requests."""
+
+import asyncio
+
+import pytest
+
+from yesand.hedging import MIN_SAMPLES, Hedger
+
+
+def _hedger(budget_ratio: float = 1.0, default_delay: float = 0.01) -> Hedger:
+    return Hedger(budget_ratio=budget_ratio, default_delay=default_delay)
+
+
+class TestHedgerRun:
+    """Tests for Hedger.run."""
+
+    async def test_fast_primary_is_not_hedged(self):
+        hedger = _hedger(default_delay=1)
+
+        async def call():
+            return "fast"
+
+        assert await hedger.run(call) == "fast"
+        assert hedger.hedges_fired == 0
+
+    async def test_slow_primary_loses_to_hedge(self):
+        hedger = _hedger()
+        delays = iter([1.0, 0.0])
+        cancelled = []
+
+        async def call():
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        assert await hedger.run(call) == 0.0
+        await asyncio.sleep(0)
+        assert hedger.stats()["hedges_won"] == 1
+        assert cancelled == [1.0]
+
+    async def test_budget_caps_hedges(self):
+        hedger = _hedger(budget_ratio=0.0)
+
+        async def call():
+            await asyncio.sleep(0.02)
+            return "slow"
+
+        assert await hedger.run(call) == "slow"
+        assert hedger.hedges_fired == 0
+        assert hedger.hedges_skipped == 1
+
+    async def test_failed_hedge_falls_back_to_primary(self):
+        hedger = _hedger()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError("hedge failed")
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        assert await hedger.run(call) == "primary"
+
+    async def test_all_failures_raise(self):
+        hedger = _hedger()
+
+        async def call():
+            await asyncio.sleep(0.02)
+            raise RuntimeError("down")
+
+        with pytest.raises(RuntimeError):
+            await hedger.run(call)
+
+    async def test_admission_wait_is_not_hedged_or_sampled(self):
+        hedger = _hedger(default_delay=0.01)
+        admitted = []
+
+        async def admit():
+            admitted.append(True)
+            await asyncio.sleep(0.05)  # queued behind our own rate limit
+
+        async def call():
+            return "ok"
+
+        assert await hedger.run(call, admit) == "ok"
+        assert admitted == [True]
+        assert hedger.hedges_fired == 0
+        assert hedger._latencies[-1] < 0.05
+
+    async def test_backup_takes_its_own_slot(self):
+        hedger = _hedger()
+        admitted = []
+        delays = iter([1.0, 0.0])
+
+        async def admit():
+            admitted.append(len(admitted))
+
+        async def call():
+            delay = next(delays)
+            await asyncio.sleep(delay)
+            return delay
+
+        assert await hedger.run(call, admit) == 0.0
+        assert admitted == [0, 1]
+
+    def test_delay_adapts_to_p95(self):
+        hedger = _hedger(default_delay=5)
+        for i in range(MIN_SAMPLES * 5):
+            hedger._latencies.append(i / 100)
+
+        assert hedger.delay() == pytest.approx(0.95)
+
+
+class TestHedgerStream:
+    """Tests for Hedger.stream."""
+
+    async def test_hedges_on_time_to_first_chunk(self):
+        hedger = _hedger()
+        first_delays = iter([1.0, 0.0])
+
+        async def open_stream():
+            delay = next(first_delays)
+            await asyncio.sleep(delay)
+            yield f"{delay}-a"
+            yield f"{delay}-b"
+
+        chunks = [chunk async for chunk in hedger.stream(open_stream)]
+
+        assert chunks == ["0.0-a", "0.0-b"]
+        assert hedger.hedges_won == 1
+
+    async def test_fast_stream_passes_through(self):
+        hedger = _hedger(default_delay=1)
+
+        async def open_stream():
+            yield "a"
+            yield "b"
+
+        assert [chunk async for chunk in hedger.stream(open_stream)] == ["a", "b"]
+        assert hedger.hedges_fired == 0
+
+    async def test_empty_stream(self):
+        hedger = _hedger(default_delay=1)
+
+        async def open_stream():
+            return
+            yield
+
+        assert [chunk async for chunk in hedger.stream(open_stream)] == []
+
+    async def test_backup_stream_takes_its_own_slot(self):
+        hedger = _hedger()
+        admitted = []
+        first_delays = iter([1.0, 0.0])
+
+        async def admit():
+            admitted.append(len(admitted))
+            if len(admitted) == 1:
+                await asyncio.sleep(0.05)
+
+        async def open_stream():
+            delay = next(first_delays)
+            await asyncio.sleep(delay)
+            yield delay
+
+        assert [chunk async for chunk in hedger.stream(open_stream, admit)] == [0.0]
+        assert admitted == [0, 1]
+        assert hedger._latencies[-1] < 0.05
@@ -1,11 +1,15 @@
 """Tests for the DALL-E image generation wrapper."""
 
+import base64
+import hashlib
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from openai import APIError
 
-from yesand.image import generate_image
+from yesand.image import generate_image, generate_images
+from yesand.image_store import ImageStore
+from yesand.providers import render_placeholder
 
 
 class TestGenerateImage:
@@ -18,7 +22,7 @@ class TestGenerateImage:
         mock_client = MagicMock()
         mock_client.images.generate = AsyncMock(return_value=mock_response)
 
-        with patch("yesand.image.AsyncOpenAI", return_value=mock_client):
+        with patch("yesand.providers.get_openai_client", return_value=mock_client):
             result = await generate_image("a beautiful sunset")
 
         assert isinstance(result, str)
@@ -31,7 +35,7 @@ class TestGenerateImage:
         mock_client = MagicMock()
         mock_client.images.generate = AsyncMock(return_value=mock_response)
 
-        with patch("yesand.image.AsyncOpenAI", return_value=mock_client):
+        with patch("yesand.providers.get_openai_client", return_value=mock_client):
             await generate_image("a cat in a kitchen")
 
         call_kwargs = mock_client.images.generate.call_args[1]
@@ -47,6 +51,63 @@ class TestGenerateImage:
             )
         )
 
-        with patch("yesand.image.AsyncOpenAI", return_value=mock_client):
+        with patch("yesand.providers.get_openai_client", return_value=mock_client):
             with pytest.raises(APIError):
                 await generate_image("test prompt")
+
+
+class TestGenerateImages:
+    """Tests for generate_images."""
+
+    async def test_uses_n_parameter(self):
+        mock_response = MagicMock()
+        mock_response.data = [MagicMock(url=f"https://example.com/{i}.png") for i in range(3)]
+        mock_client = MagicMock()
+        mock_client.images.generate = AsyncMock(return_value=mock_response)
+
+        with (
+            patch("yesand.providers.get_openai_client", return_value=mock_client),
+            patch("yesand.image.get_image_model", return_value="dall-e-2"),
+        ):
+            result = await generate_images("a cat", n=3)
+
+        assert len(result) == 3
+        assert mock_client.images.generate.call_count == 1
+        assert mock_client.images.generate.call_args[1]["n"] == 3
+
+    async def test_single_image_model_fans_out(self):
+        mock_response = MagicMock()
+        mock_response.data = [MagicMock(url="https://example.com/img.png")]
+        mock_client = MagicMock()
+        mock_client.images.generate = AsyncMock(return_value=mock_response)
+
+        with (
+            patch("yesand.providers.get_openai_client", return_value=mock_client),
+            patch("yesand.image.get_image_model", return_value="dall-e-3"),
+        ):
+            result = await generate_images("a cat", n=2)
+
+        assert len(result) == 2
+        assert mock_client.images.generate.call_count == 2
+        assert all(call[1]["n"] == 1 for call in mock_client.images.generate.call_args_list)
+
+    async def test_b64_store_mode_returns_stored_urls(self, tmp_path):
+        png = render_placeholder(hashlib.sha256(b"cat").hexdigest(), 8, 8)
+        mock_response = MagicMock()
+        mock_response.data = [MagicMock(url=None, b64_json=base64.b64encode(png).decode())]
+        mock_client = MagicMock()
+        mock_client.images.generate = AsyncMock(return_value=mock_response)
+        store = ImageStore(tmp_path, "http://localhost:8000", workers=1)
+
+        with (
+            patch("yesand.providers.get_openai_client", return_value=mock_client),
+            patch("yesand.image.get_image_model", return_value="dall-e-2"),
+            patch("yesand.image.get_image_store_mode", return_value="b64"),
+            patch("yesand.image.image_store_enabled", return_value=True),
+            patch("yesand.image_store.get_image_store", return_value=store),
+        ):
+            result = await generate_images("a cat", n=1)
+        store.close()
+
+        assert mock_client.images.generate.call_args[1]["response_format"] == "b64_json"
+        assert result == [f"http://localhost:8000/images/{hashlib.sha256(png).hexdigest()}.png"]
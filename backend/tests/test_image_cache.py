@@ -0,0 +1,93 @@
+"""Tests for the on-disk proxy image cache."""
+
+import hashlib
+import os
+import time
+
+import pytest
+
+from yesand.image_cache import ImageCache
+
+URL = "https://example.blob.core.windows.net/img.png?sig=abc"
+
+
+@pytest.fixture
+def cache(tmp_path) -> ImageCache:
+    return ImageCache(tmp_path / "images", max_bytes=1024, max_age=3600)
+
+
+def _store(cache: ImageCache, url: str, data: bytes):
+    writer = cache.writer(url, "image/png")
+    writer.write(data[: len(data) // 2])
+    writer.write(data[len(data) // 2 :])
+    return writer.commit()
+
+
+class TestImageCache:
+    """Tests for ImageCache."""
+
+    def test_commit_is_content_addressed(self, cache):
+        cached = _store(cache, URL, b"png-bytes")
+
+        assert cached.digest == hashlib.sha256(b"png-bytes").hexdigest()
+        assert cached.path.read_bytes() == b"png-bytes"
+        assert cached.etag == f'"{cached.digest}"'
+
+    def test_lookup_after_commit(self, cache):
+        _store(cache, URL, b"png-bytes")
+
+        cached = cache.lookup(URL)
+        assert cached is not None
+        assert cached.content_type == "image/png"
+
+    def test_lookup_miss(self, cache):
+        assert cache.lookup(URL) is None
+
+    def test_abort_leaves_nothing_behind(self, cache):
+        writer = cache.writer(URL, "image/png")
+        writer.write(b"partial")
+        writer.abort()
+
+        assert cache.lookup(URL) is None
+        assert list(cache.tmp_dir.iterdir()) == []
+
+    def test_evicts_least_recently_used_over_budget(self, cache):
+        old = _store(cache, URL + "1", b"a" * 600)
+        past = time.time() - 60
+        os.utime(old.path, (past, past))
+        _store(cache, URL + "2", b"b" * 600)
+
+        freed = cache.evict()
+
+        assert freed == 600
+        assert cache.lookup(URL + "1") is None
+        assert cache.lookup(URL + "2") is not None
+
+    def test_evicts_idle_blobs(self, cache):
+        cached = _store(cache, URL, b"small")
+        past = time.time() - 7200
+        os.utime(cached.path, (past, past))
+
+        assert cache.lookup(URL) is None
+        assert cache.evict() == len(b"small")
+
+    def test_eviction_drops_index_entries(self, cache):
+        old = _store(cache, URL + "1", b"a" * 600)
+        past = time.time() - 60
+        os.utime(old.path, (past, past))
+        _store(cache, URL + "2", b"b" * 600)
+
+        cache.evict()
+
+        assert len(list(cache.urls_dir.glob("*.json"))) == 1
+
+    def test_refilling_a_url_leaves_no_temp_files(self, cache):
+        first = cache.writer(URL, "image/png")
+        second = cache.writer(URL, "image/png")
+        first.write(b"png-bytes")
+        second.write(b"png-bytes")
+        first.commit()
+        second.commit()
+
+        assert cache.lookup(URL) is not None
+        assert list(cache.tmp_dir.iterdir()) == []
@@ -0,0 +1,123 @@
+"""Tests for the local generated-image store."""
+
+import base64
+import hashlib
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from yesand import image_store
+from yesand.image_store import ImageStore, available_variants, store_generated
+from yesand.providers import render_placeholder
+
+BASE_URL = "http://testserver"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ImageStore(tmp_path / "store", BASE_URL, workers=1)
+    yield store
+    store.close()
+
+
+def _png() -> bytes:
+    return render_placeholder(hashlib.sha256(b"kitchen").hexdigest(), 8, 8)
+
+
+class TestImageStore:
+    """Tests for ImageStore."""
+
+    async def test_save_is_content_addressed(self, store):
+        png = _png()
+
+        first = await store.save(png)
+        second = await store.save(png)
+
+        assert first == second
+        assert first.digest == hashlib.sha256(png).hexdigest()
+        assert first.path.read_bytes() == png
+        assert first.media_type == "image/png"
+        assert store.url_for(first) == f"{BASE_URL}/images/{first.digest}.png"
+
+    async def test_save_rejects_non_images(self, store):
+        with pytest.raises(ValueError):
+            await store.save(b"<html>not an image</html>")
+
+    async def test_lookup_and_parse_url(self, store):
+        image = await store.save(_png())
+
+        assert store.lookup(image.name) == image
+        assert store.parse_url(store.url_for(image)) == image
+        assert store.lookup("../etc/passwd") is None
+        assert store.parse_url("https://example.com/images/x.png") is None
+
+    async def test_ingest_data_url(self, store):
+        png = _png()
+        image = await store.ingest("data:image/png;base64," + base64.b64encode(png).decode())
+        assert image.path.read_bytes() == png
+
+    async def test_ingest_fetches_url_once(self, store):
+        png = _png()
+        calls = []
+
+        def handler(request):
+            calls.append(str(request.url))
+            return httpx.Response(200, content=png, headers={"content-type": "image/png"})
+
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch("yesand.image_store.get_http_client", return_value=http_client):
+            image = await store.ingest("https://example.blob.core.windows.net/img.png")
+
+        assert calls == ["https://example.blob.core.windows.net/img.png"]
+        assert image.path.read_bytes() == png
+
+    @pytest.mark.skipif(available_variants() != (), reason="Pillow is installed")
+    async def test_no_variants_without_pillow(self, store):
+        image = await store.save(_png())
+
+        assert store.variant_urls(image) == {}
+        assert await store.variant(image.digest, "thumb.webp") is None
+
+    async def test_variants_rendered(self, store):
+        pytest.importorskip("PIL")
+        image = await store.save(render_placeholder(hashlib.sha256(b"big").hexdigest(), 600, 400))
+
+        found = await store.variant(image.digest, "thumb.webp")
+
+        assert found is not None
+        path, variant = found
+        assert path.read_bytes()[8:12] == b"WEBP"
+        assert "thumb.webp" in store.variant_urls(image)
+
+    async def test_variant_rejects_non_digest_names(self, store):
+        outside = store.variants_dir.parent / "thumb.webp"
+        outside.parent.mkdir(parents=True, exist_ok=True)
+        outside.write_bytes(b"not a variant")
+
+        with patch("yesand.image_store.available_variants", return_value=image_store.VARIANTS):
+            assert await store.variant("..", "thumb.webp") is None
+
+    def test_failed_render_leaves_no_temp_file(self, store, tmp_path):
+        pytest.importorskip("PIL")
+        source = tmp_path / "source.png"
+        source.write_bytes(_png())
+        dest = tmp_path / "variants"
+
+        with patch("PIL.Image.Image.save", side_effect=OSError("encoder failed")), pytest.raises(OSError):
+            image_store._render_variants(source, dest, [image_store.VARIANTS[0]])
+
+        assert list(dest.iterdir()) == []
+
+
+class TestStoreGenerated:
+    """Tests for store_generated."""
+
+    async def test_returns_stable_urls_and_keeps_failures(self, store):
+        png = _png()
+        good = "data:image/png;base64," + base64.b64encode(png).decode()
+
+        with patch.object(image_store, "get_image_store", return_value=store):
+            urls = await store_generated([good, "data:text/plain,oops"])
+
+        assert urls == [f"{BASE_URL}/images/{hashlib.sha256(png).hexdigest()}.png", "data:text/plain,oops"]
@@ -1,15 +1,24 @@
 """FastAPI integration tests for the yes-and backend."""
 
+import asyncio
+import json
+import uuid
 from unittest.mock import AsyncMock, patch
 
-from yesand.persona import load_personas
+import httpx
+import pytest
+
+from yesand.image_cache import ImageCache
+from yesand.image_store import ImageStore
+from yesand.persona import persona_registry
+from yesand.warmup import WarmUp
 
 
 class TestGetPersonas:
     """Tests for GET /personas."""
 
     async def test_returns_persona_list(self, client):
-        load_personas.cache_clear()
+        persona_registry.clear()
         response = await client.get("/personas")
         assert response.status_code == 200
 
@@ -27,7 +36,7 @@ class TestGetPersonas:
         assert "pulls_away_from" in first["aesthetic"]
 
     async def test_personas_have_correct_fields(self, client):
-        load_personas.cache_clear()
+        persona_registry.clear()
         response = await client.get("/personas")
         data = response.json()
 
@@ -36,6 +45,39 @@ class TestGetPersonas:
         assert "romantic" in ids
         assert "brutalist" in ids
 
+    async def test_sets_etag_and_cache_control(self, client):
+        response = await client.get("/personas", headers={"Accept-Encoding": "identity"})
+
+        assert response.headers["etag"].startswith('"')
+        assert "max-age" in response.headers["cache-control"]
+        assert "content-encoding" not in response.headers
+
+    async def test_if_none_match_returns_304(self, client):
+        first = await client.get("/personas")
+        response = await client.get("/personas", headers={"If-None-Match": first.headers["etag"]})
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+    async def test_gzip_when_accepted(self, client):
+        response = await client.get("/personas", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["personas"]) > 0
+
+    async def test_body_is_reused_until_personas_change(self, client):
+        import main
+
+        first = main._prebuilt_personas()
+        persona_registry.clear()
+        assert main._prebuilt_personas() is first
+
+        main._personas_response = ("stale-version", first)
+        rebuilt = main._prebuilt_personas()
+        assert rebuilt is not first
+        assert rebuilt.etag == first.etag
+
 
 class TestPostChat:
     """Tests for POST /chat."""
@@ -70,6 +112,20 @@ class TestPostChat:
 
         assert response.status_code == 502
 
+    async def test_chat_opening_served_from_pool(self, client):
+        agent = AsyncMock(return_value="unused")
+        with (
+            patch("main.take_opening", return_value="yes, and a zebra sells lemonade."),
+            patch("main.run_agent_turn", agent),
+        ):
+            response = await client.post("/chat", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "ZEBRA"}],
+            })
+
+        assert response.json()["message"] == "yes, and a zebra sells lemonade."
+        agent.assert_not_called()
+
 
 class TestPostGenerate:
     """Tests for POST /generate."""
@@ -122,6 +178,277 @@ class TestPostGenerate:
 
         assert call_order == ["synthesize", "generate"]
 
+    async def test_generate_bypass_cache_flag(self, client):
+        with (
+            patch("main.synthesize_image_prompt", new_callable=AsyncMock, return_value="prompt") as synth,
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+        ):
+            await client.post("/generate", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "A scene."}],
+                "bypass_cache": True,
+            })
+
+        assert synth.call_args.kwargs["use_cache"] is False
+
+
+def _sse_events(text: str) -> list[dict]:
+    return [
+        json.loads(block.removeprefix("data: "))
+        for block in text.split("\n\n")
+        if block.startswith("data: ")
+    ]
+
+
+class TestPostGenerateStream:
+    """Tests for POST /generate/stream."""
+
+    BODY = {
+        "persona_id": "magical_realist",
+        "messages": [{"role": "human", "content": "A kitchen."}],
+    }
+
+    async def test_streams_prompt_then_image(self, client):
+        async def fake_stream(*_args, **_kwargs):
+            yield "A dreamy "
+            yield "kitchen"
+
+        with (
+            patch("main.stream_image_prompt", new=fake_stream),
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+        ):
+            response = await client.post("/generate/stream", json=self.BODY)
+
+        events = _sse_events(response.text)
+        assert [e["type"] for e in events] == ["prompt_chunk", "prompt_chunk", "prompt_ready", "image", "done"]
+        assert events[2]["prompt"] == "A dreamy kitchen"
+        assert events[3]["image_url"] == "https://example.com/img.png"
+
+    async def test_image_error_event(self, client):
+        async def fake_stream(*_args, **_kwargs):
+            yield "prompt"
+
+        with (
+            patch("main.stream_image_prompt", new=fake_stream),
+            patch("main.generate_image", new_callable=AsyncMock, side_effect=Exception("down")),
+        ):
+            response = await client.post("/generate/stream", json=self.BODY)
+
+        events = _sse_events(response.text)
+        assert events[-1] == {"type": "error", "message": "Image generation error: down"}
+
+    async def test_unknown_persona_404(self, client):
+        response = await client.post("/generate/stream", json={**self.BODY, "persona_id": "nonexistent"})
+        assert response.status_code == 404
+
+
+class TestPostGenerateBatch:
+    """Tests for POST /generate/batch."""
+
+    MESSAGES = [{"role": "human", "content": "A kitchen."}]
+
+    async def test_items_stream_as_they_complete(self, client):
+        async def synthesize(persona, *_args, **_kwargs):
+            # The first item is the slowest, so it should arrive last.
+            await asyncio.sleep(0.05 if persona.id == "romantic" else 0)
+            return f"{persona.id} prompt"
+
+        async def images(prompt, n):
+            return [f"https://example.com/{prompt}/{i}.png" for i in range(n)]
+
+        with (
+            patch("main.synthesize_image_prompt", side_effect=synthesize),
+            patch("main.generate_images", side_effect=images),
+        ):
+            response = await client.post("/generate/batch", json={
+                "messages": self.MESSAGES,
+                "items": [{"persona_id": "romantic"}, {"persona_id": "brutalist", "variants": 2}],
+            })
+
+        events = _sse_events(response.text)
+        assert [e["persona_id"] for e in events[:2]] == ["brutalist", "romantic"]
+        assert len(events[0]["image_urls"]) == 2
+        assert events[-1] == {"type": "done", "succeeded": 2, "failed": 0}
+
+    async def test_partial_failure_reported_per_item(self, client):
+        async def synthesize(persona, *_args, **_kwargs):
+            if persona.id == "brutalist":
+                raise Exception("down")
+            return "prompt"
+
+        with (
+            patch("main.synthesize_image_prompt", side_effect=synthesize),
+            patch("main.generate_images", new_callable=AsyncMock, return_value=["https://example.com/img.png"]),
+        ):
+            response = await client.post("/generate/batch", json={
+                "messages": self.MESSAGES,
+                "items": [{"persona_id": "romantic"}, {"persona_id": "brutalist"}],
+            })
+
+        events = {e.get("persona_id"): e for e in _sse_events(response.text)}
+        assert events["romantic"]["type"] == "item"
+        assert events["brutalist"] == {
+            "type": "item_error",
+            "index": 1,
+            "persona_id": "brutalist",
+            "message": "Synthesizer error: down",
+        }
+        assert events[None]["failed"] == 1
+
+    async def test_unknown_persona_404(self, client):
+        response = await client.post("/generate/batch", json={
+            "messages": self.MESSAGES,
+            "items": [{"persona_id": "nonexistent"}],
+        })
+        assert response.status_code == 404
+
+
+class TestGenerateCoalescing:
+    """Tests for /generate single-flight and idempotency keys."""
+
+    BODY = {
+        "persona_id": "magical_realist",
+        "messages": [{"role": "human", "content": "A lighthouse at dusk."}],
+    }
+
+    async def test_identical_concurrent_requests_share_pipeline(self, client):
+        release = asyncio.Event()
+
+        async def slow_synthesize(*_args, **_kwargs):
+            await release.wait()
+            return "prompt"
+
+        with (
+            patch("main.synthesize_image_prompt", side_effect=slow_synthesize) as synth,
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png") as image,
+        ):
+            requests = [asyncio.create_task(client.post("/generate", json=self.BODY)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            release.set()
+            responses = await asyncio.gather(*requests)
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert synth.call_count == 1
+        assert image.call_count == 1
+
+    async def test_idempotency_key_replays_result(self, client):
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        with (
+            patch("main.synthesize_image_prompt", new_callable=AsyncMock, return_value="prompt") as synth,
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+        ):
+            first = await client.post("/generate", json=self.BODY, headers=headers)
+            second = await client.post("/generate", json=self.BODY, headers=headers)
+
+        assert second.json() == first.json()
+        assert synth.call_count == 1
+
+    async def test_idempotency_key_with_different_body_422(self, client):
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        other = {**self.BODY, "messages": [{"role": "human", "content": "Something else."}]}
+        with (
+            patch("main.synthesize_image_prompt", new_callable=AsyncMock, return_value="prompt"),
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+        ):
+            await client.post("/generate", json=self.BODY, headers=headers)
+            response = await client.post("/generate", json=other, headers=headers)
+
+        assert response.status_code == 422
+
+    async def test_idempotency_key_with_different_body_while_running_422(self, client):
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        other = {**self.BODY, "messages": [{"role": "human", "content": "Something else."}]}
+        release = asyncio.Event()
+
+        async def slow_synthesize(*_args, **_kwargs):
+            await release.wait()
+            return "prompt"
+
+        with (
+            patch("main.synthesize_image_prompt", side_effect=slow_synthesize) as synth,
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+        ):
+            first = asyncio.create_task(client.post("/generate", json=self.BODY, headers=headers))
+            await asyncio.sleep(0.05)
+            conflicting = await client.post("/generate", json=other, headers=headers)
+            release.set()
+            first = await first
+            retry = await client.post("/generate", json=self.BODY, headers=headers)
+
+        assert conflicting.status_code == 422
+        assert first.status_code == 200
+        assert retry.json() == first.json()
+        assert synth.call_count == 1
+
+    async def test_failures_are_not_replayed(self, client):
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        with (
+            patch("main.synthesize_image_prompt", new_callable=AsyncMock, side_effect=[Exception("down"), "prompt"]),
+            patch("main.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+        ):
+            first = await client.post("/generate", json=self.BODY, headers=headers)
+            second = await client.post("/generate", json=self.BODY, headers=headers)
+
+        assert first.status_code == 502
+        assert second.status_code == 200
+
+
+class TestDeltaProtocol:
+    """Tests for the opt-in conversation delta protocol."""
+
+    async def test_chat_round_trip_with_deltas(self, client):
+        with patch("main.run_agent_turn", new_callable=AsyncMock, return_value="yes, and a cat.") as turn:
+            first = await client.post("/chat", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "A kitchen."}],
+                "stateful": True,
+            })
+            ids = first.json()
+            second = await client.post("/chat", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "And a window."}],
+                "conversation_id": ids["conversation_id"],
+                "prefix_hash": ids["prefix_hash"],
+            })
+
+        assert second.status_code == 200
+        assert second.json()["prefix_hash"] != ids["prefix_hash"]
+        history = turn.call_args[0][1]
+        assert [m.content for m in history] == ["A kitchen.", "yes, and a cat.", "And a window."]
+
+    async def test_unknown_prefix_409(self, client):
+        response = await client.post("/chat", json={
+            "persona_id": "magical_realist",
+            "messages": [{"role": "human", "content": "Hello."}],
+            "conversation_id": "missing",
+            "prefix_hash": "0" * 64,
+        })
+        assert response.status_code == 409
+
+    async def test_stateless_response_unchanged(self, client):
+        with patch("main.run_agent_turn", new_callable=AsyncMock, return_value="yes, and a cat."):
+            response = await client.post("/chat", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "A kitchen."}],
+            })
+        assert response.json() == {"message": "yes, and a cat."}
+
+    async def test_stream_done_event_carries_prefix(self, client):
+        async def fake_stream(*_args, **_kwargs):
+            yield "yes, and a cat."
+
+        with patch("main.stream_agent_turn", new=fake_stream):
+            response = await client.post("/chat/stream", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "A kitchen."}],
+                "stateful": True,
+            })
+
+        done = json.loads(response.text.strip().split("\n\n")[-1].removeprefix("data: "))
+        assert done["type"] == "done"
+        assert "conversation_id" in done
+        assert "prefix_hash" in done
+
 
 class TestGetSuggest:
     """Tests for GET /suggest."""
@@ -134,6 +461,30 @@ class TestGetSuggest:
         data = response.json()
         assert data["word"] == "LIGHTHOUSE"
 
+    async def test_suggest_prefers_warm_word_for_persona(self, client):
+        with patch("main.suggest_word", return_value="ZEBRA") as suggest_word:
+            response = await client.get("/suggest", params={"persona_id": "magical_realist"})
+
+        assert response.json()["word"] == "ZEBRA"
+        assert suggest_word.call_args.args[0].id == "magical_realist"
+
+
+class TestGetReady:
+    """Tests for GET /ready."""
+
+    async def test_not_ready_until_warm_up_finishes(self, client):
+        warmup = WarmUp()
+        with patch("main.get_warmup", return_value=warmup), patch("yesand.warmup.load_token_encoding"):
+            before = await client.get("/ready")
+            await warmup.run(modules=())
+            after = await client.get("/ready")
+
+        assert before.status_code == 503
+        assert before.json()["ready"] is False
+        assert after.status_code == 200
+        assert after.json()["ready"] is True
+        assert "tiktoken" in after.json()["steps"]
+
 
 class TestPostChatStream:
     """Tests for POST /chat/stream."""
@@ -170,3 +521,218 @@ class TestPostChatStream:
         assert events[0] == '{"type": "chunk", "content": "Yes, "}'
         assert events[1] == '{"type": "chunk", "content": "and the light shifts."}'
         assert events[-1] == '{"type": "done"}'
+
+    async def test_chat_stream_coalesces_chunks(self, client):
+        async def fake_stream(*_args, **_kwargs):
+            for token in ["Yes, ", "and ", "the ", "light ", "shifts."]:
+                yield token
+
+        with (
+            patch("main.stream_agent_turn", new=fake_stream),
+            patch("main.get_sse_coalesce_window_ms", return_value=50),
+        ):
+            response = await client.post("/chat/stream", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "A quiet room."}],
+            })
+
+        events = _sse_events(response.text)
+        assert events[0] == {"type": "chunk", "content": "Yes, and the light shifts."}
+        assert events[-1] == {"type": "done"}
+
+    async def test_chat_stream_opening_served_from_pool(self, client):
+        with patch("main.take_opening", return_value="yes, and a zebra sells lemonade."):
+            response = await client.post("/chat/stream", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "ZEBRA"}],
+            })
+
+        events = _sse_events(response.text)
+        assert events == [{"type": "chunk", "content": "yes, and a zebra sells lemonade."}, {"type": "done"}]
+
+
+class TestLocalImages:
+    """Tests for GET /local-images/{name}."""
+
+    NAME = "cd" * 32 + "-16x8.png"
+
+    async def test_serves_png(self, client):
+        response = await client.get(f"/local-images/{self.NAME}")
+
+        assert response.status_code == 200
+        assert response.content.startswith(b"\x89PNG")
+        assert "immutable" in response.headers["cache-control"]
+
+    async def test_conditional_request_returns_304(self, client):
+        first = await client.get(f"/local-images/{self.NAME}")
+        response = await client.get(f"/local-images/{self.NAME}", headers={"If-None-Match": first.headers["etag"]})
+        assert response.status_code == 304
+
+    async def test_unknown_name_is_404(self, client):
+        response = await client.get("/local-images/not-a-placeholder.png")
+        assert response.status_code == 404
+
+
+class TestStoredImages:
+    """Tests for GET /images/... and stored-image downloads."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = ImageStore(tmp_path / "store", "http://localhost:8000", workers=1)
+        with (
+            patch("main.get_image_store", return_value=store),
+            patch("yesand.image_store.get_image_store", return_value=store),
+        ):
+            yield store
+        store.close()
+
+    async def test_serves_original_with_immutable_caching(self, client, store):
+        image = await store.save(b"\x89PNG\r\n\x1a\n" + b"x" * 100)
+
+        response = await client.get(f"/images/{image.name}")
+        revalidated = await client.get(f"/images/{image.name}", headers={"If-None-Match": image.etag})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert "immutable" in response.headers["cache-control"]
+        assert revalidated.status_code == 304
+
+    async def test_unknown_image_is_404(self, client, store):
+        assert (await client.get("/images/" + "ab" * 32 + ".png")).status_code == 404
+        assert (await client.get("/images/" + "ab" * 32 + "/thumb.webp")).status_code == 404
+
+    async def test_proxy_download_served_from_store(self, client, store):
+        image = await store.save(b"\x89PNG\r\n\x1a\n" + b"x" * 100)
+
+        response = await client.get("/proxy-image", params={"url": store.url_for(image)})
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == 'attachment; filename="yesand.png"'
+        assert response.content == image.path.read_bytes()
+
+
+class TestProxyImage:
+    """Tests for GET /proxy-image."""
+
+    URL = "https://example.blob.core.windows.net/img.png"
+
+    @pytest.fixture
+    def upstream(self, tmp_path):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, content=b"\x89PNG" + b"x" * 100, headers={"content-type": "image/png"})
+
+        cache = ImageCache(tmp_path / "images", max_bytes=1 << 20, max_age=3600)
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with (
+            patch("main.get_image_cache", return_value=cache),
+            patch("main.get_http_client", return_value=http_client),
+        ):
+            yield calls
+
+    async def test_rejects_foreign_host(self, client):
+        response = await client.get("/proxy-image", params={"url": "https://evil.example.com/x.png"})
+        assert response.status_code == 400
+
+    async def test_serves_local_placeholder_without_fetching(self, client, upstream):
+        url = "http://localhost:8000/local-images/" + "ab" * 32 + "-8x8.png"
+        with patch("yesand.providers.get_local_image_base_url", return_value="http://localhost:8000"):
+            response = await client.get("/proxy-image", params={"url": url})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["content-disposition"] == 'attachment; filename="yesand.png"'
+        assert upstream == []
+
+    async def test_rejects_lookalike_host(self, client):
+        response = await client.get("/proxy-image", params={"url": "https://evilblob.core.windows.net/x.png"})
+        assert response.status_code == 400
+
+    async def test_configured_host_allowed(self, client, upstream):
+        with patch("main.get_proxy_image_hosts", return_value=("images.example.org",)):
+            response = await client.get("/proxy-image", params={"url": "https://cdn.images.example.org/x.png"})
+        assert response.status_code == 200
+
+    async def test_streams_then_serves_from_cache(self, client, upstream):
+        first = await client.get("/proxy-image", params={"url": self.URL})
+        second = await client.get("/proxy-image", params={"url": self.URL})
+
+        assert first.status_code == 200
+        assert first.headers["content-disposition"] == 'attachment; filename="yesand.png"'
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert "etag" in second.headers
+        assert len(upstream) == 1
+
+    async def test_blob_evicted_after_lookup_is_refetched(self, client, upstream):
+        import main
+
+        await client.get("/proxy-image", params={"url": self.URL})
+        cache = main.get_image_cache()
+        lookup = cache.lookup
+
+        def lookup_then_evict(url):
+            found = lookup(url)
+            found.path.unlink()
+            return found
+
+        with patch.object(cache, "lookup", side_effect=lookup_then_evict):
+            response = await client.get("/proxy-image", params={"url": self.URL})
+
+        assert response.status_code == 200
+        assert response.content.startswith(b"\x89PNG")
+        assert len(upstream) == 2
+
+    async def test_conditional_request_returns_304(self, client, upstream):
+        await client.get("/proxy-image", params={"url": self.URL})
+        cached = await client.get("/proxy-image", params={"url": self.URL})
+
+        response = await client.get(
+            "/proxy-image",
+            params={"url": self.URL},
+            headers={"If-None-Match": cached.headers["etag"]},
+        )
+        assert response.status_code == 304
+
+    async def test_weak_and_listed_etags_match(self, client, upstream):
+        await client.get("/proxy-image", params={"url": self.URL})
+        etag = (await client.get("/proxy-image", params={"url": self.URL})).headers["etag"]
+
+        params = {"url": self.URL}
+        listed = await client.get("/proxy-image", params=params, headers={"If-None-Match": f'"other", W/{etag}'})
+        other = await client.get("/proxy-image", params=params, headers={"If-None-Match": '"other"'})
+
+        assert listed.status_code == 304
+        assert other.status_code == 200
+
+    async def test_encoded_upstream_drops_content_length(self, client, tmp_path):
+        import gzip
+
+        body = b"\x89PNG" + b"x" * 100
+
+        def handler(request):
+            return httpx.Response(
+                200,
+                content=gzip.compress(body),
+                headers={"content-type": "image/png", "content-encoding": "gzip"},
+            )
+
+        cache = ImageCache(tmp_path / "images", max_bytes=1 << 20, max_age=3600)
+        with (
+            patch("main.get_image_cache", return_value=cache),
+            patch("main.get_http_client", return_value=httpx.AsyncClient(transport=httpx.MockTransport(handler))),
+        ):
+            response = await client.get("/proxy-image", params={"url": self.URL})
+
+        assert response.status_code == 200
+        assert response.content == body
+        assert cache.lookup(self.URL).path.read_bytes() == body
+
+    async def test_range_request_from_cache(self, client, upstream):
+        await client.get("/proxy-image", params={"url": self.URL})
+
+        response = await client.get("/proxy-image", params={"url": self.URL}, headers={"Range": "bytes=0-3"})
+        assert response.status_code == 206
+        assert response.content == b"\x89PNG"
@@ -0,0 +1,127 @@
+"""Tests for the in-process metrics registry and /metrics endpoint."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from yesand.metrics import MetricsRegistry, UpstreamTimer, llm_tokens, record_usage, upstream_seconds
+
+
+def _provider(llm):
+    return MagicMock(chat_model=MagicMock(return_value=llm))
+
+
+class TestMetricsRegistry:
+    """Tests for rendering counters, gauges and histograms."""
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        registry.counter("jobs_total", "Jobs.", ("kind",)).labels("a").inc(2)
+        registry.gauge("queue_depth", "Depth.").labels().set(3)
+
+        text = registry.render()
+
+        assert "# TYPE jobs_total counter" in text
+        assert 'jobs_total{kind="a"} 2' in text
+        assert "queue_depth 3" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.labels("/chat").observe(value)
+
+        text = registry.render()
+
+        assert 'latency_seconds_bucket{route="/chat",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/chat",le="1"} 3' in text
+        assert 'latency_seconds_bucket{route="/chat",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{route="/chat"} 4' in text
+        assert 'latency_seconds_sum{route="/chat"} 6.25' in text
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("odd_total", "Odd.", ("name",)).labels('a"b\\c').inc()
+        assert 'odd_total{name="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_wrong_label_count_rejected(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("x_total", "X.", ("a", "b"))
+        with pytest.raises(ValueError):
+            counter.labels("only-one")
+
+    def test_duplicate_name_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("x_total", "X.")
+        with pytest.raises(ValueError):
+            registry.gauge("x_total", "X.")
+
+
+class TestRecording:
+    """Tests for upstream timing and token usage helpers."""
+
+    def test_upstream_timer_observes(self):
+        child = upstream_seconds.labels("test_op", "test-model")
+        before = child.count
+
+        with UpstreamTimer("test_op", "test-model"):
+            pass
+
+        assert child.count == before + 1
+
+    def test_record_usage_counts_tokens(self):
+        prompt = llm_tokens.labels("test_usage", "m", "prompt")
+        completion = llm_tokens.labels("test_usage", "m", "completion")
+        before = prompt.value, completion.value
+
+        record_usage("test_usage", "m", MagicMock(usage_metadata={"input_tokens": 12, "output_tokens": 5}))
+
+        assert (prompt.value, completion.value) == (before[0] + 12, before[1] + 5)
+
+    def test_record_usage_ignores_missing_usage(self):
+        record_usage("test_usage_none", "m", MagicMock())
+        assert ("test_usage_none", "m", "prompt") not in llm_tokens._children
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics."""
+
+    async def test_exposes_route_latency(self, client):
+        await client.get("/personas")
+
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'yesand_http_request_duration_seconds_count{method="GET",route="/personas",status="200"}' in response.text
+        assert "yesand_http_requests_in_flight 1" in response.text
+
+    async def test_unknown_paths_share_one_label(self, client):
+        await client.get("/no-such-route-123")
+
+        response = await client.get("/metrics")
+
+        assert 'route="unmatched"' in response.text
+        assert "no-such-route-123" not in response.text
+
+    async def test_stream_records_time_to_first_token(self, client):
+        async def astream(_messages):
+            for content in ["Yes, and ", "a ", "fox."]:
+                yield MagicMock(content=content, usage_metadata=None)
+
+        llm = MagicMock()
+        llm.astream = astream
+        with (
+            patch("yesand.agent.get_provider", return_value=_provider(llm)),
+            patch("yesand.agent.get_text_model", return_value="ttft-model"),
+        ):
+            await client.post("/chat/stream", json={
+                "persona_id": "magical_realist",
+                "messages": [{"role": "human", "content": "A quiet room."}],
+            })
+
+        response = await client.get("/metrics")
+
+        assert 'yesand_stream_time_to_first_token_seconds_count{model="ttft-model"} 1' in response.text
+        assert 'yesand_stream_tokens_per_second_count{model="ttft-model"} 1' in response.text
+        assert 'yesand_upstream_duration_seconds_count{operation="agent_stream",model="ttft-model"} 1' in response.text
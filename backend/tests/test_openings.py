@@ -0,0 +1,111 @@
+"""Tests for the pre-warmed opening pool."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from yesand.conversation import Conversation
+from yesand.openings import OpeningPool
+from yesand.persona import Persona
+from yesand.scheduler import Priority
+
+
+def _pool(**overrides) -> OpeningPool:
+    options = {"words": ["LANTERN", "ZEBRA"], "size": 2, "ttl": 60, "refill_per_minute": 600}
+    options.update(overrides)
+    return OpeningPool(**options)
+
+
+async def _settle(pool: OpeningPool) -> None:
+    while pool._refilling:
+        await asyncio.sleep(0)
+
+
+class TestOpeningPool:
+    """Tests for OpeningPool."""
+
+    async def test_refill_then_take(self, sample_persona):
+        pool = _pool(words=["LANTERN"])
+        agent = AsyncMock(return_value="yes, and the lantern hums.")
+
+        with patch("yesand.openings.run_agent_turn", agent):
+            pool.refill([sample_persona])
+            await _settle(pool)
+
+        assert agent.call_args.kwargs["priority"] is Priority.BACKGROUND
+        assert agent.call_args.args[1].as_dicts() == [{"role": "human", "content": "LANTERN"}]
+        assert pool.suggest(sample_persona) == "LANTERN"
+        assert pool.take(sample_persona, Conversation().add("human", " lantern! ")) == "yes, and the lantern hums."
+        # Each opening is served once.
+        assert pool.take(sample_persona, Conversation().add("human", "LANTERN")) is None
+        assert pool.stats()["hits"] == 1
+        assert pool.stats()["misses"] == 1
+
+    async def test_only_first_turn_that_is_a_pooled_word_matches(self, sample_persona):
+        pool = _pool()
+
+        assert pool.match(Conversation().add("human", "A lantern in the rain")) is None
+        assert pool.match(Conversation().add("human", "ZEBRA").add("ai", "yes, and")) is None
+        assert pool.match(Conversation().add("human", "PINEAPPLE")) is None
+        assert pool.match(Conversation().add("human", "zebra.")) == "ZEBRA"
+
+    async def test_refill_rate_and_one_in_flight_per_persona(self, sample_persona):
+        pool = _pool(refill_per_minute=1)
+        gate = asyncio.Event()
+
+        async def agent(*_args, **_kwargs):
+            await gate.wait()
+            return "yes, and stripes."
+
+        with patch("yesand.openings.run_agent_turn", agent):
+            pool.refill([sample_persona])
+            pool.refill([sample_persona])
+            assert pool.stats()["refilling"] == 1
+            gate.set()
+            await _settle(pool)
+            # The next refill for this persona is a minute away.
+            pool.refill([sample_persona])
+
+        assert pool.stats()["refilling"] == 0
+        assert pool.stats()["generated"] == 1
+
+    async def test_per_persona_rate_zero_disables_refill(self, sample_persona):
+        pool = _pool(persona_rates={sample_persona.id: 0})
+
+        pool.refill([sample_persona])
+
+        assert pool.stats()["refilling"] == 0
+
+    async def test_pool_size_limit_and_duplicates(self, sample_persona):
+        pool = _pool(words=["LANTERN"], size=2)
+        replies = iter(["yes, and one.", "yes, and one.", "yes, and two.", "yes, and three."])
+
+        with patch("yesand.openings.run_agent_turn", AsyncMock(side_effect=lambda *a, **k: next(replies))):
+            for _ in range(4):
+                pool._next_refill.clear()
+                pool.refill([sample_persona])
+                await _settle(pool)
+
+        assert pool.stats()["ready"] == 2
+        assert pool.stats()["duplicates"] == 1
+        assert pool.stats()["generated"] == 2
+
+    async def test_openings_expire(self, sample_persona):
+        pool = _pool(words=["LANTERN"], ttl=0)
+
+        with patch("yesand.openings.run_agent_turn", AsyncMock(return_value="yes, and gone.")):
+            pool.refill([sample_persona])
+            await _settle(pool)
+
+        assert pool.take(sample_persona, Conversation().add("human", "LANTERN")) is None
+        assert pool.suggest(sample_persona) is None
+        assert pool.stats()["expired"] == 1
+
+    async def test_persona_edit_discards_openings(self, sample_persona):
+        pool = _pool(words=["LANTERN"])
+
+        with patch("yesand.openings.run_agent_turn", AsyncMock(return_value="yes, and old.")):
+            pool.refill([sample_persona])
+            await _settle(pool)
+        edited = Persona(**{**sample_persona.model_dump(), "agent_system_prompt": "Respond at length."})
+
+        assert pool.take(edited, Conversation().add("human", "LANTERN")) is None
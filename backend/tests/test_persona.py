@@ -1,11 +1,22 @@
 """Tests for persona loading and Pydantic models."""
 
+import asyncio
+import os
+import shutil
 from unittest.mock import patch
 
 import pytest
 from pydantic import ValidationError
 
-from yesand.persona import Persona, PersonaAesthetic, PersonaVoice, get_persona, load_personas
+from yesand.persona import (
+    Persona,
+    PersonaAesthetic,
+    PersonaRegistry,
+    PersonaVoice,
+    get_persona,
+    load_personas,
+    persona_registry,
+)
 
 
 class TestPersonaModel:
@@ -34,7 +45,7 @@ class TestLoadPersonas:
     """Tests for YAML loading functions."""
 
     def test_load_personas_from_yaml(self, personas_dir):
-        load_personas.cache_clear()
+        persona_registry.clear()
         with patch("yesand.persona.PERSONAS_DIR", personas_dir):
             result = load_personas()
 
@@ -43,7 +54,7 @@ class TestLoadPersonas:
         assert result["test_persona"].name == "Test Persona"
 
     def test_get_persona_found(self, personas_dir):
-        load_personas.cache_clear()
+        persona_registry.clear()
         with patch("yesand.persona.PERSONAS_DIR", personas_dir):
             persona = get_persona("test_persona")
 
@@ -51,16 +62,96 @@ class TestLoadPersonas:
         assert persona.id == "test_persona"
 
     def test_get_persona_not_found(self, personas_dir):
-        load_personas.cache_clear()
+        persona_registry.clear()
         with patch("yesand.persona.PERSONAS_DIR", personas_dir):
             persona = get_persona("nonexistent")
 
         assert persona is None
 
-    def test_lru_cache_returns_same_object(self, personas_dir):
-        load_personas.cache_clear()
+    def test_snapshot_returns_same_object(self, personas_dir):
+        persona_registry.clear()
         with patch("yesand.persona.PERSONAS_DIR", personas_dir):
             first = load_personas()
             second = load_personas()
 
         assert first is second
+
+
+class TestPersonaPrecompiled:
+    """Tests for prebuilt messages and version hashes."""
+
+    def test_prebuilt_system_messages(self, sample_persona):
+        assert sample_persona.agent_system_message.content == sample_persona.agent_system_prompt
+        assert sample_persona.synthesizer_system_message.content == sample_persona.synthesizer_system_prompt
+
+    def test_version_is_stable(self, sample_persona):
+        rebuilt = Persona(**sample_persona.model_dump())
+        assert rebuilt.version == sample_persona.version
+
+    def test_version_changes_with_content(self, sample_persona):
+        data = sample_persona.model_dump()
+        data["agent_system_prompt"] = "Something else."
+        assert Persona(**data).version != sample_persona.version
+
+    def test_persona_is_immutable(self, sample_persona):
+        with pytest.raises(ValidationError):
+            sample_persona.name = "Renamed"
+
+
+class TestPersonaRegistry:
+    """Tests for hot-reloading persona snapshots."""
+
+    @pytest.fixture
+    def live_dir(self, tmp_path, personas_dir):
+        shutil.copy(personas_dir / "test_persona.yaml", tmp_path / "test_persona.yaml")
+        registry = PersonaRegistry()
+        with patch("yesand.persona.PERSONAS_DIR", tmp_path):
+            yield tmp_path, registry
+
+    def _edit(self, path, old, new):
+        path.write_text(path.read_text().replace(old, new))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_unchanged_directory_keeps_snapshot(self, live_dir):
+        _, registry = live_dir
+        first = registry.snapshot()
+
+        assert registry.reload() is False
+        assert registry.snapshot() is first
+
+    def test_edit_swaps_in_new_snapshot(self, live_dir):
+        directory, registry = live_dir
+        first = registry.snapshot()
+
+        self._edit(directory / "test_persona.yaml", "Test Persona", "Edited Persona")
+
+        assert registry.reload() is True
+        second = registry.snapshot()
+        assert second.personas["test_persona"].name == "Edited Persona"
+        assert second.version != first.version
+        assert first.personas["test_persona"].name == "Test Persona"
+
+    def test_broken_file_keeps_previous_snapshot(self, live_dir):
+        directory, registry = live_dir
+        first = registry.snapshot()
+
+        (directory / "broken.yaml").write_text("id: broken\n")
+
+        assert registry.reload() is False
+        assert registry.snapshot() is first
+
+    async def test_watch_picks_up_changes(self, live_dir):
+        directory, registry = live_dir
+        registry.snapshot()
+        watcher = asyncio.create_task(registry.watch(interval=0.01))
+        try:
+            self._edit(directory / "test_persona.yaml", "Test Persona", "Watched Persona")
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if registry.snapshot().personas["test_persona"].name == "Watched Persona":
+                    break
+        finally:
+            watcher.cancel()
+
+        assert registry.snapshot().personas["test_persona"].name == "Watched Persona"
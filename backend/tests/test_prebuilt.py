@@ -0,0 +1,63 @@
+"""Tests for pre-serialized response bodies."""
+
+import gzip
+import json
+
+from yesand.prebuilt import etag_matches, prebuild_json
+
+PAYLOAD = {"items": [{"id": i, "name": f"item {i}"} for i in range(50)]}
+
+
+class TestPrebuildJson:
+    """Tests for prebuild_json and PrebuiltResponse."""
+
+    def test_identity_body_is_compact_json(self):
+        prebuilt = prebuild_json(PAYLOAD, "no-cache")
+        response = prebuilt.respond(None, None)
+
+        assert json.loads(response.body) == PAYLOAD
+        assert b", " not in response.body
+        assert "content-encoding" not in response.headers
+
+    def test_etag_is_stable_for_same_payload(self):
+        assert prebuild_json(PAYLOAD, "no-cache").etag == prebuild_json(dict(PAYLOAD), "no-cache").etag
+
+    def test_etag_changes_with_payload(self):
+        assert prebuild_json(PAYLOAD, "no-cache").etag != prebuild_json({"items": []}, "no-cache").etag
+
+    def test_gzip_variant_round_trips(self):
+        response = prebuild_json(PAYLOAD, "no-cache").respond(None, "gzip, deflate")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.body)) == PAYLOAD
+
+    def test_encoding_rejected_with_q_zero(self):
+        prebuilt = prebuild_json(PAYLOAD, "no-cache")
+        assert prebuilt.encoding_for("gzip;q=0, br;q=0") is None
+
+    def test_small_bodies_are_not_compressed(self):
+        prebuilt = prebuild_json({"a": 1}, "no-cache")
+        assert prebuilt.encoding_for("gzip, br") is None
+
+    def test_not_modified_for_any_variant_etag(self):
+        prebuilt = prebuild_json(PAYLOAD, "public, max-age=60")
+        gzip_etag = prebuilt.respond(None, "gzip").headers["etag"]
+
+        response = prebuilt.respond(gzip_etag, None)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["cache-control"] == "public, max-age=60"
+
+
+class TestEtagMatches:
+    """Tests for If-None-Match comparison."""
+
+    def test_list_and_weak_tags(self):
+        assert etag_matches('"other", W/"abc"', frozenset({'"abc"'}))
+
+    def test_wildcard(self):
+        assert etag_matches("*", frozenset({'"abc"'}))
+
+    def test_no_match(self):
+        assert not etag_matches('"abcd"', frozenset({'"abc"'}))
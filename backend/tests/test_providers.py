@@ -0,0 +1,134 @@
+"""Tests for model providers."""
+
+import zlib
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from yesand import providers
+from yesand.providers import (
+    LocalProvider,
+    OpenAICompatibleProvider,
+    OpenAIProvider,
+    get_provider,
+    local_image_name,
+    parse_local_image_name,
+    render_placeholder,
+)
+
+MESSAGES = [SystemMessage(content="You are a test persona."), HumanMessage(content="A quiet kitchen.")]
+
+
+@pytest.fixture(autouse=True)
+def reset_providers(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    providers._providers.clear()
+    yield
+    providers._providers.clear()
+
+
+class TestGetProvider:
+    """Tests for per-role provider selection."""
+
+    def test_defaults_to_openai(self):
+        with patch("yesand.providers.get_provider_name", return_value="openai"):
+            assert isinstance(get_provider("agent"), OpenAIProvider)
+
+    def test_role_specific_choice(self):
+        names = {"agent": "local", "image": "openai"}
+        with patch("yesand.providers.get_provider_name", side_effect=names.get):
+            assert isinstance(get_provider("agent"), LocalProvider)
+            assert type(get_provider("image")) is OpenAIProvider
+
+    def test_provider_is_reused(self):
+        with patch("yesand.providers.get_provider_name", return_value="local"):
+            assert get_provider("agent") is get_provider("agent")
+
+    def test_compatible_endpoint_change_builds_new_provider(self):
+        with (
+            patch("yesand.providers.get_provider_name", return_value="compatible"),
+            patch("yesand.providers.get_compatible_api_key", return_value="key"),
+            patch("yesand.providers.get_compatible_base_url", return_value="http://one:8000/v1"),
+        ):
+            first = get_provider("agent")
+            assert get_provider("agent") is first
+            with patch("yesand.providers.get_compatible_base_url", return_value="http://two:8000/v1"):
+                second = get_provider("agent")
+
+        assert second is not first
+        assert second.base_url == "http://two:8000/v1"
+
+    def test_unknown_provider_rejected(self):
+        with patch("yesand.providers.get_provider_name", return_value="nope"):
+            with pytest.raises(ValueError):
+                get_provider("agent")
+
+    def test_compatible_requires_base_url(self):
+        with pytest.raises(ValueError):
+            OpenAICompatibleProvider("")
+
+
+class TestOpenAIProvider:
+    """Tests for the OpenAI and compatible providers."""
+
+    def test_compatible_chat_model_uses_base_url(self):
+        provider = OpenAICompatibleProvider("http://127.0.0.1:9999/v1")
+        llm = provider.chat_model("llama3", temperature=0.5)
+
+        assert llm.openai_api_base == "http://127.0.0.1:9999/v1"
+        assert llm is provider.chat_model("llama3", temperature=0.5)
+        assert llm is not OpenAIProvider().chat_model("llama3", temperature=0.5)
+
+
+class TestLocalProvider:
+    """Tests for the in-process deterministic provider."""
+
+    async def test_reply_is_deterministic(self):
+        llm = LocalProvider("agent").chat_model("any", temperature=0.9)
+
+        first = await llm.ainvoke(MESSAGES)
+        second = await llm.ainvoke(MESSAGES)
+        other = await llm.ainvoke([MESSAGES[0], HumanMessage(content="A stormy pier.")])
+
+        assert first.content == second.content
+        assert first.content != other.content
+        assert first.content.startswith("Yes, and ")
+        assert first.usage_metadata["output_tokens"] > 0
+
+    async def test_stream_matches_invoke(self):
+        llm = LocalProvider("synthesizer").chat_model("any", temperature=0.3, streaming=True)
+
+        chunks = [chunk async for chunk in llm.astream(MESSAGES)]
+
+        assert "".join(c.content for c in chunks) == (await llm.ainvoke(MESSAGES)).content
+        assert len(chunks) > 2
+        assert any(c.usage_metadata and c.usage_metadata["output_tokens"] > 0 for c in chunks)
+
+    async def test_images_point_at_local_route(self):
+        provider = LocalProvider("image", image_base_url="http://localhost:8000/")
+
+        urls = await provider.generate_images("a cat", "dall-e-3", 2, "256x128", None)
+
+        assert len(set(urls)) == 2
+        assert all(url.startswith("http://localhost:8000/local-images/") for url in urls)
+        assert urls == await provider.generate_images("a cat", "dall-e-3", 2, "256x128", None)
+        with patch("yesand.providers.get_local_image_base_url", return_value="http://localhost:8000"):
+            assert parse_local_image_name(local_image_name(urls[0]))[1:] == (256, 128)
+
+
+class TestPlaceholders:
+    """Tests for placeholder image names and rendering."""
+
+    def test_rejects_bad_names(self):
+        assert parse_local_image_name("../../etc/passwd") is None
+        assert parse_local_image_name("ab" * 32 + "-0x10.png") is None
+        assert parse_local_image_name("ab" * 32 + "-9999x10.png") is None
+
+    def test_renders_valid_png(self):
+        png = render_placeholder("ab" * 32, 4, 3)
+
+        assert png.startswith(b"\x89PNG\r\n\x1a\n")
+        idat_length = int.from_bytes(png[33:37], "big")
+        raw = zlib.decompress(png[41 : 41 + idat_length])
+        assert len(raw) == 3 * (1 + 4 * 3)
@@ -0,0 +1,124 @@
+"""Tests for the rate-limit-aware upstream scheduler."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from yesand.scheduler import Priority, TokenBucket, UpstreamScheduler, parse_reset, upstream_call
+
+
+class TestParseReset:
+    """Tests for parse_reset."""
+
+    @pytest.mark.parametrize(
+        ("value", "seconds"),
+        [("20ms", 0.02), ("1s", 1.0), ("6m0s", 360.0), ("1h2m3.5s", 3723.5), ("7", 7.0), (None, None)],
+    )
+    def test_formats(self, value, seconds):
+        assert parse_reset(value) == seconds
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_unlimited_always_admits(self):
+        bucket = TokenBucket(0)
+        assert bucket.can_take(10_000, now=0.0)
+
+    def test_refills_over_time(self):
+        bucket = TokenBucket(60)
+        bucket.available = 0
+        bucket._updated_at = 0.0
+
+        assert not bucket.can_take(1, now=0.5)
+        assert bucket.can_take(1, now=1.0)
+
+    def test_observe_adopts_server_view(self):
+        bucket = TokenBucket(0)
+        bucket.observe(limit=100, remaining=0, reset=2.0, now=10.0)
+
+        assert bucket.limit == 100
+        assert bucket.seconds_until(1, now=10.0) == pytest.approx(2.0)
+
+
+class TestUpstreamScheduler:
+    """Tests for UpstreamScheduler."""
+
+    async def test_admits_immediately_when_unlimited(self):
+        scheduler = UpstreamScheduler()
+        await scheduler.acquire("gpt-4o", Priority.CHAT)
+        assert scheduler.stats()["gpt-4o"]["admitted"] == 1
+
+    async def test_priority_order_when_saturated(self):
+        scheduler = UpstreamScheduler(rpm=600)
+        state = scheduler._state("gpt-4o")
+        state.requests.available = 0
+        order = []
+
+        async def call(priority):
+            await scheduler.acquire("gpt-4o", priority)
+            order.append(priority)
+
+        tasks = [asyncio.create_task(call(p)) for p in (Priority.IMAGE, Priority.SYNTHESIS, Priority.CHAT_STREAM)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["gpt-4o"]["queue_depth"] == 3
+        await asyncio.gather(*tasks)
+
+        assert order == [Priority.CHAT_STREAM, Priority.SYNTHESIS, Priority.IMAGE]
+        assert scheduler.stats()["gpt-4o"]["max_wait_ms"] > 0
+
+    async def test_learns_limits_from_headers(self):
+        scheduler = UpstreamScheduler()
+        response = httpx.Response(200, headers={
+            "x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-requests": "499",
+            "x-ratelimit-limit-tokens": "30000",
+            "x-ratelimit-remaining-tokens": "29000",
+        })
+
+        scheduler.observe("gpt-4o", response)
+
+        stats = scheduler.stats()["gpt-4o"]
+        assert stats["rpm_limit"] == 500
+        assert stats["tpm_limit"] == 30000
+
+    async def test_429_pauses_model(self):
+        scheduler = UpstreamScheduler()
+        scheduler.observe("dall-e-2", httpx.Response(429, headers={"retry-after": "0.05"}))
+
+        waiter = asyncio.create_task(scheduler.acquire("dall-e-2", Priority.IMAGE))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await asyncio.wait_for(waiter, timeout=1)
+        assert scheduler.stats()["dall-e-2"]["rate_limited"] == 1
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = UpstreamScheduler(rpm=1)
+        scheduler._state("gpt-4o").requests.available = 0
+
+        waiter = asyncio.create_task(scheduler.acquire("gpt-4o", Priority.CHAT))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert scheduler.stats()["gpt-4o"]["queue_depth"] == 0
+
+    async def test_response_listener_uses_calling_model(self):
+        scheduler = UpstreamScheduler()
+        await scheduler.acquire("gpt-4o", Priority.CHAT)
+        with upstream_call("gpt-4o"):
+            scheduler._on_response(httpx.Response(200, headers={"x-ratelimit-limit-requests": "42"}))
+
+        assert scheduler.stats()["gpt-4o"]["rpm_limit"] == 42
+
+    async def test_responses_after_the_call_are_not_attributed(self):
+        scheduler = UpstreamScheduler()
+        await scheduler.acquire("gpt-4o", Priority.CHAT)
+        with upstream_call("gpt-4o"):
+            pass
+        # e.g. an image_store fetch later in the same request task
+        scheduler._on_response(httpx.Response(200, headers={"x-ratelimit-limit-requests": "7"}))
+
+        assert scheduler.stats()["gpt-4o"]["rpm_limit"] == 0
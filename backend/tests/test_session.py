@@ -0,0 +1,260 @@
+"""Tests for the /ws/session WebSocket endpoint."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from yesand.conversation_store import get_conversation_store
+from yesand.persona import persona_registry
+
+
+@pytest.fixture
+def ws_client():
+    from main import app
+
+    # Other test modules leave the registry pointing at tests/personas.
+    persona_registry.clear()
+    return TestClient(app)
+
+
+def _start(ws, persona_id="magical_realist", **fields) -> dict:
+    ws.send_json({"type": "start", "persona_id": persona_id, **fields})
+    return ws.receive_json()
+
+
+def _receive_until_done(ws) -> list[dict]:
+    events = []
+    while not events or events[-1]["type"] not in ("done", "error"):
+        events.append(ws.receive_json())
+    return events
+
+
+class TestSessionChat:
+    """Tests for chat turns over a session."""
+
+    def test_turns_send_only_new_messages(self, ws_client):
+        histories = []
+
+        async def fake_stream(_persona, history):
+            histories.append(history.as_dicts())
+            yield "Yes, and "
+            yield f"reply {len(histories)}."
+
+        with patch("yesand.session.stream_agent_turn", new=fake_stream), ws_client.websocket_connect("/ws/session") as ws:
+            ready = _start(ws)
+            ws.send_json({"type": "chat", "content": "A quiet room."})
+            first = _receive_until_done(ws)
+            ws.send_json({"type": "chat", "content": "With a piano."})
+            second = _receive_until_done(ws)
+
+        assert ready["type"] == "ready"
+        assert ready["persona_id"] == "magical_realist"
+        assert ready["turns"] == 0
+        assert first == [
+            {"type": "chunk", "content": "Yes, and "},
+            {"type": "chunk", "content": "reply 1."},
+            {"type": "done", "prefix_hash": first[-1]["prefix_hash"]},
+        ]
+        assert histories[1] == [
+            {"role": "human", "content": "A quiet room."},
+            {"role": "ai", "content": "Yes, and reply 1."},
+            {"role": "human", "content": "With a piano."},
+        ]
+        stored = get_conversation_store().get(ready["conversation_id"])
+        assert stored.prefix_hash == second[-1]["prefix_hash"]
+        assert len(stored) == 4
+
+    def test_start_seeds_history(self, ws_client, sample_history):
+        seen = []
+
+        async def fake_stream(_persona, history):
+            seen.append(len(history))
+            yield "Yes, and more."
+
+        with patch("yesand.session.stream_agent_turn", new=fake_stream), ws_client.websocket_connect("/ws/session") as ws:
+            ready = _start(ws, messages=sample_history)
+            ws.send_json({"type": "chat", "content": "Then a knock."})
+            _receive_until_done(ws)
+
+        assert ready["turns"] == 4
+        assert seen == [5]
+
+    def test_resume_from_stored_prefix(self, ws_client, sample_history):
+        with ws_client.websocket_connect("/ws/session") as ws:
+            first = _start(ws, messages=sample_history)
+        with ws_client.websocket_connect("/ws/session") as ws:
+            resumed = _start(ws, conversation_id=first["conversation_id"], prefix_hash=first["prefix_hash"])
+            stale = _start(ws, conversation_id=first["conversation_id"], prefix_hash="stale")
+
+        assert resumed["turns"] == 4
+        assert resumed["prefix_hash"] == first["prefix_hash"]
+        assert stale["type"] == "error"
+        assert stale["status"] == 409
+
+    def test_opening_served_from_pool(self, ws_client):
+        with (
+            patch("yesand.session.take_opening", return_value="yes, and a zebra sells lemonade."),
+            ws_client.websocket_connect("/ws/session") as ws,
+        ):
+            _start(ws)
+            ws.send_json({"type": "chat", "content": "ZEBRA"})
+            events = _receive_until_done(ws)
+
+        assert events[0] == {"type": "chunk", "content": "yes, and a zebra sells lemonade."}
+        assert events[-1]["type"] == "done"
+
+    def test_upstream_error_keeps_session_usable(self, ws_client):
+        calls = []
+
+        async def flaky_stream(_persona, history):
+            calls.append(len(history))
+            if len(calls) == 1:
+                raise RuntimeError("LLM down")
+            yield "Yes, and it recovers."
+
+        with patch("yesand.session.stream_agent_turn", new=flaky_stream), ws_client.websocket_connect("/ws/session") as ws:
+            _start(ws)
+            ws.send_json({"type": "chat", "content": "A quiet room."})
+            failed = _receive_until_done(ws)
+            ws.send_json({"type": "chat", "content": "A quiet room."})
+            recovered = _receive_until_done(ws)
+
+        assert failed == [{"type": "error", "status": 502, "message": "LLM error: LLM down"}]
+        assert recovered[-1]["type"] == "done"
+        # The failed turn never entered the history.
+        assert calls == [1, 1]
+
+
+class TestSessionCancel:
+    """Tests for cancelling a running turn."""
+
+    def test_cancel_stops_upstream_and_drops_turn(self, ws_client):
+        closed = []
+        histories = []
+
+        async def slow_stream(_persona, history):
+            histories.append(len(history))
+            if len(histories) == 1:
+                try:
+                    yield "Yes, and"
+                    await asyncio.sleep(3600)
+                finally:
+                    closed.append(True)
+            else:
+                yield "Yes, and again."
+
+        with patch("yesand.session.stream_agent_turn", new=slow_stream), ws_client.websocket_connect("/ws/session") as ws:
+            _start(ws)
+            ws.send_json({"type": "chat", "content": "A quiet room."})
+            assert ws.receive_json() == {"type": "chunk", "content": "Yes, and"}
+            ws.send_json({"type": "chat", "content": "Too soon."})
+            busy = ws.receive_json()
+            ws.send_json({"type": "cancel"})
+            cancelled = ws.receive_json()
+            ws.send_json({"type": "chat", "content": "Another room."})
+            events = _receive_until_done(ws)
+
+        assert busy["status"] == 429
+        assert cancelled == {"type": "cancelled"}
+        assert closed == [True]
+        assert events[-1]["type"] == "done"
+        assert histories == [1, 1]
+
+
+class TestSessionGenerate:
+    """Tests for image generation over a session."""
+
+    def test_generate_uses_session_history(self, ws_client):
+        histories = []
+
+        async def fake_stream(_persona, history):
+            yield "Yes, and a moth."
+
+        async def fake_prompt(_persona, history, use_cache=True):
+            histories.append(history.as_dicts())
+            yield "A moth "
+            yield "at a window"
+
+        with (
+            patch("yesand.session.stream_agent_turn", new=fake_stream),
+            patch("yesand.session.stream_image_prompt", new=fake_prompt),
+            patch("yesand.session.generate_image", new_callable=AsyncMock, return_value="https://example.com/img.png"),
+            ws_client.websocket_connect("/ws/session") as ws,
+        ):
+            _start(ws)
+            ws.send_json({"type": "chat", "content": "A porch light."})
+            _receive_until_done(ws)
+            ws.send_json({"type": "generate"})
+            events = _receive_until_done(ws)
+
+        assert [event["type"] for event in events] == [
+            "prompt_chunk", "prompt_chunk", "prompt_ready", "image", "done",
+        ]  # fmt: skip
+        assert events[2]["prompt"] == "A moth at a window"
+        assert events[3]["image_url"] == "https://example.com/img.png"
+        assert histories == [[
+            {"role": "human", "content": "A porch light."},
+            {"role": "ai", "content": "Yes, and a moth."},
+        ]]
+
+    def test_image_error_is_reported(self, ws_client):
+        async def fake_prompt(*_args, **_kwargs):
+            yield "A prompt"
+
+        with (
+            patch("yesand.session.stream_image_prompt", new=fake_prompt),
+            patch("yesand.session.generate_image", new_callable=AsyncMock, side_effect=Exception("quota")),
+            ws_client.websocket_connect("/ws/session") as ws,
+        ):
+            _start(ws)
+            ws.send_json({"type": "generate"})
+            events = _receive_until_done(ws)
+
+        assert events[-1] == {"type": "error", "status": 502, "message": "Image generation error: quota"}
+
+
+class TestSessionProtocol:
+    """Tests for protocol errors and the idle timeout."""
+
+    def test_protocol_errors(self, ws_client):
+        with ws_client.websocket_connect("/ws/session") as ws:
+            ws.send_json({"type": "chat", "content": "Hello."})
+            no_persona = ws.receive_json()
+            unknown = _start(ws, persona_id="nonexistent")
+            ws.send_text("not json")
+            invalid = ws.receive_json()
+            ws.send_json({"type": "dance"})
+            bad_type = ws.receive_json()
+            ws.send_bytes(b'{"type": "cancel"}')
+            binary = ws.receive_json()
+            still_open = _start(ws)
+
+        assert no_persona["status"] == 400
+        assert unknown["status"] == 404
+        assert invalid["status"] == 422
+        assert bad_type["status"] == 422
+        assert binary == {"type": "error", "status": 422, "message": "Invalid message: frames must be JSON text"}
+        assert still_open["type"] == "ready"
+
+    def test_idle_socket_is_closed(self, ws_client):
+        with (
+            patch("main.get_ws_session_idle_timeout", return_value=0.05),
+            ws_client.websocket_connect("/ws/session") as ws,
+        ):
+            with pytest.raises(WebSocketDisconnect) as closed:
+                ws.receive_json()
+
+        assert closed.value.code == 1000
+
+    def test_stats_count_sessions(self, ws_client):
+        from yesand.session import session_stats
+
+        before = session_stats()["opened"]
+        with ws_client.websocket_connect("/ws/session") as ws:
+            _start(ws)
+
+        assert session_stats()["opened"] == before + 1
+        assert ws_client.get("/stats").json()["sessions"]["active"] == 0
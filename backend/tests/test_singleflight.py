@@ -0,0 +1,74 @@
+"""Tests for in-flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from yesand.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight."""
+
+    async def test_concurrent_calls_share_one_task(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "result"
+
+        waiters = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == ["result"] * 3
+        assert calls == 1
+        assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 2}
+
+    async def test_sequential_calls_run_again(self):
+        flights = SingleFlight()
+
+        async def work():
+            return "result"
+
+        await flights.do("key", work)
+        await flights.do("key", work)
+
+        assert flights.started == 2
+
+    async def test_errors_propagate_to_all_waiters(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            flights.do("key", work),
+            flights.do("key", work),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_task(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "result"
+
+        first = asyncio.create_task(flights.do("key", work))
+        second = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "result"
@@ -0,0 +1,143 @@
+"""Tests for speculative background prompt synthesis."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from yesand.scheduler import Priority
+from yesand.speculation import SpeculativeSynthesizer
+from yesand.synthesizer import get_prompt_cache, synthesize_image_prompt
+
+
+def _provider(llm):
+    return MagicMock(chat_model=MagicMock(return_value=llm))
+
+
+@pytest.fixture(autouse=True)
+async def clear_prompt_cache():
+    await get_prompt_cache().clear()
+    yield
+    await get_prompt_cache().clear()
+
+
+def _mock_llm(content="prompt", gate: asyncio.Event | None = None):
+    async def ainvoke(_messages):
+        if gate is not None:
+            await gate.wait()
+        return MagicMock(content=content)
+
+    llm = MagicMock()
+    llm.ainvoke = AsyncMock(side_effect=ainvoke)
+    return llm
+
+
+class TestSpeculativeSynthesizer:
+    """Tests for SpeculativeSynthesizer."""
+
+    async def test_speculated_prompt_is_used_by_generate(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=2)
+        llm = _mock_llm()
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(llm)):
+            speculator.speculate(sample_persona, sample_history)
+            await asyncio.sleep(0.01)
+            await speculator.claim(sample_persona, sample_history)
+            prompt = await synthesize_image_prompt(sample_persona, sample_history)
+
+        assert prompt == "prompt"
+        assert llm.ainvoke.call_count == 1
+        assert speculator.stats()["used"] == 1
+
+    async def test_newer_turn_cancels_running_speculation(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=2)
+        gate = asyncio.Event()
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(_mock_llm(gate=gate))):
+            speculator.speculate(sample_persona, sample_history[:2])
+            await asyncio.sleep(0.01)
+            speculator.speculate(sample_persona, sample_history)
+            await asyncio.sleep(0.01)
+            gate.set()
+            await speculator.claim(sample_persona, sample_history)
+
+        stats = speculator.stats()
+        assert stats["cancelled"] == 1
+        assert stats["wasted"] == 1
+        assert stats["used"] == 1
+
+    async def test_unclaimed_result_counts_as_wasted(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=2)
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(_mock_llm())):
+            speculator.speculate(sample_persona, sample_history[:2])
+            await asyncio.sleep(0.01)
+            speculator.speculate(sample_persona, sample_history)
+            await speculator.claim(sample_persona, sample_history)
+
+        assert speculator.stats()["wasted"] == 1
+        assert speculator.stats()["cancelled"] == 0
+
+    async def test_concurrency_cap_and_queued_speculation_is_skipped(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=1)
+        gate = asyncio.Event()
+        llm = _mock_llm(gate=gate)
+        other = sample_persona.model_copy(update={"id": "other"})
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(llm)):
+            speculator.speculate(sample_persona, sample_history)
+            speculator.speculate(other, sample_history)
+            await asyncio.sleep(0.01)
+            assert llm.ainvoke.call_count == 1
+            # Still queued behind the cap: /generate does not wait for it.
+            await speculator.claim(other, sample_history)
+            gate.set()
+            await speculator.claim(sample_persona, sample_history)
+
+        assert llm.ainvoke.call_count == 1
+        assert speculator.stats()["skipped"] == 1
+        assert speculator.stats()["used"] == 1
+
+    async def test_same_opening_from_different_users_does_not_supersede(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=2)
+        gate = asyncio.Event()
+        first_user = sample_history
+        second_user = sample_history[:1] + [{"role": "ai", "content": "Yes, and a different scene."}]
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(_mock_llm(gate=gate))):
+            speculator.speculate(sample_persona, first_user)
+            speculator.speculate(sample_persona, second_user)
+            await asyncio.sleep(0.01)
+            gate.set()
+            await speculator.claim(sample_persona, first_user)
+            await speculator.claim(sample_persona, second_user)
+
+        stats = speculator.stats()
+        assert stats["cancelled"] == 0
+        assert stats["wasted"] == 0
+        assert stats["used"] == 2
+
+    async def test_conversation_id_separates_lineages(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=2)
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(_mock_llm())):
+            speculator.speculate(sample_persona, sample_history[:2], conversation_id="a")
+            speculator.speculate(sample_persona, sample_history, conversation_id="b")
+            speculator.speculate(sample_persona, sample_history[:2] + [{"role": "human", "content": "x"}], "a")
+            await asyncio.sleep(0.01)
+
+        # "b" extends "a"'s history but is another conversation; only "a"'s own
+        # next turn cancels its first speculation, before it had started.
+        assert speculator.stats()["cancelled"] == 1
+        assert speculator.stats()["wasted"] == 0
+        assert len(speculator._lineages) == 2
+
+    async def test_runs_at_background_priority(self, sample_persona, sample_history):
+        speculator = SpeculativeSynthesizer(max_concurrency=1)
+        synthesize = AsyncMock(return_value="prompt")
+
+        with patch("yesand.speculation.synthesize_image_prompt", synthesize):
+            speculator.speculate(sample_persona, sample_history)
+            await asyncio.sleep(0.01)
+
+        assert synthesize.call_args.kwargs["priority"] is Priority.BACKGROUND
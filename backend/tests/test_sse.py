@@ -0,0 +1,187 @@
+"""Tests for SSE framing helpers."""
+
+import asyncio
+
+import pytest
+
+from yesand.sse import HEARTBEAT, chunk_event, coalesce_chunks, sse_event, stop_on_disconnect, with_heartbeats
+
+
+class TestSseEvent:
+    """Tests for sse_event."""
+
+    def test_frames_json_payload(self):
+        assert sse_event({"type": "done"}) == 'data: {"type": "done"}\n\n'
+
+
+class TestChunkEvent:
+    """Tests for the fast chunk frame encoder."""
+
+    def test_matches_generic_encoder(self):
+        for content in ["Yes, ", 'quote " and \\ slash', "line\nbreak\t", "caf\u00e9 \U0001f600", ""]:
+            assert chunk_event(content) == sse_event({"type": "chunk", "content": content})
+
+
+async def _source(chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+class TestCoalesceChunks:
+    """Tests for coalesce_chunks."""
+
+    async def test_zero_window_passes_through(self):
+        merged = [c async for c in coalesce_chunks(_source(["a", "b", "c"]), window=0, max_bytes=1024)]
+        assert merged == ["a", "b", "c"]
+
+    async def test_merges_chunks_within_window(self):
+        merged = [c async for c in coalesce_chunks(_source(["a", "b", "c"]), window=1, max_bytes=1024)]
+        assert merged == ["abc"]
+
+    async def test_flushes_at_max_bytes(self):
+        merged = [c async for c in coalesce_chunks(_source(["ab", "cd", "ef"]), window=1, max_bytes=4)]
+        assert merged == ["abcd", "ef"]
+
+    async def test_full_chunk_pauses_the_source_until_consumed(self):
+        read = []
+
+        async def events():
+            for chunk in ["ab", "cd", "ef", "gh"]:
+                read.append(chunk)
+                yield chunk
+
+        stream = coalesce_chunks(events(), window=1, max_bytes=4)
+        assert await anext(stream) == "abcd"
+        await asyncio.sleep(0.01)
+        # The consumer has not asked for more, so the reader is still waiting.
+        assert read == ["ab", "cd"]
+        assert [c async for c in stream] == ["efgh"]
+
+    async def test_flushes_when_window_closes(self):
+        async def slow():
+            yield "a"
+            yield "b"
+            await asyncio.sleep(0.1)
+            yield "c"
+
+        merged = [c async for c in coalesce_chunks(slow(), window=0.02, max_bytes=1024)]
+        assert merged == ["ab", "c"]
+
+    async def test_closing_cancels_pending_source(self):
+        cancelled = asyncio.Event()
+
+        async def events():
+            try:
+                yield "a"
+                await asyncio.sleep(10)
+                yield "never"
+            finally:
+                cancelled.set()
+
+        stream = coalesce_chunks(events(), window=0.01, max_bytes=1024)
+        assert await anext(stream) == "a"
+        await stream.aclose()
+
+        assert cancelled.is_set()
+
+
+class TestWithHeartbeats:
+    """Tests for with_heartbeats."""
+
+    async def test_passes_events_through(self):
+        async def events():
+            yield "a"
+            yield "b"
+
+        assert [e async for e in with_heartbeats(events(), interval=1)] == ["a", "b"]
+
+    async def test_emits_heartbeat_while_idle(self):
+        async def events():
+            await asyncio.sleep(0.05)
+            yield "late"
+
+        received = [e async for e in with_heartbeats(events(), interval=0.01)]
+
+        assert HEARTBEAT in received
+        assert received[-1] == "late"
+
+    async def test_closing_cancels_pending_source(self):
+        cancelled = asyncio.Event()
+
+        async def events():
+            try:
+                await asyncio.sleep(10)
+                yield "never"
+            finally:
+                cancelled.set()
+
+        stream = with_heartbeats(events(), interval=0.01)
+        assert await anext(stream) == HEARTBEAT
+        await stream.aclose()
+
+        assert cancelled.is_set()
+
+
+def _blocking_source(closed: asyncio.Event):
+    async def events():
+        try:
+            yield "first"
+            await asyncio.Event().wait()
+            yield "never"
+        finally:
+            closed.set()
+
+    return events()
+
+
+class TestStopOnDisconnect:
+    """Tests for stop_on_disconnect."""
+
+    async def _connected(self) -> bool:
+        return False
+
+    async def test_passes_events_through(self):
+        stream = stop_on_disconnect(_source(["a", "b", "c"]), self._connected, interval=0.01)
+        assert [e async for e in stream] == ["a", "b", "c"]
+
+    async def test_disconnect_cancels_waiting_source(self):
+        closed = asyncio.Event()
+        disconnected = False
+
+        async def is_disconnected() -> bool:
+            return disconnected
+
+        stream = stop_on_disconnect(_blocking_source(closed), is_disconnected, interval=0.01)
+        assert await anext(stream) == "first"
+        disconnected = True
+
+        rest = await asyncio.wait_for(_drain(stream), timeout=1)
+
+        assert rest == []
+        assert closed.is_set()
+
+    async def test_cancelled_response_cancels_source(self):
+        closed = asyncio.Event()
+        stream = stop_on_disconnect(_blocking_source(closed), self._connected, interval=0)
+
+        consumer = asyncio.ensure_future(_drain(stream))
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+
+        assert closed.is_set()
+
+    async def test_source_error_propagates(self):
+        async def events():
+            yield "ok"
+            raise RuntimeError("upstream failed")
+
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            await _drain(stop_on_disconnect(events(), self._connected, interval=0.01))
+
+
+async def _drain(stream) -> list[str]:
+    return [event async for event in stream]
@@ -2,9 +2,21 @@
 
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from yesand.synthesizer import synthesize_image_prompt
+from yesand.synthesizer import get_prompt_cache, stream_image_prompt, synthesize_image_prompt
+
+
+def _provider(llm):
+    return MagicMock(chat_model=MagicMock(return_value=llm))
+
+
+@pytest.fixture(autouse=True)
+async def clear_prompt_cache():
+    await get_prompt_cache().clear()
+    yield
+    await get_prompt_cache().clear()
 
 
 class TestSynthesizeImagePrompt:
@@ -16,7 +28,7 @@ class TestSynthesizeImagePrompt:
             return_value=MagicMock(content="A sun-drenched kitchen with an orange cat sleeping on newspapers...")
         )
 
-        with patch("yesand.synthesizer.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
             result = await synthesize_image_prompt(sample_persona, sample_history)
 
         assert isinstance(result, str)
@@ -26,7 +38,7 @@ class TestSynthesizeImagePrompt:
         mock_llm = MagicMock()
         mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="prompt"))
 
-        with patch("yesand.synthesizer.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
             await synthesize_image_prompt(sample_persona, sample_history)
 
         call_args = mock_llm.ainvoke.call_args[0][0]
@@ -40,9 +52,65 @@ class TestSynthesizeImagePrompt:
         mock_llm = MagicMock()
         mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="prompt"))
 
-        with patch("yesand.synthesizer.ChatOpenAI", return_value=mock_llm):
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
             await synthesize_image_prompt(sample_persona, sample_history)
 
         call_args = mock_llm.ainvoke.call_args[0][0]
         assert isinstance(call_args[0], SystemMessage)
         assert call_args[0].content == sample_persona.synthesizer_system_prompt
+
+
+class TestPromptCache:
+    """Tests for synthesized prompt memoization."""
+
+    async def test_repeat_call_served_from_cache(self, sample_persona, sample_history):
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="prompt"))
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
+            first = await synthesize_image_prompt(sample_persona, sample_history)
+            second = await synthesize_image_prompt(sample_persona, sample_history)
+
+        assert first == second == "prompt"
+        assert mock_llm.ainvoke.call_count == 1
+        assert get_prompt_cache().stats()["hits"] == 1
+
+    async def test_changed_history_misses(self, sample_persona, sample_history):
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(return_value=MagicMock(content="prompt"))
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
+            await synthesize_image_prompt(sample_persona, sample_history)
+            await synthesize_image_prompt(sample_persona, sample_history[:2])
+
+        assert mock_llm.ainvoke.call_count == 2
+
+    async def test_bypass_forces_fresh_call(self, sample_persona, sample_history):
+        mock_llm = MagicMock()
+        mock_llm.ainvoke = AsyncMock(side_effect=[MagicMock(content="first"), MagicMock(content="second")])
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
+            await synthesize_image_prompt(sample_persona, sample_history)
+            result = await synthesize_image_prompt(sample_persona, sample_history, use_cache=False)
+
+        assert result == "second"
+        assert mock_llm.ainvoke.call_count == 2
+
+
+class TestStreamImagePrompt:
+    """Tests for stream_image_prompt."""
+
+    async def test_streams_and_caches(self, sample_persona, sample_history):
+        async def astream(_messages):
+            for part in ["A sunny ", "kitchen."]:
+                yield MagicMock(content=part)
+
+        mock_llm = MagicMock()
+        mock_llm.astream = astream
+
+        with patch("yesand.synthesizer.get_provider", return_value=_provider(mock_llm)):
+            chunks = [c async for c in stream_image_prompt(sample_persona, sample_history)]
+            again = [c async for c in stream_image_prompt(sample_persona, sample_history)]
+
+        assert chunks == ["A sunny ", "kitchen."]
+        assert again == ["A sunny kitchen."]
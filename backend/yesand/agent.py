@@ -1,37 +1,79 @@
 """Yes-and agent turn using LangChain ChatOpenAI."""
 
+import asyncio
+import contextlib
+import time
 from typing import AsyncGenerator
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-
-from yesand.config import get_text_model
+from yesand.compaction import CompactedHistory, get_compactor
+from yesand.config import get_hedging_enabled, get_text_model
+from yesand.conversation import Conversation
+from yesand.hedging import get_hedger
+from yesand.metrics import (
+    UpstreamTimer,
+    record_stream_end,
+    record_usage,
+    stream_tokens_per_second,
+    stream_ttft_seconds,
+)
 from yesand.persona import Persona
+from yesand.providers import get_provider
+from yesand.scheduler import Priority, get_scheduler, upstream_call
 
 
-async def run_agent_turn(persona: Persona, history: list[dict]) -> str:
+async def run_agent_turn(
+    persona: Persona, history: Conversation | list[dict], priority: Priority = Priority.CHAT
+) -> str:
     """Run a single yes-and improv turn for the given persona.
 
     Args:
         persona: The active persona with system prompt and style.
-        history: Conversation history as list of {"role": "human"|"ai", "content": str}.
+        history: Conversation history, as a Conversation or a list of
+            {"role": "human"|"ai", "content": str}.
+        priority: Scheduler priority; background work passes
+            ``Priority.BACKGROUND`` and is never hedged.
 
     Returns:
         The AI's response text.
     """
-    messages = [SystemMessage(content=persona.agent_system_prompt)]
+    compacted = get_compactor().compact(history)
+    messages = build_messages(persona, compacted)
+
+    model = get_text_model("gpt-4o")
+    llm = get_provider("agent").chat_model(model, temperature=0.9)
+
+    async def admit():
+        await get_scheduler().acquire(model, priority, compacted.tokens_after)
 
-    for msg in history:
-        if msg["role"] == "human":
-            messages.append(HumanMessage(content=msg["content"]))
-        else:
-            messages.append(AIMessage(content=msg["content"]))
+    async def invoke():
+        with upstream_call(model), UpstreamTimer("agent_turn", model):
+            return await llm.ainvoke(messages)
 
-    llm = ChatOpenAI(model=get_text_model("gpt-4o"), temperature=0.9)
-    response = await llm.ainvoke(messages)
+    if get_hedging_enabled() and priority is Priority.CHAT:
+        response = await get_hedger("chat").run(invoke, admit)
+    else:
+        await admit()
+        response = await invoke()
+    record_usage("agent_turn", model, response)
     return ensure_yes_and(response.content)
 
 
+def build_messages(persona: Persona, compacted: CompactedHistory) -> list:
+    """Build the LangChain message list for an agent turn.
+
+    Long histories arrive compacted to the configured token budget: older
+    turns are replaced by a running scene summary placed after the system
+    prompt.
+    """
+    messages = [persona.agent_system_message]
+    if compacted.summary:
+        from langchain_core.messages import SystemMessage
+
+        messages.append(SystemMessage(content=f"Scene so far: {compacted.summary}"))
+    messages.extend(compacted.messages.langchain_messages)
+    return messages
+
+
 def ensure_yes_and(text: str) -> str:
     if not text:
         return "yes, and"
@@ -41,42 +83,84 @@ def ensure_yes_and(text: str) -> str:
     return f"yes, and {stripped}"
 
 
-async def stream_agent_turn(persona: Persona, history: list[dict]) -> AsyncGenerator[str, None]:
+async def stream_agent_turn(persona: Persona, history: Conversation | list[dict]) -> AsyncGenerator[str, None]:
     """Stream a yes-and improv turn for the given persona.
 
     Yields text chunks as they arrive from the LLM.
     """
-    messages = [SystemMessage(content=persona.agent_system_prompt)]
-
-    for msg in history:
-        if msg["role"] == "human":
-            messages.append(HumanMessage(content=msg["content"]))
-        else:
-            messages.append(AIMessage(content=msg["content"]))
-
-    llm = ChatOpenAI(model=get_text_model("gpt-5-mini"), temperature=0.9, streaming=True)
-    buffer = ""
+    started_at = time.perf_counter()
+    compacted = get_compactor().compact(history)
+    messages = build_messages(persona, compacted)
+
+    model = get_text_model("gpt-5-mini")
+    llm = get_provider("agent").chat_model(model, temperature=0.9, streaming=True)
+
+    async def admit():
+        await get_scheduler().acquire(model, Priority.CHAT_STREAM, compacted.tokens_after)
+
+    async def open_stream():
+        with upstream_call(model), UpstreamTimer("agent_stream", model):
+            async with contextlib.aclosing(llm.astream(messages)) as stream:
+                async for chunk in stream:
+                    yield chunk
+
+    hedged = get_hedging_enabled()
+    chunks = get_hedger("chat_stream").stream(open_stream, admit) if hedged else open_stream()
+    # Hold back the opening chunks until we can tell whether the reply
+    # already starts with "yes, and".
+    prefix = "yes, and"
+    parts: list[str] = []
+    size = 0
     started = False
-
-    async for chunk in llm.astream(messages):
-        content = getattr(chunk, "content", "")
-        if not content:
-            continue
-
-        if not started:
-            buffer += content
-            candidate = buffer.lstrip()
-            if len(candidate) < len("yes, and"):
-                continue
-            if candidate.lower().startswith("yes, and"):
-                yield buffer
-            else:
-                yield f"yes, and {candidate}"
-            buffer = ""
-            started = True
-            continue
-
-        yield content
-
-    if not started and buffer:
-        yield ensure_yes_and(buffer)
+    first_token_at = None
+    token_chunks = 0
+
+    # A disconnected client closes this generator (GeneratorExit) or cancels
+    # the task consuming it (CancelledError); either way aclosing shuts the
+    # upstream stream (and its pooled connection) now rather than at garbage
+    # collection, and the tokens it would still have produced are saved.
+    try:
+        async with contextlib.aclosing(chunks):
+            if not hedged:
+                await admit()
+            async for chunk in chunks:
+                record_usage("agent_stream", model, chunk)
+                content = getattr(chunk, "content", "")
+                if not content:
+                    continue
+                token_chunks += 1
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    stream_ttft_seconds.labels(model).observe(first_token_at - started_at)
+
+                if not started:
+                    parts.append(content)
+                    size += len(content)
+                    if size < len(prefix):
+                        continue
+                    buffer = "".join(parts)
+                    candidate = buffer.lstrip()
+                    if len(candidate) < len(prefix):
+                        continue
+                    if candidate.lower().startswith(prefix):
+                        yield buffer
+                    else:
+                        yield f"{prefix} {candidate}"
+                    parts = []
+                    started = True
+                    continue
+
+                yield content
+
+            if not started and parts:
+                yield ensure_yes_and("".join(parts))
+    except (asyncio.CancelledError, GeneratorExit):
+        record_stream_end("agent_stream", model, token_chunks, cancelled=True)
+        raise
+    record_stream_end("agent_stream", model, token_chunks, cancelled=False)
+
+    # Each streamed content chunk is one token for OpenAI chat models.
+    if first_token_at is not None and token_chunks > 1:
+        elapsed = time.perf_counter() - first_token_at
+        if elapsed > 0:
+            stream_tokens_per_second.labels(model).observe((token_chunks - 1) / elapsed)
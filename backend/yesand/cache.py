@@ -0,0 +1,500 @@
+"""Caches shared by the request path.
+
+``TTLCache`` is a plain in-process LRU for objects that only make sense inside
+one process. ``SharedCache`` holds bytes and has three backends, chosen with
+``CACHE_BACKEND``:
+
+- ``memory``: per-process LRU (the default; every worker starts cold)
+- ``sqlite``: one WAL-mode, memory-mapped SQLite file shared by every worker
+  on the host, which also survives restarts
+- ``redis``: any server speaking the Redis protocol, shared across hosts
+
+All three expire entries ``ttl`` seconds after they are set, refuse values
+larger than the byte budget, and report hits, misses and evictions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+from yesand.config import get_cache_backend, get_cache_redis_url, get_cache_sqlite_path
+from yesand.resp import RespClient
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Not thread-safe; it is only touched from the event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.evictions += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def entry_size(key: str, value: bytes) -> int:
+    """Bytes an entry counts against a cache's budget."""
+    return len(key.encode()) + len(value)
+
+
+class SharedCache(ABC):
+    """Bytes cache with the same TTL, budget and stats semantics on every backend.
+
+    An entry expires ``ttl`` seconds after it is set; a per-call ``ttl``
+    overrides the default and ``ttl <= 0`` stores nothing. Once the entries
+    exceed ``max_bytes`` (or ``max_entries``, if set) the least recently used
+    ones are evicted, and a single value over ``max_bytes`` is never stored.
+    Backend failures are logged and count as misses, so an outage of a shared
+    backend costs hit rate, not requests. Stats are per process.
+    """
+
+    backend = ""
+    # Redis evicts on its own (maxmemory), out of our sight.
+    tracks_evictions = True
+
+    def __init__(self, namespace: str, ttl: float, max_bytes: int, max_entries: int = 0) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            value = await self._get(key)
+        except Exception:
+            self._failed("get")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or entry_size(key, value) > self.max_bytes:
+            return
+        try:
+            await self._set(key, value, ttl)
+        except Exception:
+            self._failed("set")
+
+    async def contains(self, key: str) -> bool:
+        """Whether ``key`` is live, without counting a hit or miss."""
+        try:
+            return await self._contains(key)
+        except Exception:
+            self._failed("contains")
+            return False
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._delete(key)
+        except Exception:
+            self._failed("delete")
+
+    async def clear(self) -> None:
+        """Drop every entry in this namespace and reset the stats."""
+        await self._clear()
+        self.hits = self.misses = self.evictions = self.errors = 0
+
+    async def close(self) -> None:
+        pass
+
+    def _failed(self, operation: str) -> None:
+        self.errors += 1
+        logger.warning("%s cache %s failed for %r", self.backend, operation, self.namespace, exc_info=True)
+
+    def _over_budget(self, count: int, total: int) -> bool:
+        return total > self.max_bytes or (self.max_entries > 0 and count > self.max_entries)
+
+    def _footprint(self) -> tuple[int | None, int | None]:
+        """(entries, bytes) as last seen by this process; None if unknown."""
+        return None, None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        size, used = self._footprint()
+        return {
+            "backend": self.backend,
+            "size": size,
+            "maxsize": self.max_entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions if self.tracks_evictions else None,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    @abstractmethod
+    async def _get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def _set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    @abstractmethod
+    async def _contains(self, key: str) -> bool: ...
+
+    @abstractmethod
+    async def _delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def _clear(self) -> None: ...
+
+
+class MemoryCache(SharedCache):
+    """Per-process LRU; not thread-safe, only touched from the event loop."""
+
+    backend = "memory"
+
+    def __init__(self, namespace: str, ttl: float, max_bytes: int, max_entries: int = 0) -> None:
+        super().__init__(namespace, ttl, max_bytes, max_entries)
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+
+    async def _get(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            self.evictions += 1
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        if key in self._data:
+            self._drop(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._bytes += entry_size(key, value)
+        while self._over_budget(len(self._data), self._bytes):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    async def _contains(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    async def _delete(self, key: str) -> None:
+        if key in self._data:
+            self._drop(key)
+
+    async def _clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._bytes -= entry_size(key, value)
+
+    def _footprint(self) -> tuple[int | None, int | None]:
+        return len(self._data), self._bytes
+
+
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at);
+"""
+
+
+class SQLiteCache(SharedCache):
+    """Entries in a SQLite file that every worker process on the host opens.
+
+    WAL mode lets readers proceed during a write, and the file is memory
+    mapped so hot pages are read straight from the page cache. Times are
+    wall-clock, since they are compared across processes. The connection
+    lives on one dedicated thread, so queries never block the event loop.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: Path, namespace: str, ttl: float, max_bytes: int, max_entries: int = 0) -> None:
+        super().__init__(namespace, ttl, max_bytes, max_entries)
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{namespace}")
+        self._seen: tuple[int | None, int | None] = (None, None)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+            db.executescript(_SQLITE_SCHEMA)
+            self._db = db
+        return self._db
+
+    async def _get(self, key: str) -> bytes | None:
+        value, expired = await self._run(self._get_sync, key)
+        self.evictions += expired
+        return value
+
+    def _get_sync(self, key: str) -> tuple[bytes | None, int]:
+        db = self._connect()
+        now = time.time()
+        row = db.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return None, 0
+        if row[1] <= now:
+            db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (self.namespace, key, now),
+            )
+            return None, 1
+        db.execute(
+            "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key)
+        )
+        return bytes(row[0]), 0
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        self.evictions += await self._run(self._set_sync, key, value, ttl)
+
+    def _set_sync(self, key: str, value: bytes, ttl: float) -> int:
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, value, entry_size(key, value), now + ttl, now),
+            )
+            evicted = self._evict_sync(db, now)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return evicted
+
+    def _evict_sync(self, db: sqlite3.Connection, now: float) -> int:
+        """Bring the namespace under budget: expired entries first, then least recently used."""
+        count, total = self._count_sync(db)
+        evicted = 0
+        if self._over_budget(count, total):
+            evicted += db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+            ).rowcount
+            count, total = self._count_sync(db)
+        if self._over_budget(count, total):
+            victims = []
+            rows = db.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at", (self.namespace,)
+            )
+            for key, size in rows:
+                if not self._over_budget(count, total):
+                    break
+                victims.append((self.namespace, key))
+                count -= 1
+                total -= size
+            db.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+            evicted += len(victims)
+        self._seen = (count, total)
+        return evicted
+
+    def _count_sync(self, db: sqlite3.Connection) -> tuple[int, int]:
+        return db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+
+    async def _contains(self, key: str) -> bool:
+        return await self._run(self._contains_sync, key)
+
+    def _contains_sync(self, key: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    async def _delete(self, key: str) -> None:
+        await self._run(self._execute_sync, "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", key)
+
+    async def _clear(self) -> None:
+        await self._run(self._execute_sync, "DELETE FROM cache_entries WHERE namespace = ?")
+        self._seen = (0, 0)
+
+    def _execute_sync(self, sql: str, *args: Any) -> None:
+        self._connect().execute(sql, (self.namespace, *args))
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=False)
+
+    def _footprint(self) -> tuple[int | None, int | None]:
+        return self._seen
+
+
+class RedisCache(SharedCache):
+    """Entries on a Redis-protocol server, under ``yesand:<namespace>:<key>``.
+
+    Expiry uses the server's own ``PX`` timers. The byte budget caps single
+    values; the total is bounded by the server's ``maxmemory`` policy, which
+    also does the evicting, so evictions are not counted here.
+    """
+
+    backend = "redis"
+    tracks_evictions = False
+
+    def __init__(
+        self, client: RespClient, namespace: str, ttl: float, max_bytes: int, max_entries: int = 0
+    ) -> None:
+        super().__init__(namespace, ttl, max_bytes, max_entries)
+        self.client = client
+        self._prefix = f"yesand:{namespace}:"
+
+    async def _get(self, key: str) -> bytes | None:
+        return await self.client.execute("GET", self._prefix + key)
+
+    async def _set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.execute("SET", self._prefix + key, value, "PX", max(1, int(ttl * 1000)))
+
+    async def _contains(self, key: str) -> bool:
+        return await self.client.execute("EXISTS", self._prefix + key) == 1
+
+    async def _delete(self, key: str) -> None:
+        await self.client.execute("DEL", self._prefix + key)
+
+    async def _clear(self) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = await self.client.execute("SCAN", cursor, "MATCH", f"{self._prefix}*", "COUNT", 500)
+            if keys:
+                await self.client.execute("DEL", *keys)
+            if cursor == b"0":
+                break
+
+
+_shared_caches: list[SharedCache] = []
+_on_close: list[Callable[[], None]] = []
+_resp_client: RespClient | None = None
+
+
+def create_shared_cache(
+    namespace: str, ttl: float, max_bytes: int, max_entries: int = 0, on_close: Callable[[], None] | None = None
+) -> SharedCache:
+    """Create a cache on the configured ``CACHE_BACKEND``; closed by ``aclose_shared_caches``.
+
+    ``on_close`` runs once the cache is closed, so a lazy singleton holding it
+    can drop the reference and create a fresh cache on next use.
+    """
+    global _resp_client
+    backend = get_cache_backend()
+    if backend == "memory":
+        cache: SharedCache = MemoryCache(namespace, ttl, max_bytes, max_entries)
+    elif backend == "sqlite":
+        cache = SQLiteCache(get_cache_sqlite_path(), namespace, ttl, max_bytes, max_entries)
+    elif backend == "redis":
+        if _resp_client is None:
+            _resp_client = RespClient.from_url(get_cache_redis_url())
+        cache = RedisCache(_resp_client, namespace, ttl, max_bytes, max_entries)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend!r}")
+    _shared_caches.append(cache)
+    if on_close is not None:
+        _on_close.append(on_close)
+    return cache
+
+
+async def aclose_shared_caches() -> None:
+    """Close every shared cache and the Redis connections. Safe to call more than once."""
+    global _resp_client
+    caches, callbacks = list(_shared_caches), list(_on_close)
+    _shared_caches.clear()
+    _on_close.clear()
+    for cache in caches:
+        await cache.close()
+    for callback in callbacks:
+        callback()
+    if _resp_client is not None:
+        await _resp_client.close()
+        _resp_client = None
@@ -0,0 +1,184 @@
+"""Process-wide registry of pooled upstream clients.
+
+Every upstream call (LangChain chat models, the OpenAI images API and the
+image proxy) goes through a single shared ``httpx.AsyncClient`` so keep-alive
+connections are reused across requests instead of paying a TLS handshake per
+turn. Clients are created lazily and closed from the FastAPI lifespan.
+
+The OpenAI and LangChain SDKs are imported on first use (or by the lifespan
+warm-up in ``warmup.py``), not at import time, so the app starts quickly.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Callable
+
+import httpx
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from openai import AsyncOpenAI
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=50,
+    keepalive_expiry=60.0,
+)
+POOL_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_http_client: httpx.AsyncClient | None = None
+_transport: _PoolStatsTransport | None = None
+_openai_clients: dict[tuple[str | None, str | None], AsyncOpenAI] = {}
+_chat_models: dict[tuple[str, float, bool, str | None, str | None], ChatOpenAI] = {}
+_response_listeners: list[Callable[[httpx.Response], None]] = []
+
+
+class PoolStats:
+    """Counters describing how well the shared connection pool is reused."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, new_connection: bool, wait_seconds: float) -> None:
+        self.requests += 1
+        if new_connection:
+            self.new_connections += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+
+_pool_counters = PoolStats()
+
+
+class _PoolStatsTransport(httpx.AsyncBaseTransport):
+    """Wrap the pooled transport and record connection reuse and pool wait time.
+
+    Uses httpcore's ``trace`` extension: a request either opens a new TCP
+    connection (``connection.connect_tcp``) or goes straight to sending headers
+    on a pooled one. The time until whichever comes first is the pool wait.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport) -> None:
+        self._transport = transport
+
+    @property
+    def open_connections(self) -> int:
+        pool = getattr(self._transport, "_pool", None)
+        return len(getattr(pool, "connections", ()))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        state = {"new_connection": False, "acquired_at": None}
+        parent_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            if state["acquired_at"] is None and event_name.endswith(".started"):
+                if event_name.startswith("connection.connect_tcp"):
+                    state["new_connection"] = True
+                state["acquired_at"] = time.perf_counter()
+            if parent_trace is not None:
+                await parent_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            response = await self._transport.handle_async_request(request)
+        finally:
+            acquired_at = state["acquired_at"] or time.perf_counter()
+            _pool_counters.record(state["new_connection"], acquired_at - started)
+        for listener in _response_listeners:
+            listener(response)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def add_response_listener(listener: Callable[[httpx.Response], None]) -> None:
+    """Register a callback that sees every upstream response (headers only)."""
+    _response_listeners.append(listener)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled HTTP client, creating it on first use."""
+    global _http_client, _transport
+    if _http_client is None:
+        _transport = _PoolStatsTransport(httpx.AsyncHTTPTransport(limits=POOL_LIMITS))
+        _http_client = httpx.AsyncClient(transport=_transport, timeout=POOL_TIMEOUT)
+    return _http_client
+
+
+def get_openai_client(base_url: str | None = None, api_key: str | None = None) -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client for an endpoint, backed by the pooled HTTP client.
+
+    ``base_url``/``api_key`` default to the SDK's own (``OPENAI_BASE_URL`` /
+    ``OPENAI_API_KEY``); pass them for OpenAI-compatible servers.
+    """
+    key = (base_url, api_key)
+    client = _openai_clients.get(key)
+    if client is None:
+        from openai import AsyncOpenAI
+
+        client = _openai_clients[key] = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=get_http_client())
+    return client
+
+
+def get_chat_model(
+    model: str,
+    temperature: float,
+    streaming: bool = False,
+    base_url: str | None = None,
+    api_key: str | None = None,
+) -> ChatOpenAI:
+    """Return a cached ChatOpenAI for the given (model, temperature, streaming, endpoint) key."""
+    key = (model, temperature, streaming, base_url, api_key)
+    llm = _chat_models.get(key)
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+
+        llm = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            streaming=streaming,
+            # Report token usage on the final chunk of streamed responses.
+            stream_usage=streaming,
+            base_url=base_url,
+            api_key=api_key,
+            http_async_client=get_http_client(),
+        )
+        _chat_models[key] = llm
+    return llm
+
+
+def pool_stats() -> dict:
+    """Snapshot of shared connection pool usage."""
+    counters = _pool_counters
+    requests = counters.requests
+    return {
+        "open_connections": _transport.open_connections if _transport is not None else 0,
+        "requests": requests,
+        "new_connections": counters.new_connections,
+        "reuse_ratio": (requests - counters.new_connections) / requests if requests else 0.0,
+        "avg_wait_ms": counters.total_wait_seconds / requests * 1000 if requests else 0.0,
+        "max_wait_ms": counters.max_wait_seconds * 1000,
+        "chat_models": len(_chat_models),
+    }
+
+
+async def aclose_clients() -> None:
+    """Close every pooled client. Safe to call more than once."""
+    global _http_client, _transport
+    _chat_models.clear()
+    for client in _openai_clients.values():
+        await client.close()
+    _openai_clients.clear()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        _transport = None
@@ -0,0 +1,182 @@
+"""Token-budgeted history compaction for long improv sessions.
+
+When a conversation exceeds ``HISTORY_TOKEN_BUDGET`` tokens, the last
+``HISTORY_KEEP_TURNS`` messages are sent verbatim and everything older is
+replaced by a running scene summary. Summaries are cached by the rolling
+prefix hash of the messages they cover and are extended incrementally in
+background tasks, so a turn never waits on a summarization call: until the
+newest summary is ready, the turn uses the longest summarized prefix plus
+the remaining older messages verbatim.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from yesand.cache import TTLCache
+from yesand.config import get_history_keep_turns, get_history_token_budget, get_text_model
+from yesand.conversation import Conversation, Turn, as_conversation
+from yesand.metrics import UpstreamTimer, record_usage
+from yesand.providers import get_provider
+from yesand.scheduler import Priority, get_scheduler, upstream_call
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You keep a running summary of a collaborative improv scene that is being "
+    "built one visual detail at a time. Merge the new lines into the existing "
+    "summary. Keep every concrete visual element (objects, colors, light, "
+    "positions, characters) and drop conversational filler. Reply with the "
+    "updated summary only, in plain prose."
+)
+
+# Per-message overhead of the chat format (role markers, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+
+def load_token_encoding() -> None:
+    """Load the tiktoken encoding (blocking; it may download it).
+
+    Run off the request path by the lifespan warm-up, which retries it on
+    failure; token counts are estimated from character counts until it is
+    ready. Raises if the encoding cannot be loaded.
+    """
+    global _encoding
+    if _encoding is not None:
+        return
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally, falling back to a ~4 chars/token estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def turn_tokens(turn: Turn) -> int:
+    # Memoized on the turn, so a growing session only encodes its new turns.
+    # The key is the encoding: estimates are recounted once tiktoken loads.
+    return turn.token_count(count_tokens, _encoding)
+
+
+def history_tokens(history: Conversation) -> int:
+    return sum(turn_tokens(turn) + MESSAGE_OVERHEAD_TOKENS for turn in history)
+
+
+@dataclass(frozen=True)
+class CompactedHistory:
+    summary: str | None
+    messages: Conversation
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class HistoryCompactor:
+    """Fold older turns into a cached, incrementally updated scene summary."""
+
+    def __init__(self, budget: int, keep_turns: int, summaries: TTLCache) -> None:
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.summaries = summaries
+        self.turns = 0
+        self.compacted_turns = 0
+        self.tokens_saved = 0
+        self.summaries_started = 0
+        self.summaries_failed = 0
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def compact(self, history: Conversation | list[dict]) -> CompactedHistory:
+        history = as_conversation(history)
+        self.turns += 1
+        total = history_tokens(history)
+        if self.budget <= 0 or total <= self.budget or len(history) <= self.keep_turns:
+            return CompactedHistory(None, history, total, total)
+
+        split = len(history) - self.keep_turns
+
+        # Find the longest prefix of the older turns that already has a summary.
+        # Prefix hashes are memoized on the conversation, so a stored
+        # conversation only hashes the turns added since the last request.
+        covered = 0
+        for index in range(split, 0, -1):
+            if history.prefix_hash_at(index) in self.summaries:
+                covered = index
+                break
+        # Probe without touching the stats, then count one lookup: a hit for
+        # the longest summarized prefix, or a miss for the full older part.
+        summary = self.summaries.get(history.prefix_hash_at(covered or split))
+
+        if covered < split:
+            self._schedule_summary(history.prefix_hash_at(split), summary, history[covered:split])
+
+        messages = history[covered:]
+        after = history_tokens(messages) + (count_tokens(summary) if summary else 0)
+        compacted = CompactedHistory(summary, messages, total, after)
+        if summary is not None:
+            self.compacted_turns += 1
+            self.tokens_saved += compacted.tokens_saved
+        return compacted
+
+    def _schedule_summary(self, key: str, summary: str | None, new_messages: Conversation) -> None:
+        if key in self._pending:
+            return
+        task = asyncio.create_task(self._summarize(key, summary, new_messages))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+        self.summaries_started += 1
+
+    async def _summarize(self, key: str, summary: str | None, new_messages: Conversation) -> None:
+        prompt = f"Current summary:\n{summary or '(empty)'}\n\nNew lines:\n{new_messages.transcript}"
+        model = get_text_model("gpt-4o")
+        try:
+            from langchain_core.messages import HumanMessage, SystemMessage
+
+            await get_scheduler().acquire(model, Priority.BACKGROUND, count_tokens(prompt))
+            llm = get_provider("synthesizer").chat_model(model, temperature=0.2)
+            with upstream_call(model), UpstreamTimer("summary", model):
+                response = await llm.ainvoke(
+                    [SystemMessage(content=SUMMARY_SYSTEM_PROMPT), HumanMessage(content=prompt)]
+                )
+            record_usage("summary", model, response)
+        except Exception:
+            self.summaries_failed += 1
+            logger.exception("Scene summary update failed")
+            return
+        self.summaries.set(key, response.content)
+
+    def stats(self) -> dict:
+        return {
+            "budget": self.budget,
+            "turns": self.turns,
+            "compacted_turns": self.compacted_turns,
+            "tokens_saved": self.tokens_saved,
+            "avg_tokens_saved_per_turn": self.tokens_saved / self.turns if self.turns else 0.0,
+            "summaries_started": self.summaries_started,
+            "summaries_failed": self.summaries_failed,
+            "summaries_pending": len(self._pending),
+        }
+
+
+_compactor: HistoryCompactor | None = None
+
+
+def get_compactor() -> HistoryCompactor:
+    global _compactor
+    if _compactor is None:
+        _compactor = HistoryCompactor(
+            budget=get_history_token_budget(),
+            keep_turns=get_history_keep_turns(),
+            summaries=TTLCache(maxsize=1024, ttl=3600),
+        )
+    return _compactor
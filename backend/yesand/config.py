@@ -1,27 +1,78 @@
-"""Runtime configuration helpers that reflect live .env changes."""
+"""Runtime configuration helpers that reflect live .env changes.
+
+The .env file is parsed into an in-memory snapshot which is only re-read when
+the file's identity (inode, mtime, size) changes. The file is stat'ed at most
+once every ``CHECK_INTERVAL`` seconds, so lookups on the request path are a
+dict access in the common case while edits to .env still take effect live.
+"""
 
 from __future__ import annotations
 
 import os
+import time
 from pathlib import Path
 
 from dotenv import dotenv_values
 
 ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
 
+CHECK_INTERVAL = float(os.getenv("ENV_CHECK_INTERVAL", "1.0"))
+
+_UNSET = object()
+
+
+class EnvSnapshot:
+    """Cached view of a .env file that reloads when the file changes."""
+
+    def __init__(self, path: Path, check_interval: float = CHECK_INTERVAL) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._values: dict[str, str] = {}
+        self._signature: object = _UNSET
+        self._checked_at: float | None = None
+
+    def values(self) -> dict[str, str]:
+        """Return the current .env values, reloading if the file changed."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self.refresh()
+        return self._values
+
+    def refresh(self) -> None:
+        """Stat the file now and reload it if its signature changed."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            signature = None
+        else:
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
-def _read_dotenv() -> dict[str, str]:
-    if not ENV_PATH.exists():
-        return {}
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._values = _read_dotenv(self.path) if signature is not None else {}
+        self.reloads += 1
+
+    def invalidate(self) -> None:
+        """Force the next lookup to re-check the file."""
+        self._checked_at = None
+
+
+def _read_dotenv(path: Path) -> dict[str, str]:
     return {
         key: value
-        for key, value in dotenv_values(ENV_PATH).items()
+        for key, value in dotenv_values(path).items()
         if value is not None and str(value).strip() != ""
     }
 
 
+_snapshot = EnvSnapshot(ENV_PATH)
+
+
 def get_env(key: str, default: str | None = None) -> str | None:
-    values = _read_dotenv()
+    values = _snapshot.values()
     if key in values:
         return values[key]
     return os.getenv(key, default)
@@ -41,3 +92,204 @@ def get_image_size() -> str:
 
 def get_image_quality() -> str:
     return get_env("OPENAI_IMAGE_QUALITY", "standard") or "standard"
+
+
+def get_provider_name(role: str) -> str:
+    """Provider for a role: ``<ROLE>_PROVIDER``, else ``MODEL_PROVIDER``, else ``openai``."""
+    name = get_env(f"{role.upper()}_PROVIDER") or get_env("MODEL_PROVIDER", "openai") or "openai"
+    return name.strip().lower()
+
+
+def get_compatible_base_url() -> str | None:
+    return get_env("COMPATIBLE_BASE_URL")
+
+
+def get_compatible_api_key() -> str | None:
+    return get_env("COMPATIBLE_API_KEY")
+
+
+def get_local_tokens_per_second() -> float:
+    return float(get_env("LOCAL_TOKENS_PER_SECOND", "0") or 0)
+
+
+def get_local_image_base_url() -> str:
+    return get_env("LOCAL_IMAGE_BASE_URL", "http://localhost:8000") or "http://localhost:8000"
+
+
+def get_image_cache_dir() -> Path:
+    value = get_env("IMAGE_CACHE_DIR")
+    return Path(value) if value else ENV_PATH.parent / ".cache" / "images"
+
+
+def get_image_store_mode() -> str:
+    """``off`` (return upstream URLs), ``fetch`` (download each URL once) or ``b64`` (request inline bytes)."""
+    return (get_env("IMAGE_STORE", "off") or "off").lower()
+
+
+def get_image_store_dir() -> Path:
+    value = get_env("IMAGE_STORE_DIR")
+    return Path(value) if value else ENV_PATH.parent / ".cache" / "store"
+
+
+def get_image_store_base_url() -> str:
+    return get_env("IMAGE_STORE_BASE_URL", "http://localhost:8000") or "http://localhost:8000"
+
+
+def get_image_store_workers() -> int:
+    return int(get_env("IMAGE_STORE_WORKERS", "2") or 2)
+
+
+def get_image_cache_max_bytes() -> int:
+    return int(get_env("IMAGE_CACHE_MAX_BYTES", "536870912") or 536870912)
+
+
+def get_image_cache_max_age() -> float:
+    return float(get_env("IMAGE_CACHE_MAX_AGE", "86400") or 86400)
+
+
+def get_cache_backend() -> str:
+    """Backend for shared caches: ``memory`` (per process), ``sqlite`` (per host) or ``redis``."""
+    return (get_env("CACHE_BACKEND", "memory") or "memory").strip().lower()
+
+
+def get_cache_sqlite_path() -> Path:
+    value = get_env("CACHE_SQLITE_PATH")
+    return Path(value) if value else ENV_PATH.parent / ".cache" / "shared-cache.sqlite3"
+
+
+def get_cache_redis_url() -> str:
+    return get_env("CACHE_REDIS_URL", "redis://localhost:6379/0") or "redis://localhost:6379/0"
+
+
+def get_prompt_cache_size() -> int:
+    return int(get_env("PROMPT_CACHE_SIZE", "512") or 512)
+
+
+def get_prompt_cache_max_bytes() -> int:
+    return int(get_env("PROMPT_CACHE_MAX_BYTES", "8388608") or 8388608)
+
+
+def get_prompt_cache_ttl() -> float:
+    return float(get_env("PROMPT_CACHE_TTL", "3600") or 3600)
+
+
+def get_idempotency_ttl() -> float:
+    return float(get_env("IDEMPOTENCY_TTL", "600") or 600)
+
+
+def get_conversation_store_size() -> int:
+    return int(get_env("CONVERSATION_STORE_SIZE", "1024") or 1024)
+
+
+def get_conversation_store_ttl() -> float:
+    return float(get_env("CONVERSATION_STORE_TTL", "3600") or 3600)
+
+
+def get_history_token_budget() -> int:
+    return int(get_env("HISTORY_TOKEN_BUDGET", "0") or 0)
+
+
+def get_history_keep_turns() -> int:
+    return int(get_env("HISTORY_KEEP_TURNS", "6") or 6)
+
+
+def get_speculative_synthesis_enabled() -> bool:
+    return (get_env("SPECULATIVE_SYNTHESIS", "false") or "").lower() in ("1", "true", "yes")
+
+
+def get_speculative_max_concurrency() -> int:
+    return int(get_env("SPECULATIVE_MAX_CONCURRENCY", "4") or 4)
+
+
+def get_opening_pool_enabled() -> bool:
+    return (get_env("OPENING_POOL", "false") or "").lower() in ("1", "true", "yes")
+
+
+def get_opening_pool_words() -> int:
+    """How many suggestion words are kept warm per persona."""
+    return int(get_env("OPENING_POOL_WORDS", "8") or 8)
+
+
+def get_opening_pool_size() -> int:
+    """Openings kept ready per (persona, word) pair."""
+    return int(get_env("OPENING_POOL_SIZE", "2") or 2)
+
+
+def get_opening_pool_ttl() -> float:
+    return float(get_env("OPENING_POOL_TTL", "3600") or 3600)
+
+
+def get_opening_pool_refill_per_minute() -> tuple[float, dict[str, float]]:
+    """Openings generated per persona per minute: the default and per-persona overrides.
+
+    ``"6,romantic=12,brutalist=0"`` refills most personas at 6/min, the
+    romantic one at 12/min and never the brutalist one.
+    """
+    default = 6.0
+    overrides: dict[str, float] = {}
+    for entry in (get_env("OPENING_POOL_REFILL_PER_MINUTE", "6") or "6").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if "=" in entry:
+            persona_id, _, rate = entry.partition("=")
+            overrides[persona_id.strip()] = float(rate)
+        else:
+            default = float(entry)
+    return default, overrides
+
+
+def get_sse_heartbeat_interval() -> float:
+    return float(get_env("SSE_HEARTBEAT_INTERVAL", "15") or 15)
+
+
+def get_sse_coalesce_window_ms() -> float:
+    return float(get_env("SSE_COALESCE_WINDOW_MS", "0") or 0)
+
+
+def get_sse_coalesce_max_bytes() -> int:
+    return int(get_env("SSE_COALESCE_MAX_BYTES", "1024") or 1024)
+
+
+def get_sse_disconnect_poll_interval() -> float:
+    """Seconds between client-disconnect checks on streaming responses; 0 disables polling."""
+    return float(get_env("SSE_DISCONNECT_POLL_INTERVAL", "0.5") or 0)
+
+
+def get_ws_session_idle_timeout() -> float:
+    """Seconds a /ws/session socket may sit idle before the server closes it; 0 disables."""
+    return float(get_env("WS_SESSION_IDLE_TIMEOUT", "600") or 0)
+
+
+def get_batch_concurrency() -> int:
+    return int(get_env("BATCH_CONCURRENCY", "4") or 4)
+
+
+def get_upstream_rpm() -> float:
+    return float(get_env("UPSTREAM_RPM", "0") or 0)
+
+
+def get_upstream_tpm() -> float:
+    return float(get_env("UPSTREAM_TPM", "0") or 0)
+
+
+def get_hedging_enabled() -> bool:
+    return (get_env("HEDGE_REQUESTS", "false") or "").lower() in ("1", "true", "yes")
+
+
+def get_hedge_budget_percent() -> float:
+    return float(get_env("HEDGE_BUDGET_PERCENT", "10") or 10)
+
+
+def get_hedge_default_delay() -> float:
+    return float(get_env("HEDGE_DEFAULT_DELAY", "5") or 5)
+
+
+def get_persona_reload_interval() -> float:
+    return float(get_env("PERSONA_RELOAD_INTERVAL", "2") or 2)
+
+
+def get_proxy_image_hosts() -> tuple[str, ...]:
+    """Domains /proxy-image may fetch from; subdomains are allowed too."""
+    value = get_env("PROXY_IMAGE_HOSTS", "blob.core.windows.net") or "blob.core.windows.net"
+    return tuple(host.strip().lstrip(".").lower() for host in value.split(",") if host.strip())
@@ -0,0 +1,174 @@
+"""Compact, immutable conversation history shared across a request.
+
+A request's history is converted once into a ``Conversation`` of ``Turn``
+objects and then passed everywhere as is. Derived forms are built lazily and
+memoized: each turn keeps its LangChain message, the conversation keeps its
+message list, its synthesizer transcript and the rolling prefix hash of every
+prefix. Extending or slicing a conversation shares the turns, so a stored
+conversation that grows by one turn per request only pays for the new turn.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, overload
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+EMPTY_PREFIX_HASH = hashlib.sha256(b"").hexdigest()
+
+
+def _fold(prefix_hash: str, role: str, content: str) -> str:
+    digest = hashlib.sha256(prefix_hash.encode())
+    digest.update(role.encode())
+    digest.update(b"\x00")
+    digest.update(content.encode())
+    return digest.hexdigest()
+
+
+def extend_prefix_hash(prefix_hash: str, messages: Iterable[Mapping[str, str]]) -> str:
+    """Fold ``{"role", "content"}`` messages into a rolling prefix hash."""
+    for msg in messages:
+        prefix_hash = _fold(prefix_hash, msg["role"], msg["content"])
+    return prefix_hash
+
+
+class Turn:
+    """One message: ``role`` is ``"human"`` or ``"ai"``."""
+
+    __slots__ = ("role", "content", "_message", "_tokens")
+
+    def __init__(self, role: str, content: str) -> None:
+        self.role = role
+        self.content = content
+        self._message: BaseMessage | None = None
+        self._tokens: tuple[object, int] | None = None
+
+    @property
+    def message(self) -> BaseMessage:
+        """The LangChain message for this turn (built once)."""
+        if self._message is None:
+            from langchain_core.messages import AIMessage, HumanMessage
+
+            if self.role == "human":
+                self._message = HumanMessage(content=self.content)
+            else:
+                self._message = AIMessage(content=self.content)
+        return self._message
+
+    def token_count(self, count: Callable[[str], int], key: object) -> int:
+        """``count(content)``, memoized for as long as ``key`` (the tokenizer in use) stays the same."""
+        tokens = self._tokens
+        if tokens is None or tokens[0] is not key:
+            tokens = self._tokens = (key, count(self.content))
+        return tokens[1]
+
+    @property
+    def line(self) -> str:
+        label = "human" if self.role == "human" else "ai"
+        return f"{label}: {self.content}"
+
+    def as_dict(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self) -> str:
+        return f"Turn({self.role!r}, {self.content!r})"
+
+
+class Conversation:
+    """An immutable sequence of turns with memoized derived forms."""
+
+    __slots__ = ("turns", "_hashes", "_messages", "_transcript")
+
+    def __init__(self, turns: tuple[Turn, ...] = (), _hashes: list[str] | None = None) -> None:
+        self.turns = turns
+        # _hashes[i] is the prefix hash of turns[:i]; filled in on demand.
+        self._hashes = _hashes if _hashes is not None else [EMPTY_PREFIX_HASH]
+        self._messages: list[BaseMessage] | None = None
+        self._transcript: str | None = None
+
+    @classmethod
+    def from_dicts(cls, messages: Iterable[Mapping[str, str]]) -> Conversation:
+        return cls(tuple(Turn(msg["role"], msg["content"]) for msg in messages))
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Any]) -> Conversation:
+        """Build from already validated objects with ``role`` and ``content`` attributes."""
+        return cls(tuple(Turn(msg.role, msg.content) for msg in messages))
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def __bool__(self) -> bool:
+        return bool(self.turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self.turns)
+
+    @overload
+    def __getitem__(self, index: int) -> Turn: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Conversation: ...
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self.turns[index]
+        start, stop, step = index.indices(len(self.turns))
+        turns = self.turns[index]
+        if start == 0 and step == 1:
+            # A leading slice is a prefix: its prefix hashes are ours.
+            return Conversation(turns, self._hashes[: stop + 1])
+        return Conversation(turns)
+
+    def __repr__(self) -> str:
+        return f"Conversation({len(self.turns)} turns)"
+
+    def extend(self, turns: Iterable[Turn]) -> Conversation:
+        """Return a new conversation with ``turns`` appended; existing turns are shared."""
+        added = tuple(turns)
+        if not added:
+            return self
+        return Conversation(self.turns + added, self._hashes.copy())
+
+    def add(self, role: str, content: str) -> Conversation:
+        return self.extend((Turn(role, content),))
+
+    def prefix_hash_at(self, length: int) -> str:
+        """Rolling prefix hash of the first ``length`` turns."""
+        hashes = self._hashes
+        for turn in self.turns[len(hashes) - 1 : length]:
+            hashes.append(_fold(hashes[-1], turn.role, turn.content))
+        return hashes[length]
+
+    @property
+    def prefix_hash(self) -> str:
+        return self.prefix_hash_at(len(self.turns))
+
+    @property
+    def langchain_messages(self) -> list[BaseMessage]:
+        """LangChain messages for every turn; do not mutate the returned list."""
+        if self._messages is None:
+            self._messages = [turn.message for turn in self.turns]
+        return self._messages
+
+    @property
+    def transcript(self) -> str:
+        """The history flattened into ``"human: ..."`` / ``"ai: ..."`` lines."""
+        if self._transcript is None:
+            self._transcript = "\n".join(turn.line for turn in self.turns)
+        return self._transcript
+
+    def as_dicts(self) -> list[dict]:
+        return [turn.as_dict() for turn in self.turns]
+
+
+EMPTY_CONVERSATION = Conversation()
+
+
+def as_conversation(history: Conversation | Iterable[Mapping[str, str]]) -> Conversation:
+    """Accept either a ``Conversation`` or a list of ``{"role", "content"}`` dicts."""
+    if isinstance(history, Conversation):
+        return history
+    return Conversation.from_dicts(history)
@@ -0,0 +1,74 @@
+"""Server-held conversation prefixes for the opt-in delta protocol.
+
+Clients that opt in receive a ``conversation_id`` and a ``prefix_hash`` and
+can then send only the messages appended since that prefix. The prefix hash
+is a rolling SHA-256 over the messages, so extending it costs only the new
+messages. Stored values are ``Conversation`` objects, so the hashes and
+LangChain messages memoized on earlier turns are reused as the conversation
+grows. Storage is pluggable through the ``ConversationStore`` protocol; the
+default keeps a bounded in-memory LRU with a TTL.
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Protocol
+
+from yesand.cache import TTLCache
+from yesand.config import get_conversation_store_size, get_conversation_store_ttl
+from yesand.conversation import Conversation
+
+
+class ConversationStore(Protocol):
+    def get(self, conversation_id: str) -> Conversation | None: ...
+
+    def put(self, conversation_id: str, conversation: Conversation) -> None: ...
+
+    def stats(self) -> dict: ...
+
+
+class MemoryConversationStore:
+    """Bounded in-process store with LRU eviction and a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, conversation_id: str) -> Conversation | None:
+        return self._cache.get(conversation_id)
+
+    def put(self, conversation_id: str, conversation: Conversation) -> None:
+        self._cache.set(conversation_id, conversation)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_store: ConversationStore | None = None
+
+
+def get_conversation_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        _store = MemoryConversationStore(
+            maxsize=get_conversation_store_size(),
+            ttl=get_conversation_store_ttl(),
+        )
+    return _store
+
+
+def set_conversation_store(store: ConversationStore | None) -> None:
+    """Swap in a different storage backend (None restores the default)."""
+    global _store
+    _store = store
+
+
+def new_conversation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def resolve_conversation(conversation_id: str, prefix_hash: str | None, delta: Conversation) -> Conversation | None:
+    """Return the stored prefix extended by ``delta``, or None if the prefix is unknown."""
+    stored = get_conversation_store().get(conversation_id)
+    if stored is None or stored.prefix_hash != prefix_hash:
+        return None
+    return stored.extend(delta)
@@ -0,0 +1,186 @@
+"""Hedged upstream requests with adaptive delays.
+
+If a call has not finished (or, for streams, produced its first chunk) within
+the recent p95 latency, a second identical call is fired and whichever
+finishes first wins; the loser is cancelled. Hedges are capped at
+``HEDGE_BUDGET_PERCENT`` of primary calls so tail-latency insurance never
+costs more than a fixed share of extra upstream traffic.
+
+Admission by the rate-limit scheduler (``admit``) happens outside the hedge:
+the primary is admitted before the hedge timer starts and a backup takes its
+own slot when it fires, so time spent queued behind our own rate limits is
+never sampled as upstream latency and never triggers a backup.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from yesand.config import get_hedge_budget_percent, get_hedge_default_delay
+
+T = TypeVar("T")
+Admit = Callable[[], Awaitable[None]]
+
+# Samples needed before the observed p95 replaces the default delay.
+MIN_SAMPLES = 20
+
+
+class Hedger:
+    """Race a backup call against a slow primary, within a hedge budget."""
+
+    def __init__(self, budget_ratio: float, default_delay: float, window: int = 200) -> None:
+        self.budget_ratio = budget_ratio
+        self.default_delay = default_delay
+        self.primary_calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def delay(self) -> float:
+        """Current hedge trigger: the p95 of recent latencies."""
+        if len(self._latencies) < MIN_SAMPLES:
+            return self.default_delay
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _may_hedge(self) -> bool:
+        return self.hedges_fired + 1 <= self.budget_ratio * self.primary_calls
+
+    async def run(self, call: Callable[[], Awaitable[T]], admit: Admit | None = None) -> T:
+        """Await ``call()``, hedging with a second ``call()`` if it is slow.
+
+        ``admit()`` is awaited before each call starts: once before the
+        primary, and again inside the backup.
+        """
+        if admit is not None:
+            await admit()
+        self.primary_calls += 1
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if not done:
+                if self._may_hedge():
+                    self.hedges_fired += 1
+                    tasks.add(asyncio.ensure_future(_admitted(admit, call)))
+                else:
+                    self.hedges_skipped += 1
+
+            winner = await _first_success(tasks)
+            result = winner.result()
+            if winner is not primary:
+                self.hedges_won += 1
+            self._latencies.append(time.monotonic() - started)
+            return result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]], admit: Admit | None = None) -> AsyncIterator[T]:
+        """Iterate ``open_stream()``, hedging on time-to-first-chunk; ``admit`` as for ``run``."""
+        if admit is not None:
+            await admit()
+        self.primary_calls += 1
+        started = time.monotonic()
+        primary = aiter(open_stream())
+        first = {asyncio.ensure_future(anext(primary)): primary}
+        try:
+            done, _ = await asyncio.wait(first, timeout=self.delay())
+            if not done:
+                if self._may_hedge():
+                    self.hedges_fired += 1
+                    backup = aiter(_admitted_stream(admit, open_stream))
+                    first[asyncio.ensure_future(anext(backup))] = backup
+                else:
+                    self.hedges_skipped += 1
+
+            winner_task = await _first_success(set(first), allow_stop=True)
+            winner = first.pop(winner_task)
+            try:
+                head = [winner_task.result()]
+            except StopAsyncIteration:
+                head = []
+            if winner is not primary:
+                self.hedges_won += 1
+            self._latencies.append(time.monotonic() - started)
+        finally:
+            await _close_streams(first)
+
+        try:
+            for item in head:
+                yield item
+            async for item in winner:
+                yield item
+        finally:
+            with contextlib.suppress(Exception):
+                await winner.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "delay_ms": self.delay() * 1000,
+            "primary_calls": self.primary_calls,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedges_skipped_budget": self.hedges_skipped,
+        }
+
+
+async def _admitted(admit: Admit | None, call: Callable[[], Awaitable[T]]) -> T:
+    if admit is not None:
+        await admit()
+    return await call()
+
+
+async def _admitted_stream(admit: Admit | None, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+    if admit is not None:
+        await admit()
+    async with contextlib.aclosing(open_stream()) as stream:
+        async for item in stream:
+            yield item
+
+
+async def _first_success(tasks: set[asyncio.Future], allow_stop: bool = False) -> asyncio.Future:
+    """Return the first task to succeed; raise the first error if all fail."""
+    pending = set(tasks)
+    first_error: asyncio.Future | None = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is None or (allow_stop and isinstance(error, StopAsyncIteration)):
+                return task
+            first_error = first_error or task
+    return first_error
+
+
+async def _close_streams(streams: dict[asyncio.Future, AsyncIterator]) -> None:
+    for task, stream in streams.items():
+        task.cancel()
+        with contextlib.suppress(BaseException):
+            await task
+        with contextlib.suppress(Exception):
+            await stream.aclose()
+
+
+_hedgers: dict[str, Hedger] = {}
+
+
+def get_hedger(name: str) -> Hedger:
+    """Return the hedger for a call type (e.g. ``"chat"``, ``"chat_stream"``)."""
+    hedger = _hedgers.get(name)
+    if hedger is None:
+        hedger = _hedgers[name] = Hedger(
+            budget_ratio=get_hedge_budget_percent() / 100,
+            default_delay=get_hedge_default_delay(),
+        )
+    return hedger
+
+
+def hedging_stats() -> dict:
+    return {name: hedger.stats() for name, hedger in _hedgers.items()}
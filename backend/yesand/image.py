@@ -1,8 +1,16 @@
-"""DALL-E image generation wrapper."""
+"""Image generation through the configured image provider (DALL-E by default)."""
 
-from openai import AsyncOpenAI
+import asyncio
 
-from yesand.config import get_image_model, get_image_quality, get_image_size
+from yesand.config import get_image_model, get_image_quality, get_image_size, get_image_store_mode
+from yesand.image_store import image_store_enabled, store_generated
+from yesand.metrics import UpstreamTimer
+from yesand.providers import get_provider
+from yesand.scheduler import Priority, get_scheduler, upstream_call
+
+# Models that only accept n=1; variants are requested with parallel calls.
+SINGLE_IMAGE_MODELS = {"dall-e-3"}
+MAX_IMAGES_PER_REQUEST = 10
 
 
 async def generate_image(prompt: str) -> str:
@@ -14,19 +22,34 @@ async def generate_image(prompt: str) -> str:
     Returns:
         URL of the generated image.
     """
-    client = AsyncOpenAI()
-    model = get_image_model()
-    size = get_image_size()
+    urls = await generate_images(prompt, n=1)
+    return urls[0]
+
 
-    request = {
-        "model": model,
-        "prompt": prompt,
-        "size": size,
-        "n": 1,
-    }
+async def generate_images(prompt: str, n: int) -> list[str]:
+    """Generate ``n`` variants of one prompt.
 
-    if model == "dall-e-3":
-        request["quality"] = get_image_quality()
+    Uses the API's ``n`` parameter where the model supports it and falls back
+    to concurrent single-image calls otherwise. With ``IMAGE_STORE`` enabled
+    the images are saved locally and stable URLs are returned.
 
-    response = await client.images.generate(**request)
-    return response.data[0].url
+    Returns:
+        URLs of the generated images.
+    """
+    model = get_image_model()
+    if model in SINGLE_IMAGE_MODELS and n > 1:
+        results = await asyncio.gather(*(_request_images(prompt, model, 1) for _ in range(n)))
+        urls = [url for urls in results for url in urls]
+    else:
+        urls = await _request_images(prompt, model, min(n, MAX_IMAGES_PER_REQUEST))
+    if image_store_enabled():
+        urls = await store_generated(urls)
+    return urls
+
+
+async def _request_images(prompt: str, model: str, n: int) -> list[str]:
+    await get_scheduler().acquire(model, Priority.IMAGE)
+    quality = get_image_quality() if model == "dall-e-3" else None
+    inline = get_image_store_mode() == "b64"
+    with upstream_call(model), UpstreamTimer("image", model):
+        return await get_provider("image").generate_images(prompt, model, n, get_image_size(), quality, inline)
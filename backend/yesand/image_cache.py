@@ -0,0 +1,183 @@
+"""Content-addressed on-disk cache for proxied images.
+
+Blobs are stored under ``blobs/<sha256>`` and an index entry under
+``urls/<sha256(url)>.json`` maps the upstream URL to the blob digest and
+content type. Entries are written while the image streams through to the
+client, so nothing is buffered in memory. A blob's mtime doubles as its
+last-access time: hits touch it, and eviction drops idle blobs older than
+``max_age`` and then the least recently used ones until under ``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from yesand.config import get_image_cache_dir, get_image_cache_max_age, get_image_cache_max_bytes
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    path: Path
+    digest: str
+    content_type: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+class ImageCacheWriter:
+    """Incrementally writes one blob to a temp file while hashing it."""
+
+    def __init__(self, cache: ImageCache, url: str, content_type: str) -> None:
+        self._cache = cache
+        self._url = url
+        self._content_type = content_type
+        self._hash = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=cache.tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+        self._tmp_path = Path(tmp_name)
+        self._done = False
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> CachedImage:
+        """Move the finished blob into place and index it under its URL."""
+        self._file.close()
+        digest = self._hash.hexdigest()
+        blob_path = self._cache.blob_path(digest)
+        os.replace(self._tmp_path, blob_path)
+        self._cache.index(self._url, digest, self._content_type)
+        self._done = True
+        return CachedImage(path=blob_path, digest=digest, content_type=self._content_type)
+
+    def abort(self) -> None:
+        """Discard a partial blob. No-op after commit."""
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class ImageCache:
+    """Disk cache with size and idle-age eviction."""
+
+    def __init__(self, root: Path, max_bytes: int, max_age: float) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.blobs_dir = root / "blobs"
+        self.urls_dir = root / "urls"
+        self.tmp_dir = root / "tmp"
+        for directory in (self.blobs_dir, self.urls_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest
+
+    def _index_path(self, url: str) -> Path:
+        return self.urls_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def index(self, url: str, digest: str, content_type: str) -> None:
+        entry = json.dumps({"digest": digest, "content_type": content_type})
+        # A private temp file: concurrent fills of the same URL each replace
+        # the index atomically instead of racing on one shared temp path.
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir, suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(entry)
+            os.replace(tmp_name, self._index_path(url))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def lookup(self, url: str) -> CachedImage | None:
+        """Return the cached blob for a URL and mark it as recently used.
+
+        Blocking file I/O: call it from a worker thread (``asyncio.to_thread``).
+        """
+        index_path = self._index_path(url)
+        try:
+            entry = json.loads(index_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+        blob_path = self.blob_path(entry["digest"])
+        try:
+            stat = blob_path.stat()
+        except FileNotFoundError:
+            index_path.unlink(missing_ok=True)
+            return None
+        if time.time() - stat.st_mtime > self.max_age:
+            return None
+
+        os.utime(blob_path)
+        return CachedImage(path=blob_path, digest=entry["digest"], content_type=entry["content_type"])
+
+    def writer(self, url: str, content_type: str) -> ImageCacheWriter:
+        return ImageCacheWriter(self, url, content_type)
+
+    def evict(self) -> int:
+        """Drop expired and least recently used blobs and their index entries. Returns bytes freed.
+
+        Blocking; the proxy runs it as a background task on the thread pool.
+        """
+        now = time.time()
+        blobs = []
+        for path in self.blobs_dir.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+        blobs.sort()
+
+        total = sum(size for _, size, _ in blobs)
+        freed = 0
+        evicted = set()
+        for mtime, size, path in blobs:
+            if total <= self.max_bytes and now - mtime <= self.max_age:
+                break
+            path.unlink(missing_ok=True)
+            evicted.add(path.name)
+            total -= size
+            freed += size
+        if evicted:
+            self._drop_index_entries(evicted)
+        return freed
+
+    def _drop_index_entries(self, digests: set[str]) -> None:
+        # Several URLs may share one blob, so every index file is checked.
+        for index_path in self.urls_dir.glob("*.json"):
+            try:
+                digest = json.loads(index_path.read_text())["digest"]
+            except FileNotFoundError:
+                continue
+            except (ValueError, KeyError):
+                digest = None
+            if digest is None or digest in digests:
+                index_path.unlink(missing_ok=True)
+
+
+_image_cache: ImageCache | None = None
+
+
+def get_image_cache() -> ImageCache:
+    """Return the process-wide image cache, creating it on first use."""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache(
+            root=get_image_cache_dir(),
+            max_bytes=get_image_cache_max_bytes(),
+            max_age=get_image_cache_max_age(),
+        )
+    return _image_cache
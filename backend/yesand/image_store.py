@@ -0,0 +1,330 @@
+"""Content-addressed store for generated images, with pre-rendered web variants.
+
+Upstream image URLs expire within hours, and every page load and download
+used to fetch them again. With ``IMAGE_STORE=fetch`` (download each URL once,
+right after generation) or ``IMAGE_STORE=b64`` (ask the API for the bytes
+inline), generated images are saved here instead and /generate returns
+stable URLs under ``/images/`` that are served with immutable caching
+headers.
+
+Originals live at ``blobs/<sha256>.<ext>``. When Pillow is installed
+(``pip install yesand-backend[images]``), a thumbnail and WebP (plus AVIF,
+if the Pillow build supports it) variants are rendered on a small thread
+pool right after saving, under ``variants/<sha256>/<name>.<ext>``. Without
+Pillow only the original is kept. Nothing is evicted: the URLs are meant to
+stay valid.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from yesand.clients import get_http_client
+from yesand.config import (
+    get_image_store_base_url,
+    get_image_store_dir,
+    get_image_store_mode,
+    get_image_store_workers,
+)
+from yesand.providers import local_image_name, parse_local_image_name, placeholder_png
+
+try:
+    from PIL import Image
+except ImportError:  # optional: pip install yesand-backend[images]
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PATH = "/images/"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_EXTENSIONS = {"png": "image/png", "jpg": "image/jpeg", "webp": "image/webp"}
+_DIGEST = r"[0-9a-f]{64}"
+_DIGEST_NAME = re.compile(rf"^{_DIGEST}$")
+_ORIGINAL_NAME = re.compile(rf"^({_DIGEST})\.(png|jpg|webp)$")
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    format: str
+    extension: str
+    quality: int
+    max_side: int | None = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}.{self.extension}"
+
+    @property
+    def media_type(self) -> str:
+        return f"image/{self.extension}"
+
+
+VARIANTS = (
+    Variant("thumb", "WEBP", "webp", quality=75, max_side=256),
+    Variant("web", "WEBP", "webp", quality=82),
+    Variant("web", "AVIF", "avif", quality=60),
+)
+
+
+def available_variants() -> tuple[Variant, ...]:
+    """Variants the installed Pillow can encode; empty without Pillow."""
+    if Image is None:
+        return ()
+    extensions = Image.registered_extensions()
+    return tuple(v for v in VARIANTS if f".{v.extension}" in extensions)
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    digest: str
+    extension: str
+    path: Path
+
+    @property
+    def name(self) -> str:
+        return f"{self.digest}.{self.extension}"
+
+    @property
+    def media_type(self) -> str:
+        return _EXTENSIONS[self.extension]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def _sniff_extension(data: bytes) -> str:
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    raise ValueError("Unsupported image format")
+
+
+class ImageStore:
+    """Originals on disk by content hash, plus variants rendered off the event loop."""
+
+    def __init__(self, root: Path, base_url: str, workers: int) -> None:
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.blobs_dir = root / "blobs"
+        self.variants_dir = root / "variants"
+        self.tmp_dir = root / "tmp"
+        for directory in (self.blobs_dir, self.variants_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self._executor: ThreadPoolExecutor | None = None
+        self._rendering: dict[str, asyncio.Future] = {}
+
+    # --- URLs ---
+
+    def url_for(self, image: StoredImage) -> str:
+        return f"{self.base_url}{IMAGE_PATH}{image.name}"
+
+    def variant_urls(self, image: StoredImage) -> dict[str, str]:
+        return {v.key: f"{self.base_url}{IMAGE_PATH}{image.digest}/{v.key}" for v in available_variants()}
+
+    def parse_url(self, url: str) -> StoredImage | None:
+        """The stored original if ``url`` is one of this store's original URLs."""
+        prefix = f"{self.base_url}{IMAGE_PATH}"
+        if not url.startswith(prefix):
+            return None
+        return self.lookup(url[len(prefix):])
+
+    # --- Reads ---
+
+    def lookup(self, name: str) -> StoredImage | None:
+        """Find an original by ``<sha256>.<ext>`` file name."""
+        match = _ORIGINAL_NAME.match(name)
+        if match is None:
+            return None
+        image = StoredImage(match.group(1), match.group(2), self.blobs_dir / name)
+        return image if image.path.exists() else None
+
+    def lookup_digest(self, digest: str) -> StoredImage | None:
+        for extension in _EXTENSIONS:
+            image = self.lookup(f"{digest}.{extension}")
+            if image is not None:
+                return image
+        return None
+
+    def variant_path(self, digest: str, variant: Variant) -> Path:
+        return self.variants_dir / digest / variant.key
+
+    async def variant(self, digest: str, key: str) -> tuple[Path, Variant] | None:
+        """A rendered variant, waiting for (or starting) its render if needed."""
+        variant = next((v for v in available_variants() if v.key == key), None)
+        # The digest comes from the URL; validate it before it becomes a path.
+        if variant is None or not _DIGEST_NAME.match(digest):
+            return None
+        path = self.variant_path(digest, variant)
+        if not path.exists():
+            image = self.lookup_digest(digest)
+            if image is None:
+                return None
+            pending = self._schedule_variants(image)
+            if pending is not None:
+                with contextlib.suppress(Exception):
+                    await asyncio.shield(pending)
+        return (path, variant) if path.exists() else None
+
+    # --- Writes ---
+
+    async def save(self, data: bytes) -> StoredImage:
+        """Store image bytes and start rendering their variants in the background."""
+        extension = _sniff_extension(data)
+        image = await asyncio.to_thread(self._write, data, extension)
+        self._schedule_variants(image)
+        return image
+
+    async def ingest(self, url: str) -> StoredImage:
+        """Store the image behind a generated image URL."""
+        return await self.save(await _load(url))
+
+    def _write(self, data: bytes, extension: str) -> StoredImage:
+        digest = hashlib.sha256(data).hexdigest()
+        image = StoredImage(digest, extension, self.blobs_dir / f"{digest}.{extension}")
+        if not image.path.exists():
+            fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_name, image.path)
+        return image
+
+    def _schedule_variants(self, image: StoredImage) -> asyncio.Future | None:
+        pending = self._rendering.get(image.digest)
+        if pending is not None:
+            return pending
+        missing = [v for v in available_variants() if not self.variant_path(image.digest, v).exists()]
+        if not missing:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-variants")
+        future = asyncio.wrap_future(
+            self._executor.submit(_render_variants, image.path, self.variants_dir / image.digest, missing)
+        )
+        self._rendering[image.digest] = future
+        future.add_done_callback(lambda done: self._rendered(image.digest, done))
+        return future
+
+    def _rendered(self, digest: str, future: asyncio.Future) -> None:
+        self._rendering.pop(digest, None)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Rendering variants for %s failed", digest, exc_info=future.exception())
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+async def _load(url: str) -> bytes:
+    if url.startswith("data:"):
+        header, _, payload = url.partition(",")
+        if not header.endswith(";base64"):
+            raise ValueError("Only base64 data URLs are supported")
+        return base64.b64decode(payload)
+    name = local_image_name(url)
+    if name is not None:
+        return await placeholder_png(*parse_local_image_name(name))
+    response = await get_http_client().get(url, timeout=30.0)
+    response.raise_for_status()
+    return response.content
+
+
+def _render_variants(source: Path, dest_dir: Path, variants: list[Variant]) -> None:
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    with Image.open(source) as original:
+        original.load()
+        base = original
+        if base.mode not in ("RGB", "RGBA"):
+            base = base.convert("RGBA" if base.has_transparency_data else "RGB")
+        for variant in variants:
+            image = base
+            if variant.max_side is not None and max(image.size) > variant.max_side:
+                image = base.copy()
+                image.thumbnail((variant.max_side, variant.max_side))
+            fd, tmp_name = tempfile.mkstemp(dir=dest_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    image.save(file, format=variant.format, quality=variant.quality)
+                os.replace(tmp_name, dest_dir / variant.key)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_name)
+                raise
+
+
+_store: ImageStore | None = None
+
+
+def get_image_store() -> ImageStore:
+    """Return the process-wide image store, creating it on first use."""
+    global _store
+    if _store is None:
+        _store = ImageStore(
+            root=get_image_store_dir(),
+            base_url=get_image_store_base_url(),
+            workers=get_image_store_workers(),
+        )
+    return _store
+
+
+def close_image_store() -> None:
+    """Stop the variant workers; called from the app lifespan."""
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+
+def image_store_enabled() -> bool:
+    return get_image_store_mode() in ("fetch", "b64")
+
+
+async def store_generated(urls: list[str]) -> list[str]:
+    """Save freshly generated images and return their stable URLs.
+
+    An image that cannot be stored keeps its upstream URL, so a store
+    failure never fails the generation.
+    """
+    store = get_image_store()
+
+    async def one(url: str) -> str:
+        try:
+            return store.url_for(await store.ingest(url))
+        except Exception:
+            logger.warning("Could not store generated image; returning the upstream URL", exc_info=True)
+            return url
+
+    return list(await asyncio.gather(*(one(url) for url in urls)))
+
+
+def lookup_stored_url(url: str) -> StoredImage | None:
+    """The stored original behind one of our image URLs; None for any other URL."""
+    # Cheap prefix test first so unrelated URLs never create the store.
+    if not url.startswith(f"{get_image_store_base_url().rstrip('/')}{IMAGE_PATH}"):
+        return None
+    return get_image_store().parse_url(url)
+
+
+def stored_variant_urls(url: str) -> dict[str, str] | None:
+    """Variant URLs for a stored original's URL; None for any other URL."""
+    image = lookup_stored_url(url)
+    if image is None:
+        return None
+    return get_image_store().variant_urls(image) or None
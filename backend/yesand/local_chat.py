@@ -0,0 +1,86 @@
+"""Deterministic in-process chat model behind the ``local`` provider.
+
+Kept out of ``providers.py`` because subclassing LangChain's
+``BaseChatModel`` imports most of ``langchain_core``; the provider only
+imports this module when a local chat model is first requested.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+from typing import Any, AsyncIterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_NOUNS = (
+    "lantern", "moth", "window", "kettle", "shadow", "violet", "brass", "rain", "ivy", "clock",
+    "ribbon", "harbor", "velvet", "ember", "feather", "orchard", "mirror", "tide", "paper", "lamp",
+)  # fmt: skip
+_VERBS = ("hums", "drifts", "glows", "settles", "flickers", "unfolds", "gleams", "leans", "spins", "rests")
+
+
+def _seed(messages: list[BaseMessage]) -> bytes:
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(message.type.encode())
+        digest.update(b"\x00")
+        digest.update(str(message.content).encode())
+        digest.update(b"\x00")
+    return digest.digest()
+
+
+def _local_reply(role: str, messages: list[BaseMessage], length: int = 24) -> str:
+    rng = random.Random(_seed(messages))
+    words = []
+    while len(words) < length:
+        words += ["the", rng.choice(_NOUNS), rng.choice(_VERBS), "beside", "a", rng.choice(_NOUNS)]
+    text = " ".join(words[:length])
+    if role == "agent":
+        return f"Yes, and {text}."
+    return f"A painterly scene where {text}, soft light, rich detail."
+
+
+class LocalChatModel(BaseChatModel):
+    """Deterministic in-process chat model; the same messages give the same reply."""
+
+    role: str = "agent"
+    tokens_per_second: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "yesand-local"
+
+    def _reply(self, messages: list[BaseMessage]) -> tuple[str, dict]:
+        text = _local_reply(self.role, messages)
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = len(text.split())
+        usage = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return text, usage
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text, usage = self._reply(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        result = self._generate(messages)
+        if self.tokens_per_second:
+            await asyncio.sleep(len(result.generations[0].message.content.split()) / self.tokens_per_second)
+        return result
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        text, usage = self._reply(messages)
+        for index, word in enumerate(text.split(" ")):
+            if self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if index == 0 else f" {word}"))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
@@ -0,0 +1,301 @@
+"""In-process Prometheus metrics, rendered by ``GET /metrics``.
+
+A deliberately small registry (counters, gauges, fixed-bucket histograms)
+so recording a sample is a dict lookup plus a bisect, with no client library
+and no push gateway. Label values are positional and must be low
+cardinality: route templates and model names, never raw URLs or ids.
+"""
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request and upstream call latencies, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 300)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Return the value holder for one label combination."""
+
+    def _label_text(self, values: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: tuple[str, ...], child) -> list[str]:
+        return [f"{self.name}{self._label_text(values)} {_number(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values: tuple[str, ...], child: _HistogramChild) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            le_label = f'le="{le}"'
+            lines.append(f"{self.name}_bucket{self._label_text(values, le_label)} {cumulative}")
+        labels = self._label_text(values)
+        lines.append(f"{self.name}_sum{labels} {_number(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+registry = MetricsRegistry()
+
+http_requests_in_flight = registry.gauge(
+    "yesand_http_requests_in_flight", "HTTP requests currently being handled."
+).labels()
+http_request_seconds = registry.histogram(
+    "yesand_http_request_duration_seconds",
+    "Time from request start until the response body is fully sent.",
+    ("method", "route", "status"),
+)
+upstream_seconds = registry.histogram(
+    "yesand_upstream_duration_seconds",
+    "Upstream OpenAI call latency, excluding scheduler queueing.",
+    ("operation", "model"),
+)
+upstream_queue_seconds = registry.histogram(
+    "yesand_upstream_queue_seconds", "Time spent waiting for upstream scheduler admission.", ("model",)
+)
+upstream_in_flight = registry.gauge(
+    "yesand_upstream_requests_in_flight", "Upstream OpenAI calls currently running.", ("operation",)
+)
+llm_tokens = registry.counter(
+    "yesand_llm_tokens_total", "Tokens reported by upstream responses.", ("operation", "model", "kind")
+)
+stream_ttft_seconds = registry.histogram(
+    "yesand_stream_time_to_first_token_seconds", "Streaming chat time to first content chunk.", ("model",)
+)
+stream_tokens_per_second = registry.histogram(
+    "yesand_stream_tokens_per_second",
+    "Streaming chat generation rate after the first token.",
+    ("model",),
+    buckets=THROUGHPUT_BUCKETS,
+)
+stream_cancellations = registry.counter(
+    "yesand_stream_cancellations_total",
+    "Upstream streams cancelled before completion, usually because the client disconnected.",
+    ("operation", "model"),
+)
+stream_tokens_saved = registry.counter(
+    "yesand_stream_tokens_saved_total",
+    "Estimated completion tokens not generated because a stream was cancelled.",
+    ("operation", "model"),
+)
+
+# Moving average of completed stream lengths, in content chunks, used to
+# estimate what a cancelled stream would have produced.
+_STREAM_LENGTH_WEIGHT = 0.1
+_typical_stream_tokens: dict[tuple[str, str], float] = {}
+
+
+class UpstreamTimer:
+    """Time one upstream call and count its in-flight gauge::
+
+        with UpstreamTimer("agent_turn", model):
+            response = await llm.ainvoke(messages)
+    """
+
+    __slots__ = ("operation", "model", "_started")
+
+    def __init__(self, operation: str, model: str) -> None:
+        self.operation = operation
+        self.model = model
+
+    def __enter__(self) -> UpstreamTimer:
+        upstream_in_flight.labels(self.operation).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        upstream_seconds.labels(self.operation, self.model).observe(time.perf_counter() - self._started)
+        upstream_in_flight.labels(self.operation).dec()
+
+
+def record_tokens(operation: str, model: str, prompt: int, completion: int) -> None:
+    llm_tokens.labels(operation, model, "prompt").inc(prompt)
+    llm_tokens.labels(operation, model, "completion").inc(completion)
+
+
+def record_usage(operation: str, model: str, message: Any) -> None:
+    """Count prompt/completion tokens from a LangChain message's ``usage_metadata``."""
+    usage = getattr(message, "usage_metadata", None)
+    if isinstance(usage, dict):
+        record_tokens(operation, model, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+
+def record_stream_end(operation: str, model: str, tokens: int, cancelled: bool) -> None:
+    """Record how a token stream ended; ``tokens`` is the content chunks received.
+
+    A cancelled stream counts as saved the tokens that typical completed
+    streams for the same operation and model produced beyond this point.
+    """
+    key = (operation, model)
+    typical = _typical_stream_tokens.get(key)
+    if not cancelled:
+        if typical is not None:
+            tokens = typical + _STREAM_LENGTH_WEIGHT * (tokens - typical)
+        _typical_stream_tokens[key] = tokens
+        return
+    stream_cancellations.labels(operation, model).inc()
+    if typical is not None and typical > tokens:
+        stream_tokens_saved.labels(operation, model).inc(round(typical - tokens))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    Routes are labelled with their path template (read back from the scope
+    after routing); requests that match no route share the ``"unmatched"``
+    label so probes cannot grow the series.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_seconds.labels(scope["method"], route, status).observe(time.perf_counter() - started)
@@ -0,0 +1,218 @@
+"""Pre-warmed opening turns for /suggest words.
+
+A session usually starts with the /suggest word sent to /chat: the slowest
+moment for the user, and the same LLM call over and over. With
+``OPENING_POOL`` on, a background refiller keeps a few "yes, and" openings
+ready for each persona and a sample of the suggestion words. /suggest
+prefers a word that already has a warm opening for the persona, and a first
+turn that is exactly that word is answered from the pool. Each opening is
+served once and expires after ``OPENING_POOL_TTL`` seconds; editing a persona
+discards its openings.
+
+Refills run at ``Priority.BACKGROUND``, at most one in flight per persona
+and no more often than that persona's ``OPENING_POOL_REFILL_PER_MINUTE``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Iterable, Sequence
+
+from yesand.agent import run_agent_turn
+from yesand.config import (
+    get_opening_pool_enabled,
+    get_opening_pool_refill_per_minute,
+    get_opening_pool_size,
+    get_opening_pool_ttl,
+    get_opening_pool_words,
+)
+from yesand.conversation import Conversation
+from yesand.persona import Persona, load_personas
+from yesand.scheduler import Priority
+from yesand.words import SUGGESTION_WORDS
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot:
+    """Ready openings for one (persona, word) pair, tied to a persona version."""
+
+    __slots__ = ("version", "openings")
+
+    def __init__(self, version: str) -> None:
+        self.version = version
+        self.openings: deque[tuple[float, str]] = deque()
+
+
+class OpeningPool:
+    """Keep ``size`` openings per (persona, word) and hand each out once."""
+
+    def __init__(
+        self,
+        words: Sequence[str],
+        size: int,
+        ttl: float,
+        refill_per_minute: float,
+        persona_rates: dict[str, float] | None = None,
+    ) -> None:
+        self.words = tuple(words)
+        self.size = size
+        self.ttl = ttl
+        self.refill_per_minute = refill_per_minute
+        self.persona_rates = persona_rates or {}
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.expired = 0
+        self.failed = 0
+        self._lookup = {word.upper(): word for word in self.words}
+        self._slots: dict[tuple[str, str], _Slot] = {}
+        self._next_refill: dict[str, float] = {}
+        self._refilling: dict[str, asyncio.Task] = {}
+
+    def rate_for(self, persona_id: str) -> float:
+        return self.persona_rates.get(persona_id, self.refill_per_minute)
+
+    # --- Serving ---
+
+    def match(self, history: Conversation) -> str | None:
+        """The pooled word if ``history`` is just that word as the first human turn."""
+        if len(history) != 1 or history[0].role != "human":
+            return None
+        return self._lookup.get(history[0].content.strip().rstrip(".!?").upper())
+
+    def take(self, persona: Persona, history: Conversation) -> str | None:
+        """Pop a warm opening for this first turn, or None to call the model."""
+        word = self.match(history)
+        if word is None:
+            return None
+        openings = self._live(persona, word)
+        if not openings:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return openings.popleft()[1]
+
+    def warm_words(self, persona: Persona) -> list[str]:
+        return [word for word in self.words if self._live(persona, word)]
+
+    def suggest(self, persona: Persona) -> str | None:
+        """A word with a warm opening for ``persona``, if any."""
+        warm = self.warm_words(persona)
+        return random.choice(warm) if warm else None
+
+    def _live(self, persona: Persona, word: str) -> deque[tuple[float, str]]:
+        key = (persona.id, word)
+        slot = self._slots.get(key)
+        if slot is None or slot.version != persona.version:
+            slot = self._slots[key] = _Slot(persona.version)
+        now = time.monotonic()
+        while slot.openings and slot.openings[0][0] <= now:
+            slot.openings.popleft()
+            self.expired += 1
+        return slot.openings
+
+    # --- Refilling ---
+
+    def refill(self, personas: Iterable[Persona]) -> None:
+        """Start one generation for every persona whose refill is due."""
+        now = time.monotonic()
+        for persona in personas:
+            rate = self.rate_for(persona.id)
+            if rate <= 0 or persona.id in self._refilling or now < self._next_refill.get(persona.id, 0.0):
+                continue
+            word = self._neediest(persona)
+            if word is None:
+                continue
+            self._next_refill[persona.id] = now + 60 / rate
+            task = asyncio.create_task(self._generate(persona, word))
+            self._refilling[persona.id] = task
+            task.add_done_callback(lambda _, persona_id=persona.id: self._refilling.pop(persona_id, None))
+
+    def _neediest(self, persona: Persona) -> str | None:
+        counts = {word: len(self._live(persona, word)) for word in self.words}
+        lowest = min(counts.values(), default=self.size)
+        if lowest >= self.size:
+            return None
+        return random.choice([word for word, count in counts.items() if count == lowest])
+
+    async def _generate(self, persona: Persona, word: str) -> None:
+        history = Conversation().add("human", word)
+        try:
+            reply = await run_agent_turn(persona, history, priority=Priority.BACKGROUND)
+        except Exception:
+            self.failed += 1
+            logger.exception("Generating an opening for %s/%s failed", persona.id, word)
+            return
+        openings = self._live(persona, word)
+        if any(existing == reply for _, existing in openings):
+            # Keep the pool varied: an identical reply is no second option.
+            self.duplicates += 1
+            return
+        if len(openings) < self.size:
+            openings.append((time.monotonic() + self.ttl, reply))
+            self.generated += 1
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Refill the pool forever; started from the app lifespan."""
+        try:
+            while True:
+                try:
+                    self.refill(load_personas().values())
+                except Exception:
+                    logger.exception("Opening pool refill failed")
+                await asyncio.sleep(interval)
+        finally:
+            for task in list(self._refilling.values()):
+                task.cancel()
+
+    def stats(self) -> dict:
+        served = self.hits + self.misses
+        return {
+            "ready": sum(len(slot.openings) for slot in self._slots.values()),
+            "refilling": len(self._refilling),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / served if served else 0.0,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "expired": self.expired,
+            "failed": self.failed,
+        }
+
+
+_pool: OpeningPool | None = None
+
+
+def get_opening_pool() -> OpeningPool:
+    global _pool
+    if _pool is None:
+        count = min(max(get_opening_pool_words(), 0), len(SUGGESTION_WORDS))
+        default_rate, persona_rates = get_opening_pool_refill_per_minute()
+        _pool = OpeningPool(
+            words=random.sample(SUGGESTION_WORDS, count),
+            size=get_opening_pool_size(),
+            ttl=get_opening_pool_ttl(),
+            refill_per_minute=default_rate,
+            persona_rates=persona_rates,
+        )
+    return _pool
+
+
+def take_opening(persona: Persona, history: Conversation) -> str | None:
+    """A pre-generated reply for an opening suggestion turn, if enabled and warm."""
+    if not get_opening_pool_enabled():
+        return None
+    return get_opening_pool().take(persona, history)
+
+
+def suggest_word(persona: Persona | None) -> str | None:
+    """A suggestion word with a warm opening for ``persona``, if enabled."""
+    if persona is None or not get_opening_pool_enabled():
+        return None
+    return get_opening_pool().suggest(persona)
@@ -1,25 +1,52 @@
-"""Persona loading and management from YAML configuration files."""
+"""Persona loading and management from YAML configuration files.
 
-from functools import lru_cache
+Personas live in an immutable ``PersonaSnapshot`` held by the process-wide
+``persona_registry``. A background task started from the FastAPI lifespan
+polls ``personas/`` and, when any file changes, parses the whole directory
+into a new snapshot and swaps the reference in one assignment. Requests just
+read the current reference, so they never lock and never see a half-loaded
+set; if a file fails to parse, the previous snapshot stays in place.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+from yesand.config import get_persona_reload_interval
+
+if TYPE_CHECKING:
+    from langchain_core.messages import SystemMessage
+
+logger = logging.getLogger(__name__)
 
 PERSONAS_DIR = Path(__file__).resolve().parent.parent / "personas"
 
 
 class PersonaVoice(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     tone: str
     rhythm: str
 
 
 class PersonaAesthetic(BaseModel):
-    pulls_toward: list[str]
-    pulls_away_from: list[str]
+    model_config = ConfigDict(frozen=True)
+
+    pulls_toward: tuple[str, ...]
+    pulls_away_from: tuple[str, ...]
 
 
 class Persona(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: str
     tagline: str
@@ -28,21 +55,123 @@ class Persona(BaseModel):
     agent_system_prompt: str
     synthesizer_system_prompt: str
 
+    _version: str = PrivateAttr()
+    # Built on first use: LangChain's message types are slow to import.
+    _agent_system_message: SystemMessage | None = PrivateAttr(default=None)
+    _synthesizer_system_message: SystemMessage | None = PrivateAttr(default=None)
 
-@lru_cache(maxsize=1)
-def load_personas() -> dict[str, Persona]:
-    """Load all persona YAML files from the personas directory.
+    def model_post_init(self, __context: Any) -> None:
+        self._version = hashlib.sha256(self.model_dump_json().encode()).hexdigest()[:16]
 
-    Returns a dict mapping persona ID to Persona object.
-    Cached after first call — use load_personas.cache_clear() to reset.
-    """
+    @property
+    def version(self) -> str:
+        """Stable content hash; changes whenever any persona field changes."""
+        return self._version
+
+    @property
+    def agent_system_message(self) -> SystemMessage:
+        """Agent system message, built once. Shared across requests; do not mutate."""
+        if self._agent_system_message is None:
+            from langchain_core.messages import SystemMessage
+
+            self._agent_system_message = SystemMessage(content=self.agent_system_prompt)
+        return self._agent_system_message
+
+    @property
+    def synthesizer_system_message(self) -> SystemMessage:
+        """Synthesizer system message, built once. Shared across requests; do not mutate."""
+        if self._synthesizer_system_message is None:
+            from langchain_core.messages import SystemMessage
+
+            self._synthesizer_system_message = SystemMessage(content=self.synthesizer_system_prompt)
+        return self._synthesizer_system_message
+
+
+@dataclass(frozen=True)
+class PersonaSnapshot:
+    # Shared by every request; treat as read-only. Changes arrive as a new snapshot.
+    personas: dict[str, Persona]
+    version: str
+    signature: tuple
+
+
+def _directory_signature(directory: Path) -> tuple:
+    entries = []
+    for yaml_path in sorted(directory.glob("*.yaml")):
+        stat = yaml_path.stat()
+        entries.append((yaml_path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+def _load_snapshot(directory: Path, signature: tuple) -> PersonaSnapshot:
     personas: dict[str, Persona] = {}
-    for yaml_path in sorted(PERSONAS_DIR.glob("*.yaml")):
+    for yaml_path in sorted(directory.glob("*.yaml")):
         with open(yaml_path) as f:
             data = yaml.safe_load(f)
         persona = Persona(**data)
         personas[persona.id] = persona
-    return personas
+    version = hashlib.sha256("".join(p.version for p in personas.values()).encode()).hexdigest()[:16]
+    return PersonaSnapshot(personas=personas, version=version, signature=signature)
+
+
+class PersonaRegistry:
+    """Holds the current persona snapshot and swaps it when files change."""
+
+    def __init__(self) -> None:
+        self.reloads = 0
+        self._snapshot: PersonaSnapshot | None = None
+        self._failed_signature: tuple | None = None
+
+    def snapshot(self) -> PersonaSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            signature = _directory_signature(PERSONAS_DIR)
+            snapshot = self._snapshot = _load_snapshot(PERSONAS_DIR, signature)
+            self.reloads += 1
+        return snapshot
+
+    def reload(self) -> bool:
+        """Re-read the directory if it changed. Returns True if a new snapshot was swapped in."""
+        signature = _directory_signature(PERSONAS_DIR)
+        current = self._snapshot
+        if current is not None and signature in (current.signature, self._failed_signature):
+            return False
+        try:
+            snapshot = _load_snapshot(PERSONAS_DIR, signature)
+        except Exception:
+            if current is None:
+                raise
+            self._failed_signature = signature
+            logger.exception("Persona reload failed; keeping the previous snapshot")
+            return False
+        self._snapshot = snapshot
+        self.reloads += 1
+        return True
+
+    def clear(self) -> None:
+        """Drop the snapshot so the next access loads from disk."""
+        self._snapshot = None
+
+    async def watch(self, interval: float | None = None) -> None:
+        """Poll the personas directory forever, reloading on change."""
+        interval = interval if interval is not None else get_persona_reload_interval()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                logger.exception("Persona watcher failed")
+
+
+persona_registry = PersonaRegistry()
+
+
+def load_personas() -> dict[str, Persona]:
+    """Return the current personas as a dict mapping persona ID to Persona (read-only).
+
+    The same mapping object is returned until persona files change on disk.
+    """
+    return persona_registry.snapshot().personas
 
 
 def get_persona(persona_id: str) -> Persona | None:
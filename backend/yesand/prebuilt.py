@@ -0,0 +1,104 @@
+"""Pre-serialized, pre-compressed response bodies for read-mostly endpoints.
+
+A ``PrebuiltResponse`` is built once from a payload and then served as-is:
+the JSON bytes, their gzip (and, if the optional ``brotli`` package is
+installed, brotli) encodings and a strong ETag per encoding are all computed
+up front, so a request only negotiates an encoding and compares ETags.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: pip install yesand-backend[brotli]
+    brotli = None
+
+# Bodies smaller than this are not worth compressing.
+MIN_COMPRESS_BYTES = 256
+
+
+@dataclass(frozen=True)
+class _Variant:
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class PrebuiltResponse:
+    media_type: str
+    cache_control: str
+    variants: dict[str | None, _Variant] = field(repr=False)
+
+    @property
+    def etag(self) -> str:
+        return self.variants[None].etag
+
+    @property
+    def etags(self) -> frozenset[str]:
+        return frozenset(variant.etag for variant in self.variants.values())
+
+    def encoding_for(self, accept_encoding: str) -> str | None:
+        """Pick the best pre-compressed encoding the client accepts."""
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def respond(self, if_none_match: str | None, accept_encoding: str | None) -> Response:
+        encoding = self.encoding_for(accept_encoding or "")
+        variant = self.variants[encoding]
+        headers = {"ETag": variant.etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if if_none_match and etag_matches(if_none_match, self.etags):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=variant.body, media_type=self.media_type, headers=headers)
+
+
+def prebuild_json(payload: object, cache_control: str) -> PrebuiltResponse:
+    """Serialize ``payload`` once and prepare every encoding we can serve."""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    tag = hashlib.sha256(body).hexdigest()[:32]
+    variants = {None: _Variant(body, f'"{tag}"')}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        variants["gzip"] = _Variant(gzip.compress(body, compresslevel=9, mtime=0), f'"{tag}-gzip"')
+        if brotli is not None:
+            variants["br"] = _Variant(brotli.compress(body, quality=11), f'"{tag}-br"')
+    return PrebuiltResponse("application/json", cache_control, variants)
+
+
+def etag_matches(if_none_match: str, etags: frozenset[str]) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against known ETags."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
@@ -0,0 +1,247 @@
+"""Model providers for chat, streaming chat and image generation.
+
+Each role (``agent``, ``synthesizer``, ``image``) picks a provider from
+config: ``<ROLE>_PROVIDER`` if set, else ``MODEL_PROVIDER``, else
+``openai``. Providers:
+
+- ``openai``: the OpenAI API through the pooled clients in ``clients.py``.
+- ``compatible``: any OpenAI-compatible server at ``COMPATIBLE_BASE_URL``
+  (vLLM, llama.cpp, LiteLLM, ...), also through the pooled clients.
+- ``local``: in-process and deterministic. Replies and placeholder images
+  are derived from a hash of the input, so capacity tests need no network
+  and cost nothing upstream.
+
+Chat models are LangChain chat models, so callers use ``ainvoke`` /
+``astream`` regardless of provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import struct
+import zlib
+from typing import TYPE_CHECKING, Any, Protocol
+
+from yesand.cache import TTLCache
+from yesand.clients import get_chat_model, get_openai_client
+from yesand.config import (
+    get_compatible_api_key,
+    get_compatible_base_url,
+    get_local_image_base_url,
+    get_local_tokens_per_second,
+    get_provider_name,
+)
+from yesand.metrics import record_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from yesand.local_chat import LocalChatModel
+
+LOCAL_IMAGE_PATH = "/local-images/"
+MAX_LOCAL_IMAGE_SIDE = 2048
+
+_LOCAL_IMAGE_NAME = re.compile(r"^([0-9a-f]{64})-(\d{1,4})x(\d{1,4})\.png$")
+
+
+class ModelProvider(Protocol):
+    name: str
+
+    def chat_model(self, model: str, temperature: float, streaming: bool = False) -> BaseChatModel: ...
+
+    async def generate_images(
+        self, prompt: str, model: str, n: int, size: str, quality: str | None, inline: bool = False
+    ) -> list[str]:
+        """Generate ``n`` images and return their URLs.
+
+        With ``inline``, prefer ``data:`` URLs carrying the image bytes over
+        short-lived hosted URLs, where the backend supports it.
+        """
+        ...
+
+
+class OpenAIProvider:
+    """The OpenAI API, or an OpenAI-compatible server when ``base_url`` is given."""
+
+    name = "openai"
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+
+    def chat_model(self, model: str, temperature: float, streaming: bool = False) -> BaseChatModel:
+        return get_chat_model(model, temperature, streaming, base_url=self.base_url, api_key=self.api_key)
+
+    async def generate_images(
+        self, prompt: str, model: str, n: int, size: str, quality: str | None, inline: bool = False
+    ) -> list[str]:
+        client = get_openai_client(self.base_url, self.api_key)
+        request = {
+            "model": model,
+            "prompt": prompt,
+            "size": size,
+            "n": n,
+        }
+        if quality is not None:
+            request["quality"] = quality
+        # gpt-image models always answer with b64_json and reject the parameter.
+        if inline and model.startswith("dall-e"):
+            request["response_format"] = "b64_json"
+
+        response = await client.images.generate(**request)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            record_tokens("image", model, usage.input_tokens, usage.output_tokens)
+        return [_image_url(item) for item in response.data]
+
+
+class OpenAICompatibleProvider(OpenAIProvider):
+    """An OpenAI-compatible server at a configured base URL."""
+
+    name = "compatible"
+
+    def __init__(self, base_url: str, api_key: str | None = None) -> None:
+        if not base_url:
+            raise ValueError("COMPATIBLE_BASE_URL must be set to use the compatible provider")
+        # Most self-hosted servers ignore the key, but the SDK requires one.
+        super().__init__(base_url=base_url, api_key=api_key or "not-needed")
+
+
+def _image_url(item: Any) -> str:
+    if getattr(item, "url", None):
+        return item.url
+    # Some compatible servers only return base64 payloads.
+    return f"data:image/png;base64,{item.b64_json}"
+
+
+# --- Local deterministic provider ---
+
+
+class LocalProvider:
+    """In-process provider: deterministic text and locally rendered placeholder images."""
+
+    name = "local"
+
+    def __init__(self, role: str, tokens_per_second: float = 0.0, image_base_url: str = "") -> None:
+        self.role = role
+        self.tokens_per_second = tokens_per_second
+        self.image_base_url = image_base_url.rstrip("/")
+        self._model: LocalChatModel | None = None
+
+    def chat_model(self, model: str, temperature: float, streaming: bool = False) -> BaseChatModel:
+        # Same model for every name and temperature: output only depends on the messages.
+        if self._model is None:
+            from yesand.local_chat import LocalChatModel
+
+            self._model = LocalChatModel(role=self.role, tokens_per_second=self.tokens_per_second)
+        return self._model
+
+    async def generate_images(
+        self, prompt: str, model: str, n: int, size: str, quality: str | None, inline: bool = False
+    ) -> list[str]:
+        width, height = _parse_size(size)
+        urls = []
+        for index in range(n):
+            digest = hashlib.sha256(f"{prompt}\x00{index}".encode()).hexdigest()
+            urls.append(f"{self.image_base_url}{LOCAL_IMAGE_PATH}{digest}-{width}x{height}.png")
+        return urls
+
+
+def _parse_size(size: str) -> tuple[int, int]:
+    try:
+        width, height = (int(part) for part in size.lower().split("x"))
+    except ValueError:
+        width = height = 1024
+    return min(width, MAX_LOCAL_IMAGE_SIDE), min(height, MAX_LOCAL_IMAGE_SIDE)
+
+
+def parse_local_image_name(name: str) -> tuple[str, int, int] | None:
+    """Parse ``<sha256>-<W>x<H>.png``; None if it is not a valid placeholder name."""
+    match = _LOCAL_IMAGE_NAME.match(name)
+    if match is None:
+        return None
+    digest, width, height = match.group(1), int(match.group(2)), int(match.group(3))
+    if not (0 < width <= MAX_LOCAL_IMAGE_SIDE and 0 < height <= MAX_LOCAL_IMAGE_SIDE):
+        return None
+    return digest, width, height
+
+
+def local_image_name(url: str) -> str | None:
+    """The placeholder file name if ``url`` points at a local provider image."""
+    prefix = get_local_image_base_url().rstrip("/") + LOCAL_IMAGE_PATH
+    if not url.startswith(prefix):
+        return None
+    name = url[len(prefix):]
+    return name if parse_local_image_name(name) else None
+
+
+_placeholders = TTLCache(maxsize=64, ttl=3600)
+
+
+async def placeholder_png(digest: str, width: int, height: int) -> bytes:
+    """Cached placeholder PNG; a miss is rendered off the event loop."""
+    key = (digest, width, height)
+    png = _placeholders.get(key)
+    if png is None:
+        png = await asyncio.to_thread(render_placeholder, digest, width, height)
+        _placeholders.set(key, png)
+    return png
+
+
+def render_placeholder(digest: str, width: int, height: int) -> bytes:
+    """Render a PNG gradient whose colors are derived from ``digest``."""
+    seed = bytes.fromhex(digest)
+    top, bottom = seed[0:3], seed[3:6]
+    rows = bytearray()
+    for y in range(height):
+        t = y / max(1, height - 1)
+        pixel = bytes(round(a + (b - a) * t) for a, b in zip(top, bottom))
+        rows += b"\x00" + pixel * width
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(bytes(rows), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+_providers: dict[tuple[str, str, tuple], ModelProvider] = {}
+
+
+def get_provider(role: str) -> ModelProvider:
+    """Return the configured provider for ``role`` (``agent``, ``synthesizer`` or ``image``).
+
+    Providers are cached per role, name and endpoint settings, so a changed
+    ``COMPATIBLE_BASE_URL`` or ``LOCAL_*`` value in a reloaded ``.env`` takes
+    effect on the next call.
+    """
+    name = get_provider_name(role)
+    settings = _provider_settings(name)
+    key = (role, name, settings)
+    provider = _providers.get(key)
+    if provider is None:
+        provider = _providers[key] = _build_provider(role, name, settings)
+    return provider
+
+
+def _provider_settings(name: str) -> tuple:
+    if name == "compatible":
+        return (get_compatible_base_url(), get_compatible_api_key())
+    if name == "local":
+        return (get_local_tokens_per_second(), get_local_image_base_url())
+    return ()
+
+
+def _build_provider(role: str, name: str, settings: tuple) -> ModelProvider:
+    if name == "openai":
+        return OpenAIProvider()
+    if name == "compatible":
+        return OpenAICompatibleProvider(*settings)
+    if name == "local":
+        return LocalProvider(role, *settings)
+    raise ValueError(f"Unknown model provider for {role}: {name!r}")
@@ -0,0 +1,145 @@
+"""Minimal asyncio client for the Redis serialization protocol (RESP2).
+
+Only what the shared cache needs: send a command, read one reply. Idle
+connections are pooled; a connection that errors or is cancelled mid-reply is
+closed rather than reused, since its stream position is unknown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from urllib.parse import unquote, urlparse
+
+
+class RespError(Exception):
+    """An error reply from the server (``-ERR ...``)."""
+
+
+def encode_command(*args: bytes | str | int | float) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode()
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP value. Error replies are returned as ``RespError`` instances."""
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed mid-reply")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        return RespError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected RESP type byte {kind!r}")
+
+
+class RespClient:
+    """Pooled connections to one RESP server."""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: str | None = None,
+        timeout: float = 1.0,
+        max_idle: int = 8,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> RespClient:
+        """Build a client from ``redis://[:password@]host[:port][/db]``."""
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported cache URL scheme: {parsed.scheme!r}")
+        db = parsed.path.lstrip("/")
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+            **kwargs,
+        )
+
+    async def execute(self, *args: bytes | str | int | float) -> Any:
+        """Send one command and return its reply; error replies raise ``RespError``."""
+        reader, writer = await self._acquire()
+        try:
+            writer.write(encode_command(*args))
+            reply = await asyncio.wait_for(read_reply(reader), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        self._release(reader, writer)
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def _acquire(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            if self.password is not None:
+                await self._handshake(reader, writer, "AUTH", self.password)
+            if self.db:
+                await self._handshake(reader, writer, "SELECT", self.db)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, *args: Any) -> None:
+        writer.write(encode_command(*args))
+        reply = await asyncio.wait_for(read_reply(reader), self.timeout)
+        if isinstance(reply, RespError):
+            raise reply
+
+    def _release(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if len(self._idle) < self.max_idle:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
@@ -0,0 +1,264 @@
+"""Rate-limit-aware scheduler for upstream OpenAI calls.
+
+Every upstream call first acquires admission from the scheduler. Each model
+has a request bucket and a token bucket; when a bucket is empty, callers
+queue and are admitted strictly by priority (streaming chat first, images
+last), then in arrival order. Bucket sizes start from ``UPSTREAM_RPM`` /
+``UPSTREAM_TPM`` (0 = unknown, admit freely) and are corrected from the
+``x-ratelimit-*`` headers on every response, so the scheduler learns the
+account's real limits. A 429 pauses the model until the advertised reset.
+
+The pooled HTTP client is shared with non-OpenAI traffic (image fetches, the
+image proxy), so only responses seen inside ``upstream_call(model)`` update
+that model's buckets.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import re
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Iterator
+
+import httpx
+
+from yesand.clients import add_response_listener
+from yesand.config import get_upstream_rpm, get_upstream_tpm
+from yesand.metrics import upstream_queue_seconds
+
+_current_model: contextvars.ContextVar[str | None] = contextvars.ContextVar("upstream_model", default=None)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class Priority(IntEnum):
+    CHAT_STREAM = 0
+    CHAT = 1
+    SYNTHESIS = 2
+    IMAGE = 3
+    BACKGROUND = 4
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Parse OpenAI reset durations such as ``"20ms"``, ``"1s"`` or ``"6m0s"``."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; ``limit == 0`` means unlimited."""
+
+    def __init__(self, limit: float) -> None:
+        self.limit = limit
+        self.available = limit
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.limit:
+            rate = self.limit / 60.0
+            self.available = min(self.limit, self.available + (now - self._updated_at) * rate)
+        self._updated_at = now
+
+    def can_take(self, amount: float, now: float) -> bool:
+        return self.seconds_until(amount, now) == 0.0
+
+    def take(self, amount: float) -> None:
+        if self.limit:
+            self.available -= amount
+
+    def seconds_until(self, amount: float, now: float) -> float:
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if not self.limit:
+            return blocked
+        missing = min(amount, self.limit) - self.available
+        return max(blocked, missing / (self.limit / 60.0))
+
+    def observe(self, limit: float | None, remaining: float | None, reset: float | None, now: float) -> None:
+        """Adopt the server's view of this budget."""
+        self._refill(now)
+        if limit:
+            self.limit = limit
+        if remaining is not None and self.limit:
+            self.available = remaining
+        if remaining is not None and remaining < 1 and reset:
+            self.block(reset, now)
+
+    def block(self, seconds: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class _ModelState:
+    def __init__(self, rpm: float, tpm: float) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.queue: list[_Waiter] = []
+        self.timer: asyncio.TimerHandle | None = None
+        self.admitted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class UpstreamScheduler:
+    """Admit upstream calls per model according to learned rate limits."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0) -> None:
+        self.default_rpm = rpm
+        self.default_tpm = tpm
+        self._models: dict[str, _ModelState] = {}
+        self._seq = itertools.count()
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(self.default_rpm, self.default_tpm)
+        return state
+
+    async def acquire(self, model: str, priority: Priority, tokens: float = 0) -> None:
+        """Wait until a call to ``model`` estimated at ``tokens`` may start."""
+        state = self._state(model)
+        now = time.monotonic()
+        if not state.queue and state.requests.can_take(1, now) and state.tokens.can_take(tokens, now):
+            self._admit(state, tokens, 0.0)
+            upstream_queue_seconds.labels(model).observe(0.0)
+            return
+
+        waiter = _Waiter(int(priority), next(self._seq), tokens, now, asyncio.get_running_loop().create_future())
+        heapq.heappush(state.queue, waiter)
+        self._dispatch(state)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in state.queue:
+                state.queue.remove(waiter)
+                heapq.heapify(state.queue)
+            raise
+        upstream_queue_seconds.labels(model).observe(time.monotonic() - now)
+
+    def _admit(self, state: _ModelState, tokens: float, waited: float) -> None:
+        state.requests.take(1)
+        state.tokens.take(tokens)
+        state.admitted += 1
+        state.total_wait += waited
+        state.max_wait = max(state.max_wait, waited)
+
+    def _dispatch(self, state: _ModelState) -> None:
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        now = time.monotonic()
+        while state.queue:
+            head = state.queue[0]
+            if head.future.done():
+                heapq.heappop(state.queue)
+                continue
+            if not (state.requests.can_take(1, now) and state.tokens.can_take(head.tokens, now)):
+                delay = max(state.requests.seconds_until(1, now), state.tokens.seconds_until(head.tokens, now))
+                loop = asyncio.get_running_loop()
+                state.timer = loop.call_later(max(delay, 0.001), self._dispatch, state)
+                return
+            heapq.heappop(state.queue)
+            self._admit(state, head.tokens, now - head.enqueued_at)
+            head.future.set_result(None)
+
+    def observe(self, model: str, response: httpx.Response) -> None:
+        """Update a model's buckets from ``x-ratelimit-*`` response headers."""
+        headers = response.headers
+        state = self._state(model)
+        now = time.monotonic()
+        if response.status_code == 429:
+            state.rate_limited += 1
+            reset = parse_reset(headers.get("retry-after")) or parse_reset(headers.get("x-ratelimit-reset-requests"))
+            state.requests.block(reset or 1.0, now)
+            return
+        state.requests.observe(
+            _number(headers.get("x-ratelimit-limit-requests")),
+            _number(headers.get("x-ratelimit-remaining-requests")),
+            parse_reset(headers.get("x-ratelimit-reset-requests")),
+            now,
+        )
+        state.tokens.observe(
+            _number(headers.get("x-ratelimit-limit-tokens")),
+            _number(headers.get("x-ratelimit-remaining-tokens")),
+            parse_reset(headers.get("x-ratelimit-reset-tokens")),
+            now,
+        )
+
+    def _on_response(self, response: httpx.Response) -> None:
+        model = _current_model.get()
+        if model is not None:
+            self.observe(model, response)
+
+    def stats(self) -> dict:
+        return {
+            model: {
+                "queue_depth": len(state.queue),
+                "admitted": state.admitted,
+                "rate_limited": state.rate_limited,
+                "avg_wait_ms": state.total_wait / state.admitted * 1000 if state.admitted else 0.0,
+                "max_wait_ms": state.max_wait * 1000,
+                "rpm_limit": state.requests.limit,
+                "tpm_limit": state.tokens.limit,
+            }
+            for model, state in self._models.items()
+        }
+
+
+@contextlib.contextmanager
+def upstream_call(model: str) -> Iterator[None]:
+    """Attribute responses seen by the pooled HTTP client in this block to ``model``::
+
+        with upstream_call(model), UpstreamTimer("agent_turn", model):
+            response = await llm.ainvoke(messages)
+    """
+    # Restore by value rather than by token: a stream may be opened in one
+    # task (a hedge) and closed from another.
+    previous = _current_model.get()
+    _current_model.set(model)
+    try:
+        yield
+    finally:
+        _current_model.set(previous)
+
+
+def _number(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+_scheduler: UpstreamScheduler | None = None
+
+
+def get_scheduler() -> UpstreamScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = UpstreamScheduler(rpm=get_upstream_rpm(), tpm=get_upstream_tpm())
+        add_response_listener(_scheduler._on_response)
+    return _scheduler
@@ -0,0 +1,290 @@
+"""Interactive chat sessions over a WebSocket (``/ws/session``).
+
+A ``/chat/stream`` turn is a new HTTP request that re-uploads the whole
+history and looks up and validates the persona again. A session instead
+picks the persona once and keeps the conversation for the life of the
+socket, so each turn sends only the new human message.
+
+Every frame is a JSON object with a ``type``, sent as a text frame (a binary
+frame gets a 422 ``error``). The client sends:
+
+- ``start``: ``{"persona_id", "messages"?, "conversation_id"?, "prefix_hash"?}``.
+  Selects the persona and seeds the history. It may be sent again to switch
+  persona or start over.
+- ``chat``: ``{"content"}``, one human turn.
+- ``generate``: ``{"bypass_cache"?}``, an image for the conversation so far.
+- ``cancel``: stops the running turn or generation.
+
+The server answers ``start`` with ``ready``. A ``chat`` streams ``chunk``
+frames and a ``generate`` streams ``prompt_chunk``, ``prompt_ready`` and
+``image``, each followed by ``done``. Failures are ``error`` frames with an
+HTTP-style ``status``. One chat or generate runs at a time. Closing the
+socket or sending ``cancel`` stops it together with its upstream stream.
+
+After every turn the conversation is also written to the conversation store.
+A client that reconnects can therefore resume with ``conversation_id`` and
+``prefix_hash``, exactly as in the delta protocol.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from typing import Annotated, AsyncIterator, Awaitable, Literal
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from yesand.agent import stream_agent_turn
+from yesand.config import (
+    get_speculative_synthesis_enabled,
+    get_sse_coalesce_max_bytes,
+    get_sse_coalesce_window_ms,
+)
+from yesand.conversation import EMPTY_CONVERSATION, Conversation
+from yesand.conversation_store import get_conversation_store, new_conversation_id, resolve_conversation
+from yesand.image import generate_image
+from yesand.image_store import stored_variant_urls
+from yesand.openings import take_opening
+from yesand.persona import Persona, get_persona
+from yesand.speculation import get_speculator, speculate_after_turn
+from yesand.sse import coalesce_chunks
+from yesand.synthesizer import stream_image_prompt
+
+
+class SessionMessage(BaseModel):
+    role: str  # "human" or "ai"
+    content: str
+
+
+class StartCommand(BaseModel):
+    type: Literal["start"]
+    persona_id: str
+    messages: list[SessionMessage] = []
+    conversation_id: str | None = None
+    prefix_hash: str | None = None
+
+
+class ChatCommand(BaseModel):
+    type: Literal["chat"]
+    content: str = Field(min_length=1)
+
+
+class GenerateCommand(BaseModel):
+    type: Literal["generate"]
+    bypass_cache: bool = False
+
+
+class CancelCommand(BaseModel):
+    type: Literal["cancel"]
+
+
+_commands = TypeAdapter(
+    Annotated[StartCommand | ChatCommand | GenerateCommand | CancelCommand, Field(discriminator="type")]
+)
+
+_stats = {"active": 0, "opened": 0, "turns": 0, "generations": 0, "cancelled": 0, "errors": 0, "idle_closed": 0}
+
+
+def session_stats() -> dict:
+    return dict(_stats)
+
+
+class ChatSession:
+    """State for one ``/ws/session`` connection: persona, history and the running turn."""
+
+    def __init__(self, websocket: WebSocket, idle_timeout: float = 0) -> None:
+        self.websocket = websocket
+        self.idle_timeout = idle_timeout
+        self.persona: Persona | None = None
+        self.history: Conversation = EMPTY_CONVERSATION
+        self.conversation_id: str | None = None
+        self._task: asyncio.Task | None = None
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def run(self) -> None:
+        """Serve the socket until the client leaves or it stays idle too long."""
+        await self.websocket.accept()
+        _stats["opened"] += 1
+        _stats["active"] += 1
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(self.websocket.receive(), self.idle_timeout or None)
+                except asyncio.TimeoutError:
+                    if self.busy:
+                        continue
+                    _stats["idle_closed"] += 1
+                    await self.websocket.close(code=1000, reason="idle")
+                    return
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+                text = message.get("text")
+                if text is None:
+                    await self.error(422, "Invalid message: frames must be JSON text")
+                    continue
+                await self.handle(text)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            _stats["active"] -= 1
+            await self._cancel()
+
+    async def handle(self, text: str) -> None:
+        """Dispatch one client frame. Turns run in a task so ``cancel`` can arrive meanwhile."""
+        try:
+            command = _commands.validate_json(text)
+        except ValidationError as e:
+            error = e.errors(include_url=False)[0]
+            location = ".".join(str(part) for part in error["loc"])
+            await self.error(422, f"Invalid message: {location + ': ' if location else ''}{error['msg']}")
+            return
+
+        if isinstance(command, CancelCommand):
+            if await self._cancel():
+                _stats["cancelled"] += 1
+                await self.send({"type": "cancelled"})
+            return
+        if self.busy:
+            await self.error(429, "A turn is already running; wait for done or send cancel")
+            return
+        if isinstance(command, StartCommand):
+            await self.start(command)
+            return
+        if self.persona is None:
+            await self.error(400, "Send a start message first")
+            return
+        # A dict lookup, so persona edits picked up by the hot reloader reach
+        # long-lived sessions too.
+        self.persona = get_persona(self.persona.id) or self.persona
+
+        if isinstance(command, ChatCommand):
+            self._task = asyncio.create_task(self._guard(self.chat(command.content), "LLM error"))
+        else:
+            self._task = asyncio.create_task(self._guard(self.generate(command.bypass_cache), "Generate error"))
+
+    async def start(self, command: StartCommand) -> None:
+        persona = get_persona(command.persona_id)
+        if persona is None:
+            await self.error(404, f"Unknown persona: {command.persona_id}")
+            return
+
+        delta = Conversation.from_messages(command.messages)
+        if command.conversation_id is None:
+            history, conversation_id = delta, new_conversation_id()
+        else:
+            history = resolve_conversation(command.conversation_id, command.prefix_hash, delta)
+            if history is None:
+                await self.error(409, "Unknown conversation prefix; resend the full history")
+                return
+            conversation_id = command.conversation_id
+
+        self.persona, self.history, self.conversation_id = persona, history, conversation_id
+        await self.send({
+            "type": "ready",
+            "persona_id": persona.id,
+            "conversation_id": conversation_id,
+            "prefix_hash": self._remember(),
+            "turns": len(history),
+        })
+
+    async def chat(self, content: str) -> None:
+        """Stream one "yes, and" turn; the history only grows once the reply is complete."""
+        persona = self.persona
+        history = self.history.add("human", content)
+        opening = take_opening(persona, history)
+        if opening is not None:
+            chunks = _single_chunk(opening)
+        else:
+            chunks = coalesce_chunks(
+                stream_agent_turn(persona, history),
+                window=get_sse_coalesce_window_ms() / 1000,
+                max_bytes=get_sse_coalesce_max_bytes(),
+            )
+
+        reply = []
+        # aclosing: a cancel that lands while a frame is being sent still
+        # closes the upstream stream now rather than at garbage collection.
+        async with contextlib.aclosing(chunks):
+            async for chunk in chunks:
+                reply.append(chunk)
+                await self.send({"type": "chunk", "content": chunk})
+
+        reply_text = "".join(reply)
+        self.history = history.add("ai", reply_text)
+        _stats["turns"] += 1
+        speculate_after_turn(persona, history, reply_text, self.conversation_id)
+        await self.send({"type": "done", "prefix_hash": self._remember()})
+
+    async def generate(self, bypass_cache: bool) -> None:
+        """Synthesize a prompt for the conversation so far and render it, as /generate/stream does."""
+        persona, history = self.persona, self.history
+        use_cache = not bypass_cache
+        if get_speculative_synthesis_enabled() and use_cache:
+            await get_speculator().claim(persona, history)
+
+        parts = []
+        try:
+            async with contextlib.aclosing(stream_image_prompt(persona, history, use_cache=use_cache)) as chunks:
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    await self.send({"type": "prompt_chunk", "content": chunk})
+        except Exception as e:
+            await self.error(502, f"Synthesizer error: {e}")
+            return
+        prompt = "".join(parts)
+        await self.send({"type": "prompt_ready", "prompt": prompt})
+
+        try:
+            image_url = await generate_image(prompt)
+        except Exception as e:
+            await self.error(502, f"Image generation error: {e}")
+            return
+        image = {"type": "image", "image_url": image_url, "prompt_used": prompt}
+        variants = stored_variant_urls(image_url)
+        if variants:
+            image["image_variants"] = variants
+        await self.send(image)
+        _stats["generations"] += 1
+        await self.send({"type": "done", "prefix_hash": history.prefix_hash})
+
+    async def send(self, event: dict) -> None:
+        # Turn frames come from the turn task, protocol errors from the
+        # receive loop; one sender at a time.
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(event))
+
+    async def error(self, status: int, message: str) -> None:
+        _stats["errors"] += 1
+        await self.send({"type": "error", "status": status, "message": message})
+
+    async def _guard(self, turn: Awaitable[None], label: str) -> None:
+        # An upstream failure ends the turn with an error frame; the session
+        # and its history stay usable.
+        try:
+            await turn
+        except Exception as e:
+            with contextlib.suppress(Exception):
+                await self.error(502, f"{label}: {e}")
+
+    async def _cancel(self) -> bool:
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return False
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        return True
+
+    def _remember(self) -> str:
+        get_conversation_store().put(self.conversation_id, self.history)
+        return self.history.prefix_hash
+
+
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
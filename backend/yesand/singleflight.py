@@ -0,0 +1,43 @@
+"""Coalesce identical concurrent work into a single in-flight task."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """Run at most one task per key; concurrent callers share its result.
+
+    The shared task is shielded, so a caller that goes away (client
+    disconnect, timeout) does not cancel the work for everyone else.
+    """
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.coalesced = 0
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away.
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._tasks), "started": self.started, "coalesced": self.coalesced}
@@ -0,0 +1,167 @@
+"""Speculative background prompt synthesis after chat turns.
+
+Once a chat turn completes, the server already holds the whole scene, so the
+image prompt for it can be synthesized before the user asks. Results land in
+the regular prompt cache, which lets a following /generate skip straight to
+the image call. Speculation runs at ``Priority.BACKGROUND``.
+
+Each speculation belongs to a conversation lineage. The lineage is the
+persona plus the delta-protocol ``conversation_id`` when there is one, and
+otherwise the persona plus the opening message. A newer speculation only
+supersedes, that is cancels or writes off, an older one whose history it
+extends. So two users who open with the same /suggest word do not cancel each
+other's work. Results that were never claimed count as wasted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+
+from yesand.cache import TTLCache
+from yesand.config import get_speculative_max_concurrency, get_speculative_synthesis_enabled
+from yesand.conversation import Conversation, as_conversation
+from yesand.persona import Persona
+from yesand.scheduler import Priority
+from yesand.synthesizer import get_prompt_cache, prompt_cache_key_for, synthesize_image_prompt
+
+logger = logging.getLogger(__name__)
+
+# Open speculations remembered per lineage; more than this many users sharing
+# an opening line and no conversation id is rare, and the oldest is forgotten.
+MAX_TIPS_PER_LINEAGE = 8
+
+
+class SpeculativeSynthesizer:
+    """Run synthesize_image_prompt ahead of /generate under a concurrency cap."""
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.failed = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # lineage -> [(prompt cache key, history length, history prefix hash)]
+        self._lineages = TTLCache(maxsize=4096, ttl=3600)
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._running: set[str] = set()
+        self._unclaimed: set[str] = set()
+
+    def speculate(
+        self, persona: Persona, history: Conversation | list[dict], conversation_id: str | None = None
+    ) -> None:
+        """Start synthesizing the prompt for ``history`` in the background."""
+        history = as_conversation(history)
+        if not history:
+            return
+        key = prompt_cache_key_for(persona, history)
+        lineage = _lineage_key(persona, history, conversation_id)
+
+        tips = [
+            tip for tip in self._lineages.get(lineage, ())
+            if not self._supersedes(history, key, tip)
+        ]  # fmt: skip
+        tips.append((key, len(history), history.prefix_hash))
+        self._lineages.set(lineage, tips[-MAX_TIPS_PER_LINEAGE:])
+
+        if key in self._tasks:
+            return
+        task = asyncio.create_task(self._run(key, persona, history))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    def _supersedes(self, history: Conversation, key: str, tip: tuple[str, int, str]) -> bool:
+        """Whether ``history`` replaces the older speculation ``tip``; if so, write it off."""
+        previous, length, prefix_hash = tip
+        if previous == key:
+            return True
+        if length >= len(history) or history.prefix_hash_at(length) != prefix_hash:
+            # Not an earlier point of this conversation: another user's scene.
+            return False
+        self._supersede(previous)
+        return True
+
+    async def claim(self, persona: Persona, history: Conversation | list[dict]) -> None:
+        """Wait for a matching running speculation and mark its result used.
+
+        A speculation still queued for a slot is cancelled instead: the
+        caller synthesizes at its own, higher priority rather than waiting.
+        """
+        key = prompt_cache_key_for(persona, history)
+        task = self._tasks.get(key)
+        if task is not None:
+            if key not in self._running:
+                if task.cancel():
+                    self.skipped += 1
+                return
+            # wait() neither raises if the speculation fails or is superseded
+            # nor cancels it if this request goes away.
+            await asyncio.wait({task})
+        if key in self._unclaimed:
+            self._unclaimed.discard(key)
+            self.used += 1
+
+    def _supersede(self, key: str) -> None:
+        task = self._tasks.pop(key, None)
+        if task is not None and task.cancel():
+            self.cancelled += 1
+            if key in self._running:
+                self.wasted += 1
+        elif key in self._unclaimed:
+            self._unclaimed.discard(key)
+            self.wasted += 1
+
+    async def _run(self, key: str, persona: Persona, history: Conversation) -> None:
+        if await get_prompt_cache().contains(key):
+            # Already synthesized, possibly by another worker.
+            return
+        async with self._semaphore:
+            self.started += 1
+            self._running.add(key)
+            try:
+                await synthesize_image_prompt(persona, history, priority=Priority.BACKGROUND)
+            except Exception:
+                self.failed += 1
+                logger.exception("Speculative prompt synthesis failed")
+                return
+            finally:
+                self._running.discard(key)
+        self._unclaimed.add(key)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "in_flight": len(self._tasks),
+            "used": self.used,
+            "wasted": self.wasted,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+
+def _lineage_key(persona: Persona, history: Conversation, conversation_id: str | None) -> str:
+    if conversation_id is not None:
+        return hashlib.sha256(f"{persona.id}\x00id\x00{conversation_id}".encode()).hexdigest()
+    return hashlib.sha256(f"{persona.id}\x00first\x00{history[0].content}".encode()).hexdigest()
+
+
+_speculator: SpeculativeSynthesizer | None = None
+
+
+def get_speculator() -> SpeculativeSynthesizer:
+    global _speculator
+    if _speculator is None:
+        _speculator = SpeculativeSynthesizer(max_concurrency=get_speculative_max_concurrency())
+    return _speculator
+
+
+def speculate_after_turn(
+    persona: Persona, history: Conversation, reply: str, conversation_id: str | None = None
+) -> None:
+    """Kick off speculation for the history including the new AI reply, if enabled."""
+    if get_speculative_synthesis_enabled():
+        get_speculator().speculate(persona, history.add("ai", reply), conversation_id)
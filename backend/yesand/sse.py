@@ -0,0 +1,161 @@
+"""Server-sent event framing shared by the streaming endpoints."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from json.encoder import encode_basestring_ascii
+from typing import AsyncIterator, Awaitable, Callable
+
+# SSE comment line: ignored by EventSource clients but keeps proxies from
+# timing out an idle connection.
+HEARTBEAT = ": ping\n\n"
+
+
+def sse_event(payload: dict) -> str:
+    """Frame a JSON payload as a single SSE ``data:`` event."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def chunk_event(content: str) -> str:
+    """Frame a ``{"type": "chunk"}`` event; same bytes as ``sse_event``, minus the generic encoder."""
+    return 'data: {"type": "chunk", "content": ' + encode_basestring_ascii(content) + "}\n\n"
+
+
+async def coalesce_chunks(chunks: AsyncIterator[str], window: float, max_bytes: int) -> AsyncIterator[str]:
+    """Merge text chunks that arrive within ``window`` seconds of the first buffered one.
+
+    A merged chunk is released when the window closes, when it reaches
+    ``max_bytes`` characters, or when the source ends. ``window <= 0``
+    passes chunks through unchanged. The source is not read further while a
+    full merged chunk waits for the consumer.
+    """
+    if window <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    # One reader task and at most one timer per merged chunk, rather than a
+    # task per source chunk: the point is to spend less per token, not more.
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    drained = asyncio.Event()
+    parts: list[str] = []
+    size = 0
+    timer: asyncio.TimerHandle | None = None
+
+    async def read() -> None:
+        nonlocal size, timer
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    drained.clear()
+                    ready.set()
+                    await drained.wait()
+                elif timer is None:
+                    timer = loop.call_later(window, ready.set)
+        finally:
+            ready.set()
+
+    reader = asyncio.ensure_future(read())
+    try:
+        while True:
+            await ready.wait()
+            ready.clear()
+            if timer is not None:
+                timer.cancel()
+                timer = None
+            if parts:
+                merged = "".join(parts)
+                parts.clear()
+                size = 0
+                yield merged
+                # Only now, with the consumer back for more, may a reader
+                # that filled a chunk go on reading the source.
+                drained.set()
+            if reader.done():
+                if not parts:
+                    break
+                ready.set()
+        reader.result()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        reader.cancel()
+        with contextlib.suppress(BaseException):
+            await reader
+
+
+async def with_heartbeats(events: AsyncIterator[str], interval: float) -> AsyncIterator[str]:
+    """Pass events through, emitting a heartbeat whenever none arrives for ``interval`` seconds."""
+    iterator = aiter(events)
+    pending = asyncio.ensure_future(anext(iterator))
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield HEARTBEAT
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            yield event
+            pending = asyncio.ensure_future(anext(iterator))
+    finally:
+        pending.cancel()
+        with contextlib.suppress(BaseException):
+            await pending
+
+
+_END = object()
+
+
+async def stop_on_disconnect(
+    events: AsyncIterator[str], is_disconnected: Callable[[], Awaitable[bool]], interval: float
+) -> AsyncIterator[str]:
+    """Pass events through until the client disconnects, then cancel the source.
+
+    The source runs in its own task and ``is_disconnected`` is polled every
+    ``interval`` seconds, so a disconnect is noticed even while the source is
+    waiting on upstream rather than only at the next failed send. Cancelling
+    the source unwinds its generators, which closes the upstream stream and
+    frees its scheduler slot. ``interval <= 0`` disables polling; the source
+    is still cancelled if the server cancels the response itself.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    error: Exception | None = None
+
+    async def pump() -> None:
+        nonlocal error
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as exc:
+            error = exc
+        await queue.put(_END)
+
+    async def watch() -> None:
+        while not await is_disconnected():
+            await asyncio.sleep(interval)
+        source.cancel()
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_END)
+
+    source = asyncio.ensure_future(pump())
+    watcher = asyncio.ensure_future(watch()) if interval > 0 else None
+    try:
+        while (event := await queue.get()) is not _END:
+            yield event
+        if error is not None:
+            raise error
+    finally:
+        for task in (watcher, source):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(BaseException):
+                    await task
@@ -1,33 +1,141 @@
 """Synthesize a DALL-E image prompt from conversation history."""
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+import asyncio
+import contextlib
+import hashlib
+from typing import AsyncGenerator
 
-from yesand.config import get_text_model
+from yesand.cache import SharedCache, create_shared_cache
+from yesand.compaction import count_tokens
+from yesand.config import get_prompt_cache_max_bytes, get_prompt_cache_size, get_prompt_cache_ttl, get_text_model
+from yesand.conversation import Conversation, as_conversation
+from yesand.metrics import UpstreamTimer, record_stream_end, record_usage
 from yesand.persona import Persona
+from yesand.providers import get_provider
+from yesand.scheduler import Priority, get_scheduler, upstream_call
 
+# Bump whenever the synthesizer call changes shape (message layout, temperature,
+# transcript format) so cached prompts from the old version are not reused.
+SYNTHESIZER_PROMPT_VERSION = "1"
 
-async def synthesize_image_prompt(persona: Persona, history: list[dict]) -> str:
+_prompt_cache: SharedCache | None = None
+
+
+def get_prompt_cache() -> SharedCache:
+    """Return the synthesized prompt cache, shared between workers per ``CACHE_BACKEND``."""
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = create_shared_cache(
+            "prompts",
+            ttl=get_prompt_cache_ttl(),
+            max_bytes=get_prompt_cache_max_bytes(),
+            max_entries=get_prompt_cache_size(),
+            on_close=_forget_prompt_cache,
+        )
+    return _prompt_cache
+
+
+def _forget_prompt_cache() -> None:
+    global _prompt_cache
+    _prompt_cache = None
+
+
+def prompt_cache_key(persona: Persona, model: str, conversation: Conversation) -> str:
+    """Content-addressed key for a synthesized prompt.
+
+    Keyed on the conversation's prefix hash rather than its transcript, so a
+    cache hit never builds the transcript at all.
+    """
+    parts = (persona.id, persona.version, SYNTHESIZER_PROMPT_VERSION, model, conversation.prefix_hash)
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()
+
+
+def prompt_cache_key_for(persona: Persona, history: Conversation | list[dict]) -> str:
+    """Prompt cache key that synthesize_image_prompt would use for this history."""
+    return prompt_cache_key(persona, get_text_model("gpt-4o"), as_conversation(history))
+
+
+async def synthesize_image_prompt(
+    persona: Persona,
+    history: Conversation | list[dict],
+    use_cache: bool = True,
+    priority: Priority = Priority.SYNTHESIS,
+) -> str:
     """Convert a conversation into a single DALL-E image generation prompt.
 
     Args:
         persona: The active persona with synthesizer system prompt.
-        history: Conversation history as list of {"role": "human"|"ai", "content": str}.
+        history: Conversation history, as a Conversation or a list of
+            {"role": "human"|"ai", "content": str}.
+        use_cache: Reuse a previously synthesized prompt for the same persona,
+            model and conversation. Pass False to force a fresh LLM call.
+        priority: Scheduler priority; speculative synthesis passes
+            ``Priority.BACKGROUND``.
 
     Returns:
         A DALL-E prompt string describing the collaborative scene.
     """
-    transcript_lines = []
-    for msg in history:
-        label = "human" if msg["role"] == "human" else "ai"
-        transcript_lines.append(f"{label}: {msg['content']}")
-    transcript = "\n".join(transcript_lines)
-
-    messages = [
-        SystemMessage(content=persona.synthesizer_system_prompt),
-        HumanMessage(content=transcript),
-    ]
-
-    llm = ChatOpenAI(model=get_text_model("gpt-4o"), temperature=0.3)
-    response = await llm.ainvoke(messages)
+    conversation = as_conversation(history)
+    model = get_text_model("gpt-4o")
+    cache = get_prompt_cache()
+    key = prompt_cache_key(persona, model, conversation)
+
+    if use_cache:
+        cached = await cache.get(key)
+        if cached is not None:
+            return cached.decode()
+
+    transcript = conversation.transcript
+    await get_scheduler().acquire(model, priority, count_tokens(transcript))
+    llm = get_provider("synthesizer").chat_model(model, temperature=0.3)
+    with upstream_call(model), UpstreamTimer("synthesize", model):
+        response = await llm.ainvoke(_build_messages(persona, transcript))
+    record_usage("synthesize", model, response)
+    await cache.set(key, response.content.encode())
     return response.content
+
+
+async def stream_image_prompt(
+    persona: Persona, history: Conversation | list[dict], use_cache: bool = True
+) -> AsyncGenerator[str, None]:
+    """Stream the synthesized image prompt as it is generated.
+
+    A cached prompt is yielded as a single chunk. A freshly streamed prompt is
+    cached once complete, so a non-streaming call can reuse it.
+    """
+    conversation = as_conversation(history)
+    model = get_text_model("gpt-4o")
+    cache = get_prompt_cache()
+    key = prompt_cache_key(persona, model, conversation)
+
+    if use_cache:
+        cached = await cache.get(key)
+        if cached is not None:
+            yield cached.decode()
+            return
+
+    transcript = conversation.transcript
+    await get_scheduler().acquire(model, Priority.SYNTHESIS, count_tokens(transcript))
+    llm = get_provider("synthesizer").chat_model(model, temperature=0.3, streaming=True)
+    parts = []
+    try:
+        with upstream_call(model), UpstreamTimer("synthesize_stream", model):
+            async with contextlib.aclosing(llm.astream(_build_messages(persona, transcript))) as stream:
+                async for chunk in stream:
+                    record_usage("synthesize_stream", model, chunk)
+                    content = getattr(chunk, "content", "")
+                    if content:
+                        parts.append(content)
+                        yield content
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client went away; a partial prompt is never cached.
+        record_stream_end("synthesize_stream", model, len(parts), cancelled=True)
+        raise
+    record_stream_end("synthesize_stream", model, len(parts), cancelled=False)
+    await cache.set(key, "".join(parts).encode())
+
+
+def _build_messages(persona: Persona, transcript: str) -> list:
+    from langchain_core.messages import HumanMessage
+
+    return [persona.synthesizer_system_message, HumanMessage(content=transcript)]
@@ -0,0 +1,118 @@
+"""Background warm-up of the heavy SDKs after startup.
+
+Importing ``main`` loads FastAPI and our own modules only. The OpenAI and
+LangChain SDKs (most of a second between them) and the tiktoken encoding are
+imported where they are first used, so a new worker binds its port quickly.
+The lifespan starts ``warm_up()`` right away to load them on worker threads
+before traffic arrives; ``GET /ready`` answers 503 until it has finished, so
+a load balancer or autoscaler can hold requests until then.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import Any, Callable
+
+from yesand.clients import get_http_client
+from yesand.compaction import load_token_encoding
+
+logger = logging.getLogger(__name__)
+
+WARM_MODULES = (
+    "langchain_core.messages",
+    "langchain_core.language_models.chat_models",
+    "openai",
+    "langchain_openai",
+    "yesand.local_chat",
+)
+# Failures here are reported but do not hold back readiness.
+OPTIONAL_MODULES = frozenset({"yesand.local_chat"})
+
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+
+class WarmUp:
+    """Progress of the startup warm-up, reported by /ready.
+
+    Failed essential steps (a tiktoken download, say) are retried with
+    exponential backoff until they succeed; a failed optional step is only
+    reported, so it never keeps the worker out of rotation.
+    """
+
+    def __init__(self, retry_delay: float = RETRY_DELAY, max_retry_delay: float = MAX_RETRY_DELAY) -> None:
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.steps: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.retries = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    async def run(self, modules: tuple[str, ...] = WARM_MODULES, optional: frozenset[str] = OPTIONAL_MODULES) -> None:
+        self.started_at = time.perf_counter()
+        steps = [(name, importlib.import_module, (name,), True) for name in modules]
+        steps.append(("tiktoken", load_token_encoding, (), True))
+        # On the loop: the shared client is a plain module global.
+        steps.append(("http_client", get_http_client, (), False))
+
+        delay = self.retry_delay
+        while True:
+            failed = [step for step in steps if not await self._step(*step)]
+            steps = [step for step in failed if step[0] not in optional]
+            if not steps:
+                break
+            self.retries += 1
+            logger.warning("Warm-up retrying %s in %.0fs", ", ".join(step[0] for step in steps), delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+        self.finished_at = time.perf_counter()
+        logger.info("Warm-up finished in %.2fs", self.finished_at - self.started_at)
+
+    async def _step(self, name: str, fn: Callable[..., Any], args: tuple, in_thread: bool) -> bool:
+        started = time.perf_counter()
+        try:
+            # Imports are CPU-bound, but a worker thread hands the GIL back to
+            # the event loop every few milliseconds, so requests still flow.
+            if in_thread:
+                await asyncio.to_thread(fn, *args)
+            else:
+                fn(*args)
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+            logger.exception("Warm-up step %s failed", name)
+            return False
+        finally:
+            self.steps[name] = time.perf_counter() - started
+        self.errors.pop(name, None)
+        return True
+
+    def status(self) -> dict:
+        finished = self.started_at is not None and self.finished_at is not None
+        return {
+            "ready": self.ready,
+            "started": self.started_at is not None,
+            "warmup_seconds": self.finished_at - self.started_at if finished else None,
+            "steps": {name: round(seconds, 4) for name, seconds in self.steps.items()},
+            "errors": self.errors,
+            "retries": self.retries,
+        }
+
+
+_warmup = WarmUp()
+
+
+def get_warmup() -> WarmUp:
+    return _warmup
+
+
+async def warm_up() -> None:
+    """Run the process warm-up once; started from the app lifespan."""
+    await _warmup.run()
@@ -53,7 +53,7 @@ function App() {
 
   const handleSelectPersona = useCallback((persona) => {
     dispatch({ type: 'SELECT_PERSONA', persona })
-    fetchSuggestion()
+    fetchSuggestion(persona.id)
       .then((data) => {
         dispatch({ type: 'SET_SUGGESTION', word: data.word })
       })
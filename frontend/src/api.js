@@ -12,8 +12,8 @@ export async function fetchPersonas() {
   return readJson(response, 'Failed to load personas')
 }
 
-export async function fetchSuggestion() {
-  const response = await fetch(`${BASE}/suggest`)
+export async function fetchSuggestion(personaId) {
+  const response = await fetch(`${BASE}/suggest?persona_id=${encodeURIComponent(personaId)}`)
   return readJson(response, 'Failed to fetch suggestion')
 }
 